@@ -0,0 +1,113 @@
+"""Compare HTML-to-text extraction throughput against the previous implementation.
+
+Usage:
+    python benchmarks/html_extraction.py book.epub article.html [...]
+
+EPUB files are measured chapter by chapter with the chapter extractor, other
+files as web pages with the article extractor. Each input is run through the
+old multi-pass html.parser code and through text_processing with every
+available parser, and the outputs are checked against the old code.
+html.parser, the default, matches it; lxml and html5lib repair broken
+markup their own way (a <p> nested in another <p> is closed early), so
+documents with such markup are reported as differing.
+"""
+import argparse
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import text_processing  # noqa: E402
+
+
+def legacy_chapter_text(content):
+    """Chapter extraction as it was before the single-pass engine"""
+    content = content.decode('utf-8', errors='ignore')
+    soup = BeautifulSoup(content, 'html.parser')
+    for tag in soup(['style', 'script', 'nav', 'header', 'footer']):
+        tag.decompose()
+    text = ""
+    paragraphs = soup.find_all('p')
+    if paragraphs:
+        text += "\n".join(p.get_text().strip() for p in paragraphs)
+    if not text:
+        content_divs = soup.find_all('div', class_=['text', 'content', 'body'])
+        text += "\n".join(div.get_text().strip() for div in content_divs)
+    if not text:
+        text = soup.get_text().strip()
+    if text and any(ord(c) > 0x3000 for c in text):
+        text = re.sub(r'\s+', ' ', text)
+        return unicodedata.normalize('NFKC', text)
+    return None
+
+
+def legacy_article_text(content):
+    """URL extraction as it was before the single-pass engine"""
+    content = content.decode('utf-8', errors='ignore')
+    soup = BeautifulSoup(content, 'html.parser')
+    for tag in soup(['style', 'script', 'nav', 'header', 'footer', 'iframe']):
+        tag.decompose()
+    article = soup.find('article') or soup.find('div', class_=['article', 'content', 'main-content'])
+    text = article.get_text() if article else soup.get_text()
+    text = re.sub(r'\s+', ' ', text)
+    return unicodedata.normalize('NFKC', text)
+
+
+def load_documents(paths):
+    """Yield (label, kind, [document bytes]) for every input file"""
+    for path in paths:
+        path = Path(path)
+        if path.suffix.lower() == '.epub':
+            with text_processing.EpubArchive(path.read_bytes()) as archive:
+                yield path.name, 'chapter', list(archive.iter_contents())
+        else:
+            yield path.name, 'article', [path.read_bytes()]
+
+
+def available_parsers():
+    parsers = ['html.parser']
+    for name in ('lxml', 'html5lib'):
+        try:
+            __import__(name)
+            parsers.append(name)
+        except ImportError:
+            pass
+    return parsers
+
+
+def measure(func, documents, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(doc) for doc in documents]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', help="EPUB or HTML files")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per variant; the best is reported")
+    args = parser.parse_args()
+
+    for label, kind, documents in load_documents(args.files):
+        size_mb = sum(len(doc) for doc in documents) / 1e6
+        legacy = legacy_chapter_text if kind == 'chapter' else legacy_article_text
+        extract = text_processing.extract_chapter_text if kind == 'chapter' else text_processing.extract_article_text
+
+        print(f"{label}: {len(documents)} document(s), {size_mb:.2f} MB")
+        baseline, expected = measure(legacy, documents, args.repeat)
+        print(f"  {'legacy html.parser':<24} {size_mb / baseline:8.2f} MB/s")
+        for name in available_parsers():
+            elapsed, results = measure(lambda doc: extract(doc, parser=name), documents, args.repeat)
+            mismatches = sum(1 for a, b in zip(results, expected) if a != b)
+            note = "" if not mismatches else f"  ({mismatches} document(s) differ from legacy)"
+            print(f"  {'engine ' + name:<24} {size_mb / elapsed:8.2f} MB/s  x{baseline / elapsed:.2f}{note}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+"""Ingestion throughput and peak memory as the deck grows.
+
+Usage:
+    python benchmarks/ingestion.py
+    python benchmarks/ingestion.py --deck-sizes 0 10000 --sentences 2000
+    python benchmarks/ingestion.py --save-baseline
+    python benchmarks/ingestion.py --compare
+
+Synthetic Japanese plain text, HTML pages and EPUBs are generated from a
+fixed seed. Segmentation and difficulty scoring are measured once; duplicate
+checks, add_content, EPUB batches and URL sources (served by a local
+stand-in server) are measured against decks prefilled with 0 up to 500k
+sentences. The near-duplicate check is off unless NEOANKI_NEAR_DUP_THRESHOLD
+is set; its index is then built before timing, so the numbers are
+steady-state ingest rates. NEOANKI_EXTRACTION_WORKERS applies as in the app.
+
+Every case is run once for time and once more, on fresh input, under
+tracemalloc for peak memory. Memory used inside extraction worker processes
+is not included. --save-baseline stores the results next to this script;
+--compare reports the change against them and exits with status 1 when a
+rate drops by more than --tolerance.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import text_processing  # noqa: E402
+import shizen  # noqa: E402
+
+# EPUB chapters are XHTML, which bs4 points out on every parse
+warnings.filterwarnings('ignore', message="It looks like you're using an HTML parser")
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'ingestion_baseline.json'
+
+KANJI = ('日本語学校先生友達電車時間会社仕事天気今朝昨夜週末旅行映画音楽料理家族'
+         '子供部屋窓外雨雪山川海空花木森町駅道店本新聞手紙写真言葉意味問題答')
+KANA = 'あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん'
+PARTICLES = ('は', 'が', 'を', 'に', 'で', 'と', 'の', 'も', 'から', 'まで')
+ENDINGS = ('です', 'ました', 'ません', 'でした', 'だろう', 'らしい', 'ている', 'たい')
+TERMINATORS = ('。', '。', '。', '！', '？')
+
+
+def synthetic_sentences(rng, count):
+    """Japanese-looking sentences of 10 to 60 characters, distinct in practice"""
+    sentences = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(2, 6)):
+            words.append(''.join(rng.choice(KANJI) for _ in range(rng.randint(1, 3))))
+            words.append(''.join(rng.choice(KANA) for _ in range(rng.randint(0, 3))))
+            words.append(rng.choice(PARTICLES))
+        words.append(rng.choice(ENDINGS))
+        sentences.append(''.join(words)[:59] + rng.choice(TERMINATORS))
+    return sentences
+
+
+def paragraphs(rng, count, per_paragraph=4):
+    sentences = synthetic_sentences(rng, count)
+    return [''.join(sentences[i:i + per_paragraph]) for i in range(0, len(sentences), per_paragraph)]
+
+
+def make_text(rng, count):
+    return '\n\n'.join(paragraphs(rng, count))
+
+
+def make_html(rng, count):
+    body = ''.join(f'<p>{paragraph}</p>\n' for paragraph in paragraphs(rng, count))
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>記事</title>'
+            '<style>p { margin: 0 }</style><script>var x = "。";</script></head><body>'
+            '<nav><a href="/">ホーム</a></nav><header>ニュース</header>'
+            f'<article>{body}</article><footer>著作権</footer></body></html>')
+
+
+def make_epub(rng, chapters, per_chapter):
+    """A minimal EPUB 3 package with one XHTML document per chapter"""
+    out = tempfile.SpooledTemporaryFile()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip')
+        zf.writestr('META-INF/container.xml',
+                    '<?xml version="1.0"?><container version="1.0" '
+                    'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                    '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+                    '</rootfiles></container>')
+        items = []
+        for i in range(chapters):
+            body = ''.join(f'<p>{paragraph}</p>' for paragraph in paragraphs(rng, per_chapter))
+            zf.writestr(f'OEBPS/ch{i}.xhtml',
+                        '<?xml version="1.0" encoding="utf-8"?><html xmlns="http://www.w3.org/1999/xhtml">'
+                        f'<head><title>第{i}章</title></head><body><h1>第{i}章</h1>{body}</body></html>')
+            items.append(f'<item id="ch{i}" href="ch{i}.xhtml" media-type="application/xhtml+xml"/>')
+        spine = ''.join(f'<itemref idref="ch{i}"/>' for i in range(chapters))
+        zf.writestr('OEBPS/content.opf',
+                    '<?xml version="1.0" encoding="utf-8"?><package xmlns="http://www.idpf.org/2007/opf" '
+                    'version="3.0"><metadata/>'
+                    f'<manifest>{"".join(items)}</manifest><spine>{spine}</spine></package>')
+    out.seek(0)
+    return out.read()
+
+
+class StandInServer:
+    """Serves generated pages from memory on a local port"""
+
+    def __init__(self):
+        self.pages = {}
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def publish(self, path, html):
+        self.pages[path] = html.encode('utf-8')
+        return f'http://127.0.0.1:{self.httpd.server_port}{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def prefilled_deck(workdir, size, rng):
+    """A content manager holding `size` synthetic sentences, with its indexes built"""
+    content_manager = shizen.ContentManager(content_path=str(Path(workdir) / f'deck_{size}'))
+    remaining = size
+    while remaining:
+        batch = min(remaining, 50_000)
+        content_manager.sentences.extend(text_processing.make_sentences(synthetic_sentences(rng, batch)))
+        remaining -= batch
+    content_manager.near_duplicate_index()
+    return content_manager
+
+
+# Cases: each generates fresh input from rng and returns a callable that
+# ingests it and returns the number of sentences handled. Only the callable
+# is measured.
+
+def case_split_into_sentences(content_manager, rng, args, server):
+    text = make_text(rng, args.sentences)
+    return lambda: len(text_processing.split_into_sentences(text))
+
+
+def case_calculate_difficulty(content_manager, rng, args, server):
+    texts = synthetic_sentences(rng, args.sentences)
+
+    def run():
+        for text in texts:
+            text_processing.calculate_difficulty(text)
+        return len(texts)
+    return run
+
+
+def case_is_duplicate(content_manager, rng, args, server):
+    # Half new texts, half taken from the deck
+    texts = synthetic_sentences(rng, args.sentences // 2)
+    texts += [sentence['text'] for sentence in itertools.islice(content_manager.sentences, args.sentences // 2)]
+
+    def run():
+        for text in texts:
+            content_manager.is_duplicate(text)
+        return len(texts)
+    return run
+
+
+def case_add_content(content_manager, rng, args, server):
+    text = make_text(rng, args.sentences)
+
+    def run():
+        added, duplicates = content_manager.add_content(text, 'benchmark text')
+        return added + duplicates
+    return run
+
+
+def _checked(result):
+    added, duplicates, error = result
+    if error:
+        raise RuntimeError(error)
+    return added + duplicates
+
+
+def case_process_epub_batch(content_manager, rng, args, server):
+    chapters = 20
+    epub = make_epub(rng, chapters, max(1, args.sentences // chapters))
+
+    def run():
+        source_id, error = content_manager.add_source('epub', 'benchmark.epub', file_data=epub)
+        if error:
+            raise RuntimeError(error)
+        progress = content_manager.active_sources[source_id]['progress']
+        handled = _checked(content_manager.process_source_content(source_id, batch_size=5))
+        while progress['processed_units'] < progress['total_units']:
+            handled += _checked(content_manager.process_source_content(source_id, batch_size=5))
+        return handled
+    return run
+
+
+def case_process_url_content(content_manager, rng, args, server):
+    pages = 10
+    urls = []
+    for _ in range(pages):
+        path = f'/{rng.getrandbits(64):016x}.html'
+        urls.append(server.publish(path, make_html(rng, max(1, args.sentences // pages))))
+
+    def run():
+        handled = 0
+        for url in urls:
+            source_id, error = content_manager.add_source('url', url, content={'url': url})
+            if error:
+                raise RuntimeError(error)
+            handled += _checked(content_manager.process_source_content(source_id))
+        return handled
+    return run
+
+
+STANDALONE_CASES = {
+    'split_into_sentences': case_split_into_sentences,
+    'calculate_difficulty': case_calculate_difficulty,
+}
+DECK_CASES = {
+    'is_duplicate': case_is_duplicate,
+    'add_content': case_add_content,
+    'process_epub_batch': case_process_epub_batch,
+    'process_url_content': case_process_url_content,
+}
+
+
+def measure(case, content_manager, rng, args, server):
+    """(sentences, seconds) of an untraced run and peak MiB of a traced one"""
+    run = case(content_manager, rng, args, server)
+    start = time.perf_counter()
+    count = run()
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if args.memory:
+        run = case(content_manager, rng, args, server)
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--deck-sizes', type=int, nargs='+', default=[0, 10_000, 100_000, 500_000],
+                        help="sentences already in the deck before each deck-dependent case")
+    parser.add_argument('--sentences', type=int, default=5_000, help="sentences of input per case")
+    parser.add_argument('--cases', nargs='+', choices=[*STANDALONE_CASES, *DECK_CASES],
+                        help="only run these cases")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the tracemalloc runs")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare against the stored baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative rate drop reported as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    selected = set(args.cases or [*STANDALONE_CASES, *DECK_CASES])
+    baseline = {}
+    if args.compare:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    rng = random.Random(args.seed)
+    results = {}
+    regressions = []
+
+    def report(name, deck_size, count, elapsed, peak):
+        key = f"{name}@{deck_size}"
+        rate = count / elapsed if elapsed else float('inf')
+        results[key] = {'sentences': count, 'seconds': round(elapsed, 4),
+                        'rate': round(rate, 1), 'peak_mib': None if peak is None else round(peak, 2)}
+        line = f"  {name:<22} {deck_size:>9,}  {count:>8,} sentences  {rate:>12,.0f} sentences/s"
+        if peak is not None:
+            line += f"  {peak:>8.1f} MiB peak"
+        if key in baseline:
+            change = rate / baseline[key]['rate'] - 1
+            line += f"  {change:+7.1%} vs baseline"
+            if change < -args.tolerance:
+                regressions.append(key)
+        print(line, flush=True)
+
+    threshold = os.environ.get('NEOANKI_NEAR_DUP_THRESHOLD') or 'off'
+    print(f"Python {platform.python_version()}, {os.cpu_count()} CPUs, "
+          f"{args.sentences:,} sentences per case, near-duplicate threshold {threshold}")
+    print(f"  {'case':<22} {'deck':>9}")
+
+    with tempfile.TemporaryDirectory() as workdir, StandInServer() as server:
+        for name, case in STANDALONE_CASES.items():
+            if name in selected:
+                report(name, 0, *measure(case, None, rng, args, server))
+
+        deck_cases = {name: case for name, case in DECK_CASES.items() if name in selected}
+        if deck_cases:
+            # Start extraction workers and the HTTP pool outside the timed runs
+            warmup = shizen.ContentManager(content_path=str(Path(workdir) / 'warmup'))
+            for warmup_case in (case_process_epub_batch, case_process_url_content):
+                warmup_case(warmup, rng, argparse.Namespace(sentences=100), server)()
+
+        for deck_size in args.deck_sizes if deck_cases else []:
+            content_manager = prefilled_deck(workdir, deck_size, rng)
+            for name, case in deck_cases.items():
+                report(name, deck_size, *measure(case, content_manager, rng, args, server))
+            del content_manager
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'sentences': args.sentences, 'results': results},
+                      f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
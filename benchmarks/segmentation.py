@@ -0,0 +1,93 @@
+"""Sentence segmentation throughput on a full novel.
+
+Usage:
+    python benchmarks/segmentation.py novel.epub
+    python benchmarks/segmentation.py novel.txt
+
+The whole book is extracted and normalized first. Then only segmentation
+and sentence-dict creation are timed, for the old re.split splitter and for
+text_processing.split_into_sentences. A synthetic chapter of quoted
+dialogue longer than MAX_SENTENCE_LENGTH is timed the same way, since such
+quotes are split at their inner terminators instead of kept whole.
+"""
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import text_processing  # noqa: E402
+
+
+def legacy_split_into_sentences(text):
+    """The splitter as it was before the bracket-aware segmenter"""
+    sentences = []
+    segments = re.split(r'([。！？])', text)
+    for i in range(0, len(segments)-1, 2):
+        if segments[i]:
+            current = (segments[i] + (segments[i+1] if i+1 < len(segments) else '')).strip()
+            if (current and 5 <= len(current) <= 200 and any(ord(c) > 0x3000 for c in current)):
+                kanji_count = len([c for c in current if 0x4E00 <= ord(c) <= 0x9FFF])
+                length = len(current)
+                sentences.append({
+                    'id': None,
+                    'text': current,
+                    'created': datetime.now(),
+                    'difficulty': round((min(5, kanji_count / length * 10) + min(5, length / 40)) / 2, 1),
+                    'reviews': 0,
+                    'next_review': None,
+                    'status': 'new'
+                })
+    return sentences
+
+
+def load_chapters(path):
+    path = Path(path)
+    if path.suffix.lower() == '.epub':
+        with text_processing.EpubArchive(path.read_bytes()) as archive:
+            texts = [text_processing.extract_chapter_text(content) for content in archive.iter_contents()]
+        return [text for text in texts if text]
+    return [text_processing._normalize(path.read_text(encoding='utf-8'))]
+
+
+def long_dialogue_chapter(quotes=200, sentences_per_quote=12):
+    """Narration with 「…」 quotes of about 350 characters each"""
+    parts = []
+    for q in range(quotes):
+        quote = ''.join(f'これは{q}番目の会話の{i}番目の文で、話はまだまだ続いていきます。'
+                        for i in range(sentences_per_quote))
+        parts.append(f'彼は静かに話し始めた。「{quote}」と彼は言った。')
+    return ''.join(parts)
+
+
+def measure(split, chapters, repeat):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(len(split(chapter)) for chapter in chapters)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('book', help="EPUB or UTF-8 text file")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per splitter; the best is reported")
+    args = parser.parse_args()
+
+    chapters = load_chapters(args.book)
+    dialogue = [long_dialogue_chapter()]
+    for title, texts in ((Path(args.book).name, chapters), ("long dialogue", dialogue)):
+        chars = sum(len(text) for text in texts)
+        print(f"{title}: {len(texts)} chapters, {chars:,} characters")
+        for label, split in (("legacy re.split", legacy_split_into_sentences),
+                             ("segmenter", text_processing.split_into_sentences)):
+            elapsed, count = measure(split, texts, args.repeat)
+            print(f"  {label:<16} {count:>8,} sentences  {count / elapsed:>12,.0f} sentences/s  "
+                  f"{chars / elapsed / 1e6:6.2f} Mchars/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Streaming readers for decks exported from other tools (CSV/TSV and Anki .apkg).
+
+Every reader yields plain note dicts one at a time, so decks of any size can
+be imported in batches:
+
+    {'text': str, 'reviews': int,
+     'schedule': {'next_review': datetime, 'interval': float} or None,
+     'history': [(datetime, response), ...]}
+"""
+import csv
+import html
+import io
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unicodedata
+import zipfile
+from datetime import datetime, timedelta
+
+TAG = re.compile(r'<[^>]+>|\[sound:[^\]]*\]')
+WHITESPACE = re.compile(r'\s+')
+
+# Column names recognized in a CSV/TSV header row
+TEXT_COLUMNS = ('text', 'sentence', 'front', 'expression')
+
+# Anki answer buttons mapped onto this app's responses
+ANKI_EASE = {1: 'hard', 2: 'hard', 3: 'good', 4: 'easy'}
+ANKI_REVIEW_CARD = 2
+ANKI_LEARNING_CARD = 1
+ANKI_RELEARNING_CARD = 3  # A lapsed review card; due is a timestamp, as for learning cards
+
+
+def clean_field(value):
+    """Plain text of an Anki/CSV field: tags and sound references dropped, entities decoded"""
+    value = html.unescape(TAG.sub('', value))
+    return unicodedata.normalize('NFKC', WHITESPACE.sub(' ', value)).strip()
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value.strip()) if value and value.strip() else None
+    except ValueError:
+        return None
+
+
+def _parse_number(value, default=0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def iter_csv_notes(fileobj, delimiter=',', field=0):
+    """Notes from a CSV/TSV export
+
+    Lines starting with '#' (Anki's export headers) are skipped. A header row
+    naming a text column (text, sentence, front or expression) selects that
+    column and enables the optional due (ISO date), interval (days) and
+    reviews columns; without one, column `field` holds the text.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+    rows = csv.reader((line for line in text if not line.startswith('#')), delimiter=delimiter)
+
+    columns = None
+    for row in rows:
+        if not row:
+            continue
+        if columns is None:
+            header = [cell.strip().lower() for cell in row]
+            columns = {name: i for i, name in enumerate(header)}
+            text_column = next((columns[name] for name in TEXT_COLUMNS if name in columns), None)
+            if text_column is not None:
+                field = text_column
+                continue
+            columns = {}
+
+        if field >= len(row):
+            continue
+        note_text = clean_field(row[field])
+        if not note_text:
+            continue
+
+        schedule = None
+        due = _parse_datetime(row[columns['due']]) if 'due' in columns and columns['due'] < len(row) else None
+        if due is not None:
+            interval = _parse_number(row[columns['interval']]) if 'interval' in columns and columns['interval'] < len(row) else 0
+            schedule = {'next_review': due, 'interval': interval}
+        reviews = int(_parse_number(row[columns['reviews']])) if 'reviews' in columns and columns['reviews'] < len(row) else 0
+
+        yield {'text': note_text, 'reviews': reviews, 'schedule': schedule, 'history': []}
+
+
+def _extract_collection(fileobj):
+    """Copy the SQLite collection out of an .apkg into a temporary file"""
+    with zipfile.ZipFile(fileobj) as archive:
+        names = set(archive.namelist())
+        if 'collection.anki21' in names:
+            name = 'collection.anki21'
+        elif 'collection.anki2' in names:
+            name = 'collection.anki2'
+        elif 'collection.anki21b' in names:
+            raise ValueError("This .apkg uses the newest Anki format; export it with "
+                             "'Support older Anki versions' enabled")
+        else:
+            raise ValueError("No Anki collection found in the .apkg file")
+
+        # SQLite can only open files, so this one copy is unavoidable
+        fd, path = tempfile.mkstemp(suffix='.anki2')
+        try:
+            with os.fdopen(fd, 'wb') as out, archive.open(name) as collection:
+                shutil.copyfileobj(collection, out, 1 << 20)
+        except BaseException:
+            os.unlink(path)
+            raise
+    return path
+
+
+def iter_apkg_notes(fileobj, field=0):
+    """Notes from an Anki .apkg package with their scheduling and review log
+
+    Notes, cards and the review log are read as three cursors ordered by note
+    id and merged, so memory use does not depend on the deck size. The first
+    card of a note (lowest template ordinal) provides its schedule.
+    """
+    path = _extract_collection(fileobj)
+    conn = sqlite3.connect(path)
+    try:
+        crt = conn.execute("SELECT crt FROM col").fetchone()[0]
+        collection_day = datetime.fromtimestamp(crt).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        cards = conn.execute("SELECT nid, type, due, ivl, reps FROM cards ORDER BY nid, ord")
+        revlog = conn.execute(
+            "SELECT c.nid, r.id, r.ease FROM revlog r JOIN cards c ON c.id = r.cid ORDER BY c.nid, r.id")
+        card = next(cards, None)
+        review = next(revlog, None)
+
+        for note_id, fields in conn.execute("SELECT id, flds FROM notes ORDER BY id"):
+            reviews = 0
+            schedule = None
+            while card is not None and card[0] < note_id:
+                card = next(cards, None)
+            while card is not None and card[0] == note_id:
+                _, card_type, due, interval, reps = card
+                reviews += reps
+                if schedule is None and card_type == ANKI_REVIEW_CARD:
+                    schedule = {'next_review': collection_day + timedelta(days=due), 'interval': float(interval)}
+                elif schedule is None and card_type in (ANKI_LEARNING_CARD, ANKI_RELEARNING_CARD):
+                    schedule = {'next_review': datetime.fromtimestamp(due), 'interval': 0.0}
+                card = next(cards, None)
+
+            history = []
+            while review is not None and review[0] < note_id:
+                review = next(revlog, None)
+            while review is not None and review[0] == note_id:
+                history.append((datetime.fromtimestamp(review[1] / 1000), ANKI_EASE.get(review[2], 'good')))
+                review = next(revlog, None)
+
+            values = fields.split('\x1f')
+            note_text = clean_field(values[field]) if field < len(values) else ''
+            if note_text:
+                yield {'text': note_text, 'reviews': reviews, 'schedule': schedule, 'history': history}
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def iter_notes(fileobj, deck_format, field=0):
+    """Notes of a deck file in the given format ('csv', 'tsv' or 'apkg')"""
+    if deck_format == 'apkg':
+        return iter_apkg_notes(fileobj, field)
+    if deck_format in ('csv', 'tsv'):
+        return iter_csv_notes(fileobj, '\t' if deck_format == 'tsv' else ',', field)
+    raise ValueError(f"Unknown deck format: {deck_format}")
@@ -1,26 +1,46 @@
 import streamlit as st
 from datetime import datetime, date, timedelta
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import tempfile
+import io
 from functools import lru_cache
+from contextlib import contextmanager
 import os
+import mmap
 from gtts import gTTS
 import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import xml.etree.ElementTree as ET
 import plotly.graph_objects as go
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, deque
 import json
 import re
+import sys
 import unicodedata
 import uuid
 import ollama
+import numpy as np
 import pickle
 from pathlib import Path
 import shutil
+import sqlite3
+import struct
+import hashlib
+import threading
+import time
+import zipfile
+import zlib
+import itertools
+import bisect
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from types import SimpleNamespace
+from collections.abc import MutableMapping
 from auth import init_auth, render_auth_page
+import text_processing
+import deck_import
 
 
 st.set_page_config(
@@ -37,6 +57,7 @@ class TimeTracker:
         self.daily_stats = {}
         self.streak_count = 0
         self.last_active_date = None
+        self.dirty = True  # Changed since the last save
         self._initialize_today()
 
     def _initialize_today(self):
@@ -68,14 +89,18 @@ class TimeTracker:
                     self.streak_count = 1
             else:
                 self.streak_count = 1
-                
-        self.last_active_date = today
+            self.dirty = True
+
+        if self.last_active_date != today:
+            self.last_active_date = today
+            self.dirty = True
     def log_review(self):
         current_time = datetime.now()
         today = current_time.date()
         self.update_session()  # Ensure today's stats exist
         self.daily_stats[today]['reviews'] += 1
         self.last_review_date = current_time
+        self.dirty = True
 
     def get_study_stats(self):
         current_time = datetime.now()
@@ -93,266 +118,2807 @@ class TimeTracker:
         
         return stats
 
-class SessionStateManager:
-    def __init__(self, storage_path="./data"):
-        self.storage_path = Path(storage_path)
-        self.storage_path.mkdir(exist_ok=True)
-        self.state_file = self.storage_path / "session_state.pkl"
-        self.backup_dir = self.storage_path / "backups"
-        self.backup_dir.mkdir(exist_ok=True)
-        self.content_dir = self.storage_path / "content"
-        self.content_dir.mkdir(exist_ok=True)
+class ParallelZipWriter:
+    """Write a zip archive with members deflated concurrently
+
+    zlib releases the GIL while compressing, so each member is deflated on
+    its own worker thread into a temporary file; the archive is then
+    assembled in order by copying those streams. Memory use stays at a few
+    chunks per worker regardless of file sizes. Members that are already zip
+    containers (EPUBs) are stored as they are.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    ZIP64_LIMIT = 0xFFFFFFFF
+
+    def __init__(self, path, workers=None):
+        self.path = Path(path)
+        self.workers = workers or os.cpu_count() or 1
+        self.members = []  # (source path, archive name)
+
+    def add(self, source_path, arcname):
+        self.members.append((Path(source_path), str(arcname).replace(os.sep, '/')))
+
+    def write(self):
+        """Compress all members and write the archive atomically"""
+        tmp_path = self.path.with_suffix('.tmp')
+        entries = []
+        try:
+            with open(tmp_path, 'wb') as out, ThreadPoolExecutor(self.workers) as pool:
+                for (source_path, arcname), member in zip(self.members, pool.map(self._prepare, self.members)):
+                    try:
+                        entries.append(self._write_member(out, arcname, member))
+                    finally:
+                        if member['tmp_path']:
+                            os.unlink(member['tmp_path'])
+                self._write_central_directory(out, entries)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return self.path
+
+    def _prepare(self, member):
+        """Runs on a worker: checksum and, unless incompressible, deflate one file"""
+        source_path, _ = member
+        with open(source_path, 'rb') as f:
+            store = f.read(4) == b'PK\x03\x04'
+
+        crc = 0
+        size = 0
+        tmp_path = None
+        with open(source_path, 'rb') as f:
+            if store:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                compressed_size = size
+            else:
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.part')
+                with os.fdopen(fd, 'wb') as tmp:
+                    for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                        crc = zlib.crc32(chunk, crc)
+                        size += len(chunk)
+                        tmp.write(compressor.compress(chunk))
+                    tmp.write(compressor.flush())
+                    compressed_size = tmp.tell()
+
+        return {
+            'method': zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED,
+            'data_path': source_path if store else tmp_path,
+            'tmp_path': tmp_path,
+            'crc': crc,
+            'size': size,
+            'compressed_size': compressed_size,
+            'mtime': source_path.stat().st_mtime
+        }
+
+    def _write_member(self, out, arcname, member):
+        """Write a local header and copy the member data; returns its central directory entry"""
+        name = arcname.encode('utf-8')
+        mtime = time.localtime(member['mtime'])
+        dos_date = (max(mtime.tm_year, 1980) - 1980) << 9 | mtime.tm_mon << 5 | mtime.tm_mday
+        dos_time = mtime.tm_hour << 11 | mtime.tm_min << 5 | mtime.tm_sec // 2
+        zip64 = member['size'] >= self.ZIP64_LIMIT or member['compressed_size'] >= self.ZIP64_LIMIT
+        extra = struct.pack('<HHQQ', 1, 16, member['size'], member['compressed_size']) if zip64 else b''
+
+        entry = {**member, 'name': name, 'offset': out.tell(), 'dos_date': dos_date, 'dos_time': dos_time}
+        out.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, 0x800, member['method'],
+            dos_time, dos_date, member['crc'],
+            0xFFFFFFFF if zip64 else member['compressed_size'],
+            0xFFFFFFFF if zip64 else member['size'],
+            len(name), len(extra)
+        ))
+        out.write(name)
+        out.write(extra)
+        with open(member['data_path'], 'rb') as f:
+            shutil.copyfileobj(f, out, self.CHUNK_SIZE)
+        return entry
+
+    def _write_central_directory(self, out, entries):
+        start = out.tell()
+        for entry in entries:
+            # Fields that overflow 32 bits move into the zip64 extra block, in this order
+            wide = [value for value in (entry['size'], entry['compressed_size'], entry['offset'])
+                    if value >= self.ZIP64_LIMIT]
+            extra = struct.pack(f'<HH{len(wide)}Q', 1, 8 * len(wide), *wide) if wide else b''
+            out.write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, 45, 45 if wide else 20, 0x800, entry['method'],
+                entry['dos_time'], entry['dos_date'], entry['crc'],
+                min(entry['compressed_size'], 0xFFFFFFFF), min(entry['size'], 0xFFFFFFFF),
+                len(entry['name']), len(extra), 0, 0, 0, 0o644 << 16,
+                min(entry['offset'], 0xFFFFFFFF)
+            ))
+            out.write(entry['name'])
+            out.write(extra)
+        end = out.tell()
+
+        count = len(entries)
+        if count >= 0xFFFF or end - start >= self.ZIP64_LIMIT or start >= self.ZIP64_LIMIT:
+            out.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                  count, count, end - start, start))
+            out.write(struct.pack('<IIQI', 0x07064b50, 0, end, 1))
+        out.write(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(end - start, 0xFFFFFFFF), min(start, 0xFFFFFFFF), 0
+        ))
+
+
+class SessionStateManager:
+    SNAPSHOT_MAGIC = b'NEOSNAP\0'
+    SNAPSHOT_VERSION = 2
+    # Upgrades keyed by the snapshot version they start from; each takes and
+    # returns (meta, columns). Version 0 is the legacy pickle snapshot.
+    SNAPSHOT_MIGRATIONS = {
+        0: '_migrate_legacy_pickle',
+        1: '_migrate_add_norm_hash',
+    }
+
+    def __init__(self, storage_path="./data", checkpoint_every=50, backend=None):
+        self.storage_path = Path(storage_path)
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        # 'pickle' keeps a snapshot plus journal, 'sqlite' keeps an indexed database
+        self.backend = backend or os.environ.get('NEOANKI_STORAGE_BACKEND', 'pickle')
+        self.snapshot_file = self.storage_path / "session_state.snap"
+        # Pickle snapshot written by older versions, migrated on first load
+        self.state_file = self.storage_path / "session_state.pkl"
+        self.journal_file = self.storage_path / "session_state.journal"
+        self.db_file = self.storage_path / "session_state.db"
+        self.store = None
+        self.backup_dir = self.storage_path / "backups"
+        self.backup_dir.mkdir(exist_ok=True)
+        # Rolling backups are manifests referencing blobs stored once by hash
+        self.object_dir = self.backup_dir / "objects"
+        self.hash_cache_file = self.backup_dir / "hash_cache.json"
+        self._hash_cache = None
+        self.content_dir = self.storage_path / "content"
+        self.content_dir.mkdir(exist_ok=True)
+        # Number of journal frames to accumulate before folding them into a snapshot
+        self.checkpoint_every = checkpoint_every
+        self.journal_seq = 0
+        self.journal_frames = 0
+        # Journal frames may only be appended on top of a snapshot this manager wrote or loaded
+        self.has_base_snapshot = False
+        self.force_checkpoint = False
+        # Serializes writes from the script thread and the background saver
+        self.write_lock = threading.Lock()
+
+    def open_store(self):
+        """Open the SQLite store for the sqlite backend"""
+        if self.store is None:
+            self.store = SQLiteStateStore(self.db_file)
+        return self.store
+
+    def attach_storage(self, content_manager, review_system):
+        """Back the managers with database views when the sqlite backend is active"""
+        if self.backend != 'sqlite':
+            return
+        store = self.open_store()
+        content_manager.store = store
+        content_manager.sentences = SQLiteSentenceList(store)
+        review_system.store = store
+        review_system.schedule = SQLiteScheduleMap(store)
+        review_system.history = SQLiteHistoryList(store)
+
+    def save_state(self, content_manager, review_system, time_tracker, checkpoint=False):
+        """Save application state, appending only the changes since the last save"""
+        capture = self.capture_state(content_manager, review_system, time_tracker, checkpoint)
+        if capture is None:
+            return True, "No changes to save"
+        success, message = self.write_captured(capture)
+        if not success:
+            self.restore_capture(capture, content_manager, time_tracker)
+        return success, message
+
+    def has_changes(self, content_manager, review_system, time_tracker):
+        """Whether anything was modified since the last capture"""
+        if (content_manager.pending_changes or review_system.pending_changes
+                or content_manager.sources_dirty or content_manager.dirty_sources
+                or content_manager.source_list_dirty or time_tracker.dirty or self.force_checkpoint):
+            return True
+        # Database-backed writes are only visible as an open transaction
+        return self.store is not None and self.store.conn.in_transaction
+
+    def capture_state(self, content_manager, review_system, time_tracker, checkpoint=False):
+        """Take a consistent copy of everything the next write needs
+
+        This runs on the script thread and only copies references and small
+        dicts; serialization and disk I/O happen in write_captured. Returns
+        None when nothing changed since the last capture.
+        """
+        if not checkpoint and not self.has_changes(content_manager, review_system, time_tracker):
+            return None
+
+        capture = {
+            'changes': content_manager.pending_changes + review_system.pending_changes,
+            'time_tracker': self._time_tracker_state(time_tracker),
+            'time_tracker_dirty': time_tracker.dirty,
+            'sources_dirty': content_manager.sources_dirty,
+            'source_list_dirty': content_manager.source_list_dirty,
+            # Only sources modified since the last save get their files rewritten
+            'dirty_sources': {
+                source_id: {**content_manager.active_sources[source_id],
+                            'progress': dict(content_manager.active_sources[source_id]['progress'])}
+                for source_id in content_manager.dirty_sources
+                if source_id in content_manager.active_sources
+            },
+            'checkpoint': checkpoint,
+            'full': None
+        }
+        content_manager.pending_changes = []
+        review_system.pending_changes = []
+        content_manager.sources_dirty = False
+        content_manager.dirty_sources = set()
+        content_manager.source_list_dirty = False
+        time_tracker.dirty = False
+
+        if self.backend == 'sqlite':
+            # Committing is cheap; only backups are left for the writer
+            store = self.open_store()
+            with store.lock:
+                if capture['sources_dirty']:
+                    store.put_state('sources', content_manager.sources)
+                if capture['dirty_sources'] or capture['source_list_dirty']:
+                    store.put_state('active_sources', {
+                        source_id: {**source, 'progress': dict(source['progress']), 'file_data': None}
+                        for source_id, source in content_manager.active_sources.items()
+                    })
+                if capture['time_tracker_dirty']:
+                    store.put_state('time_tracker', capture['time_tracker'])
+                store.commit()
+            return capture
+
+        if (checkpoint or self.force_checkpoint or not self.has_base_snapshot
+                or self.journal_frames >= self.checkpoint_every):
+            # A full copy subsumes the pending changes
+            capture['changes'] = []
+            capture['full'] = {
+                'content_manager': SimpleNamespace(
+                    sentences=content_manager.sentences.copy(),
+                    sources=dict(content_manager.sources),
+                    active_sources={
+                        source_id: {**source, 'progress': dict(source['progress'])}
+                        for source_id, source in content_manager.active_sources.items()
+                    }
+                ),
+                'review_system': SimpleNamespace(
+                    schedule=dict(review_system.schedule),
+                    history=review_system.history.copy()
+                )
+            }
+            self.force_checkpoint = False
+        return capture
+
+    def merge_captures(self, captures):
+        """Coalesce several captures, oldest first, into one write"""
+        merged = dict(captures[-1])
+        full_indexes = [i for i, c in enumerate(captures) if c['full'] is not None]
+        start = full_indexes[-1] if full_indexes else 0
+        merged['full'] = captures[start]['full']
+        merged['changes'] = [change for c in captures[start:] for change in c['changes']]
+        merged['checkpoint'] = any(c['checkpoint'] for c in captures)
+        merged['dirty_sources'] = {}
+        for c in captures:
+            merged['dirty_sources'].update(c['dirty_sources'])
+        merged['time_tracker_dirty'] = any(c['time_tracker_dirty'] for c in captures)
+        merged['sources_dirty'] = any(c['sources_dirty'] for c in captures)
+        merged['source_list_dirty'] = any(c['source_list_dirty'] for c in captures)
+        return merged
+
+    def restore_capture(self, capture, content_manager, time_tracker):
+        """Put the changes of a failed write back so the next save retries them"""
+        content_manager.pending_changes[:0] = capture['changes']
+        content_manager.dirty_sources.update(capture['dirty_sources'])
+        content_manager.sources_dirty = content_manager.sources_dirty or capture['sources_dirty']
+        content_manager.source_list_dirty = content_manager.source_list_dirty or capture['source_list_dirty']
+        time_tracker.dirty = time_tracker.dirty or capture['time_tracker_dirty']
+        if capture['full'] is not None:
+            self.force_checkpoint = True
+
+    def write_captured(self, capture):
+        """Serialize and write a captured state to disk"""
+        try:
+            with self.write_lock:
+                if self.backend == 'sqlite':
+                    self._checkpoint_store(capture['checkpoint'])
+                else:
+                    if capture['full'] is not None:
+                        self._write_checkpoint(
+                            capture['full']['content_manager'],
+                            capture['full']['review_system'],
+                            SimpleNamespace(**capture['time_tracker'])
+                        )
+                    if capture['full'] is None or capture['changes']:
+                        self._append_journal(capture['changes'], capture['time_tracker'])
+
+                # Save content files separately
+                self._save_content_files(capture['dirty_sources'])
+            return True, "State saved successfully"
+
+        except Exception as e:
+            return False, f"Error saving state: {str(e)}"
+
+    def _checkpoint_store(self, checkpoint=False):
+        """Back up the database and truncate its WAL periodically"""
+        store = self.open_store()
+        # The WAL plays the role of the journal
+        self.journal_frames += 1
+        if checkpoint or self.journal_frames >= self.checkpoint_every:
+            self._create_backup()
+            with store.lock:
+                store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.journal_frames = 0
+            self._cleanup_old_backups()
+
+    def _write_checkpoint(self, content_manager, review_system, time_tracker):
+        """Fold the journal into a fresh full snapshot"""
+        meta, columns = self._encode_snapshot(content_manager, review_system, time_tracker)
+        meta['journal_seq'] = self.journal_seq
+
+        # Create backup first
+        self._create_backup()
+
+        # Write the snapshot atomically, then drop the frames it now contains
+        self._write_snapshot_file(self.snapshot_file, meta, columns)
+
+        if self.journal_file.exists():
+            self.journal_file.unlink()
+        if self.state_file.exists():
+            # The legacy pickle is superseded (and kept in the backup above)
+            self.state_file.unlink()
+        self.journal_frames = 0
+        self.has_base_snapshot = True
+
+        self._cleanup_old_backups()
+
+    def _append_journal(self, changes, time_tracker_state):
+        """Append one frame of mutations to the write-ahead journal"""
+        self.journal_seq += 1
+        frame = {
+            'seq': self.journal_seq,
+            'timestamp': datetime.now(),
+            'changes': changes,
+            'time_tracker': time_tracker_state
+        }
+        with open(self.journal_file, 'ab') as f:
+            pickle.dump(frame, f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_frames += 1
+
+    def _time_tracker_state(self, time_tracker):
+        """Raw time tracker state for journal frames"""
+        return {
+            'last_review_date': time_tracker.last_review_date,
+            'study_sessions': list(time_tracker.study_sessions),
+            'daily_stats': {k: dict(v) for k, v in time_tracker.daily_stats.items()},
+            'streak_count': time_tracker.streak_count,
+            'last_active_date': time_tracker.last_active_date
+        }
+
+    def _encode_snapshot(self, content_manager, review_system, time_tracker):
+        """Split the state into typed columns and a small pickled metadata dict"""
+        sentence_columns, sentence_meta = content_manager.sentences.to_columns()
+        history_columns, history_meta = review_system.history.to_columns()
+
+        schedule = review_system.schedule
+        responses = {}
+        columns = {f'sentences.{k}': v for k, v in sentence_columns.items()}
+        columns.update({f'history.{k}': v for k, v in history_columns.items()})
+        columns.update({
+            'schedule.sentence_ids': np.fromiter(schedule.keys(), dtype=np.int64, count=len(schedule)),
+            'schedule.next_review': np.fromiter(
+                (round(v['next_review'].timestamp() * 1_000_000) for v in schedule.values()),
+                dtype=np.int64, count=len(schedule)
+            ),
+            'schedule.interval': np.fromiter(
+                (v['interval'] for v in schedule.values()), dtype=np.float64, count=len(schedule)
+            ),
+            'schedule.last_response': np.fromiter(
+                (responses.setdefault(v['last_response'], len(responses)) for v in schedule.values()),
+                dtype=np.int8, count=len(schedule)
+            ),
+        })
+
+        meta = {
+            'timestamp': datetime.now(),
+            'sentences': sentence_meta,
+            'history': history_meta,
+            'schedule': {'response_names': list(responses)},
+            'sources': content_manager.sources,
+            'active_sources': {
+                source_id: {**source, 'file_data': None}
+                for source_id, source in content_manager.active_sources.items()
+            },
+            'time_tracker': self._time_tracker_state(time_tracker) if time_tracker else None
+        }
+        return meta, columns
+
+    def _decode_snapshot(self, meta, columns):
+        """Rebuild the in-memory state from snapshot columns"""
+        def group(prefix):
+            return {k[len(prefix):]: v for k, v in columns.items() if k.startswith(prefix)}
+
+        response_names = meta['schedule']['response_names']
+        schedule_columns = group('schedule.')
+        schedule = {
+            sentence_id: {
+                'next_review': datetime.fromtimestamp(next_review / 1_000_000),
+                'interval': interval,
+                'last_response': response_names[code]
+            }
+            for sentence_id, next_review, interval, code in zip(
+                schedule_columns['sentence_ids'].tolist(),
+                schedule_columns['next_review'].tolist(),
+                schedule_columns['interval'].tolist(),
+                schedule_columns['last_response'].tolist()
+            )
+        }
+
+        state_data = {
+            'journal_seq': meta.get('journal_seq', 0),
+            'content_manager': {
+                'sentences': SentenceStore.from_columns(group('sentences.'), meta['sentences']),
+                'sources': meta['sources'],
+                'active_sources': meta['active_sources']
+            },
+            'review_system': {
+                'schedule': schedule,
+                'history': ReviewHistory.from_columns(group('history.'), meta['history'])
+            }
+        }
+        if meta.get('time_tracker'):
+            state_data['time_tracker'] = meta['time_tracker']
+        return state_data
+
+    def _write_snapshot_file(self, path, meta, columns):
+        """Write a checksummed snapshot: magic, version, header length, sha256, header, metadata, columns
+
+        The JSON header lists every column's dtype, length and offset so
+        loading is a bulk buffer read per column.
+        """
+        meta_blob = pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL)
+        layout = []
+        offset = len(meta_blob)
+        for name, column in columns.items():
+            column = np.ascontiguousarray(column)
+            padding = -offset % 8  # keep every column aligned for its dtype
+            offset += padding
+            layout.append((name, column, padding, offset))
+            offset += column.nbytes
+
+        header = json.dumps({
+            'meta_length': len(meta_blob),
+            'columns': [
+                {'name': name, 'dtype': column.dtype.str, 'length': len(column), 'offset': column_offset}
+                for name, column, _, column_offset in layout
+            ]
+        }).encode('utf-8')
+
+        sha = hashlib.sha256(header)
+        sha.update(meta_blob)
+        for _, column, padding, _ in layout:
+            sha.update(b'\0' * padding)
+            sha.update(column.data)
+
+        tmp_file = path.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(self.SNAPSHOT_MAGIC)
+            f.write(struct.pack('<IQ', self.SNAPSHOT_VERSION, len(header)))
+            f.write(sha.digest())
+            f.write(header)
+            f.write(meta_blob)
+            for _, column, padding, _ in layout:
+                f.write(b'\0' * padding)
+                f.write(column.data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    def _read_snapshot_file(self, path):
+        """Read and verify a snapshot; returns (version, meta, columns)"""
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        prefix_size = len(self.SNAPSHOT_MAGIC) + struct.calcsize('<IQ')
+        if data[:len(self.SNAPSHOT_MAGIC)] != self.SNAPSHOT_MAGIC:
+            raise ValueError("Not a Neo-Anki snapshot")
+        version, header_length = struct.unpack_from('<IQ', data, len(self.SNAPSHOT_MAGIC))
+        if version > self.SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {version} was written by a newer Neo-Anki")
+
+        body = memoryview(data)[prefix_size + 32:]
+        if hashlib.sha256(body).digest() != data[prefix_size:prefix_size + 32]:
+            raise ValueError("Snapshot checksum mismatch, the file is corrupt")
+
+        header = json.loads(bytes(body[:header_length]).decode('utf-8'))
+        payload = body[header_length:]
+        meta = pickle.loads(payload[:header['meta_length']])
+        columns = {
+            column['name']: np.frombuffer(
+                payload, dtype=np.dtype(column['dtype']),
+                count=column['length'], offset=column['offset']
+            )
+            for column in header['columns']
+        }
+        return version, meta, columns
+
+    def load_state(self):
+        """Load complete application state including content sources"""
+        try:
+            if self.backend == 'sqlite':
+                return self._load_from_store()
+
+            success, message, state_data = self._load_snapshot()
+            if not success:
+                return success, message, state_data
+
+            # File data stays on disk until a batch needs it
+            for source in state_data['content_manager']['active_sources'].values():
+                source['file_data'] = None
+
+            return True, "State loaded successfully", state_data
+
+        except Exception as e:
+            return False, f"Error loading state: {str(e)}", None
+
+    def _load_from_store(self):
+        """Load state from SQLite, leaving sentences, schedule and history in the database"""
+        store = self.open_store()
+
+        if not store.has_data():
+            if not self.snapshot_file.exists() and not self.state_file.exists():
+                return False, "No saved state found", None
+            # Migrate an existing snapshot into the database once
+            success, message, state_data = self._load_snapshot()
+            if not success:
+                return success, message, state_data
+            store.import_state(state_data)
+
+        active_sources = store.get_state('active_sources', {})
+        for source in active_sources.values():
+            source['file_data'] = None
+
+        state_data = {
+            'content_manager': {
+                'sentences': SQLiteSentenceList(store),
+                'sources': store.get_state('sources', {}),
+                'active_sources': active_sources
+            },
+            'review_system': {
+                'schedule': SQLiteScheduleMap(store),
+                'history': SQLiteHistoryList(store)
+            }
+        }
+        time_tracker_state = store.get_state('time_tracker')
+        if time_tracker_state:
+            state_data['time_tracker'] = time_tracker_state
+        return True, "State loaded successfully", state_data
+
+    def _load_snapshot(self):
+        """Load the snapshot, upgrading older layouts, and replay the journal on top of it"""
+        try:
+            if self.snapshot_file.exists():
+                version, meta, columns = self._read_snapshot_file(self.snapshot_file)
+            elif self.state_file.exists():
+                with open(self.state_file, 'rb') as f:
+                    version, meta, columns = 0, {'legacy': pickle.load(f)}, {}
+            else:
+                return False, "No saved state found", None
+
+            while version < self.SNAPSHOT_VERSION:
+                migrate = getattr(self, self.SNAPSHOT_MIGRATIONS[version])
+                meta, columns = migrate(meta, columns)
+                version += 1
+                # Rewrite in the current layout at the next save
+                self.force_checkpoint = True
+
+            state_data = self._decode_snapshot(meta, columns)
+            self.journal_seq = state_data['journal_seq']
+            self._replay_journal(state_data)
+            self.has_base_snapshot = True
+
+            return True, "State loaded successfully", state_data
+
+        except Exception as e:
+            return False, f"Error loading state: {str(e)}", None
+
+    def _migrate_legacy_pickle(self, meta, columns):
+        """Version 0 -> 1: convert the ISO-string pickle snapshot into columns"""
+        state_data = meta['legacy']
+
+        # Deserialize datetime objects in daily_stats
+        if 'time_tracker' in state_data:
+            deserialized_daily_stats = {}
+            for date_str, stats in state_data['time_tracker']['daily_stats'].items():
+                deserialized_stats = stats.copy()
+                deserialized_stats['last_session_start'] = self._deserialize_datetime(
+                    stats['last_session_start']
+                )
+                deserialized_daily_stats[datetime.fromisoformat(date_str).date()] = deserialized_stats
+            state_data['time_tracker']['daily_stats'] = deserialized_daily_stats
+
+            # Deserialize other datetime fields
+            state_data['time_tracker']['last_review_date'] = self._deserialize_datetime(
+                state_data['time_tracker']['last_review_date']
+            )
+            state_data['time_tracker']['last_active_date'] = self._deserialize_datetime(
+                state_data['time_tracker']['last_active_date']
+            )
+
+        # Deserialize sentences
+        for sentence in state_data['content_manager']['sentences']:
+            sentence['created'] = self._deserialize_datetime(sentence['created'])
+
+        # Deserialize active sources
+        for source in state_data['content_manager']['active_sources'].values():
+            source['created_date'] = self._deserialize_datetime(source['created_date'])
+            if source['progress'].get('last_processed'):
+                source['progress']['last_processed'] = self._deserialize_datetime(
+                    source['progress']['last_processed']
+                )
+
+        # Deserialize review system dates
+        for schedule in state_data['review_system']['schedule'].values():
+            schedule['next_review'] = self._deserialize_datetime(schedule['next_review'])
+        for history_item in state_data['review_system']['history']:
+            history_item['timestamp'] = self._deserialize_datetime(history_item['timestamp'])
+
+        # Journal frames written against this snapshot may still carry uuid
+        # ids, so fold them in before the ids are renumbered
+        self.journal_seq = state_data.get('journal_seq', 0)
+        self._replay_journal(state_data)
+        self._migrate_sentence_ids(state_data)
+
+        content_state = state_data['content_manager']
+        review_state = state_data['review_system']
+        meta, columns = self._encode_snapshot(
+            SimpleNamespace(
+                sentences=SentenceStore.from_dicts(
+                    content_state['sentences'],
+                    next_id=content_state.get('next_sentence_id', 1)
+                ),
+                sources=content_state['sources'],
+                active_sources=content_state['active_sources']
+            ),
+            SimpleNamespace(
+                schedule=review_state['schedule'],
+                history=ReviewHistory.from_dicts(review_state['history'])
+            ),
+            None
+        )
+        meta['time_tracker'] = state_data.get('time_tracker')
+        meta['journal_seq'] = self.journal_seq
+        return meta, columns
+
+    def _migrate_add_norm_hash(self, meta, columns):
+        """Version 1 -> 2: add the normalized text hash column used for duplicate checks"""
+        if 'sentences.norm_hash' in columns:
+            return meta, columns  # converted from an older layout by the current encoder
+        joined = columns['sentences.text'].tobytes().decode('utf-8')
+        ends = np.cumsum(columns['sentences.text_lengths']).tolist()
+        columns = dict(columns)
+        columns['sentences.norm_hash'] = np.fromiter(
+            (normalized_text_hash(joined[start:end]) for start, end in zip([0] + ends[:-1], ends)),
+            dtype=np.int64, count=len(ends)
+        )
+        return meta, columns
+
+    def _migrate_sentence_ids(self, state_data):
+        """Renumber legacy uuid sentence ids to integers, following them into schedule and history"""
+        sentences = state_data['content_manager']['sentences']
+        if all(isinstance(s['id'], int) for s in sentences):
+            return
+
+        id_map = {}
+        for new_id, sentence in enumerate(sentences, start=1):
+            id_map[sentence['id']] = new_id
+            sentence['id'] = new_id
+        state_data['content_manager']['next_sentence_id'] = len(sentences) + 1
+
+        review_state = state_data.get('review_system')
+        if review_state:
+            review_state['schedule'] = {
+                id_map[sentence_id]: entry
+                for sentence_id, entry in review_state['schedule'].items()
+                if sentence_id in id_map
+            }
+            for item in review_state['history']:
+                item['sentence_id'] = id_map.get(item['sentence_id'], item['sentence_id'])
+
+        # The old ids only survive in the snapshot and journal, so rewrite them now
+        self.force_checkpoint = True
+
+    def _read_journal(self):
+        """Yield journal frames, stopping at a torn trailing write"""
+        if not self.journal_file.exists():
+            return
+        with open(self.journal_file, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    return
+
+    def _replay_journal(self, state_data):
+        """Apply journal frames newer than the snapshot onto the loaded state"""
+        self.journal_frames = 0
+        sentences_by_id = None
+
+        for frame in self._read_journal():
+            self.journal_frames += 1
+            # Frames already folded into the snapshot are skipped
+            if frame['seq'] <= self.journal_seq:
+                continue
+
+            if sentences_by_id is None:
+                sentences_by_id = {s['id']: s for s in state_data['content_manager']['sentences']}
+            for kind, payload in frame['changes']:
+                self._apply_change(state_data, kind, payload, sentences_by_id)
+
+            state_data['time_tracker'] = frame['time_tracker']
+            self.journal_seq = frame['seq']
+
+    def _apply_change(self, state_data, kind, payload, sentences_by_id):
+        """Apply a single journaled mutation to the loaded state"""
+        content_state = state_data['content_manager']
+        review_state = state_data['review_system']
+
+        if kind == 'sentences_added':
+            for sentence in payload['sentences']:
+                content_state['sentences'].append(sentence)
+                sentences_by_id[sentence['id']] = content_state['sentences'][-1]
+            if payload.get('source_name'):
+                content_state['sources'][payload['source_name']] = payload['source_info']
+        elif kind in ('source_added', 'source_updated'):
+            content_state['active_sources'][payload['id']] = payload
+        elif kind == 'source_removed':
+            content_state['active_sources'].pop(payload['id'], None)
+        elif kind == 'sentences_removed':
+            removed = set(payload['ids'])
+            if isinstance(content_state['sentences'], list):
+                content_state['sentences'][:] = [s for s in content_state['sentences'] if s['id'] not in removed]
+            else:
+                content_state['sentences'].remove(removed)
+            for sentence_id in removed:
+                sentences_by_id.pop(sentence_id, None)
+                review_state['schedule'].pop(sentence_id, None)
+            if isinstance(review_state['history'], list):
+                review_state['history'][:] = [h for h in review_state['history'] if h['sentence_id'] not in removed]
+            else:
+                review_state['history'].remove(removed)
+        elif kind == 'review_recorded':
+            # Content and review changes are journaled as two lists, so a review
+            # of a sentence removed in the same save window replays after the removal
+            sentence = sentences_by_id.get(payload['sentence_id'])
+            if sentence is None:
+                return
+            review_state['schedule'][payload['sentence_id']] = payload['schedule']
+            review_state['history'].append(payload['history'])
+            sentence['status'] = 'reviewed'
+            sentence['reviews'] += 1
+        elif kind == 'reviews_imported':
+            # Review counts and status came with the imported sentences
+            review_state['schedule'].update(
+                (sentence_id, schedule) for sentence_id, schedule in payload['schedule'].items()
+                if sentence_id in sentences_by_id)
+            review_state['history'].extend([h for h in payload['history'] if h['sentence_id'] in sentences_by_id])
+
+    def _create_backup(self):
+        """Create a backup manifest of the current state and content files"""
+        if self.store is None and not self.snapshot_file.exists() and not self.state_file.exists():
+            return
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        files = {}
+
+        if self.store is not None:
+            # Take a consistent copy of the live database before storing it
+            db_copy = self.backup_dir / f"state_{timestamp}.db.tmp"
+            self.store.backup_to(db_copy)
+            files[self.db_file.name] = self._store_backup_object(db_copy, cache=False)
+            db_copy.unlink()
+        else:
+            for snapshot_file in (self.snapshot_file, self.state_file):
+                if snapshot_file.exists():
+                    files[snapshot_file.name] = self._store_backup_object(snapshot_file)
+            if self.journal_file.exists():
+                files[self.journal_file.name] = self._store_backup_object(self.journal_file, cache=False)
+
+        # Content files are stored once per distinct hash
+        if self.content_dir.exists():
+            for root, _, filenames in os.walk(self.content_dir):
+                for filename in filenames:
+                    file_path = Path(root) / filename
+                    arcname = file_path.relative_to(self.storage_path).as_posix()
+                    files[arcname] = self._store_backup_object(file_path)
+
+        manifest = {
+            'created': datetime.now().isoformat(),
+            'backend': self.backend,
+            'files': files
+        }
+        manifest_file = self.backup_dir / f"backup_{timestamp}.json"
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        self._save_hash_cache()
+
+    def _store_backup_object(self, file_path, cache=True):
+        """Copy a file into the content-addressed object store unless already present"""
+        digest, size = self._hash_file(file_path, cache=cache)
+        object_path = self.object_dir / digest[:2] / digest
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = object_path.with_suffix('.tmp')
+            shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, object_path)
+        return {'sha256': digest, 'size': size}
+
+    def _hash_file(self, file_path, cache=True):
+        """SHA-256 of a file, reusing the cached digest while size and mtime are unchanged"""
+        stat = file_path.stat()
+        key = str(file_path)
+        if cache:
+            cached = self._load_hash_cache().get(key)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return cached[2], stat.st_size
+
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        if cache:
+            self._load_hash_cache()[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest, stat.st_size
+
+    def _load_hash_cache(self):
+        if self._hash_cache is None:
+            self._hash_cache = {}
+            if self.hash_cache_file.exists():
+                try:
+                    with open(self.hash_cache_file, 'r', encoding='utf-8') as f:
+                        self._hash_cache = json.load(f)
+                except (OSError, ValueError):
+                    self._hash_cache = {}
+        return self._hash_cache
+
+    def _save_hash_cache(self):
+        if self._hash_cache is None:
+            return
+        # Forget files that no longer exist
+        self._hash_cache = {k: v for k, v in self._hash_cache.items() if os.path.exists(k)}
+        with open(self.hash_cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self._hash_cache, f)
+
+    def _save_content_files(self, active_sources):
+        """Save content files of the given (changed) sources separately from main state"""
+        for source_id, source in active_sources.items():
+            source_dir = self.content_dir / source['type'] / source_id
+            if not source_dir.exists():
+                continue  # removed while the save was queued
+            if source['file_data']:
+                with open(source_dir / 'content.data', 'wb') as f:
+                    f.write(source['file_data'])
+
+            # Save metadata
+            metadata = source.copy()
+            metadata['progress'] = source['progress'].copy()
+            metadata['file_data'] = None  # Don't include file data in metadata
+            metadata['created_date'] = self._serialize_datetime(metadata['created_date'])
+            if metadata['progress'].get('last_processed'):
+                metadata['progress']['last_processed'] = self._serialize_datetime(
+                    metadata['progress']['last_processed']
+                )
+            
+            with open(source_dir / 'metadata.json', 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    def _cleanup_old_backups(self, keep_last_n=5):
+        """Drop old backup manifests and the objects no manifest references any more"""
+        manifests = sorted(self.backup_dir.glob("backup_*.json"))
+        if len(manifests) > keep_last_n:
+            for old_manifest in manifests[:-keep_last_n]:
+                old_manifest.unlink()
+
+            referenced = set()
+            for manifest_file in manifests[-keep_last_n:]:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                referenced.update(entry['sha256'] for entry in manifest['files'].values())
+
+            if self.object_dir.exists():
+                for object_path in self.object_dir.glob("*/*"):
+                    if object_path.name not in referenced:
+                        object_path.unlink()
+
+        # Clean up backups written by older versions (full copies)
+        for pattern in ("state_backup_*.pkl", "state_backup_*.db"):
+            backup_files = sorted(self.backup_dir.glob(pattern))
+            if len(backup_files) > keep_last_n:
+                for old_file in backup_files[:-keep_last_n]:
+                    old_file.unlink()
+                    old_journal = old_file.with_suffix('.journal')
+                    if old_journal.exists():
+                        old_journal.unlink()
+
+        # Archives a download did not get to remove
+        manual_backups = sorted(self.backup_dir.glob("manual_backup_*.zip"))
+        if len(manual_backups) > keep_last_n:
+            for old_backup in manual_backups[:-keep_last_n]:
+                old_backup.unlink()
+
+        content_backups = sorted(self.backup_dir.glob("content_backup_*"))
+        if len(content_backups) > keep_last_n:
+            for old_backup in content_backups[:-keep_last_n]:
+                if old_backup.is_dir():
+                    shutil.rmtree(old_backup)
+
+    def _state_files(self):
+        """Top-level state files owned by the active backend"""
+        return (self.snapshot_file, self.state_file, self.journal_file, self.db_file,
+                self.db_file.with_name(self.db_file.name + '-wal'),
+                self.db_file.with_name(self.db_file.name + '-shm'))
+
+    def create_backup(self):
+        """Write a manual backup archive to backups/ and return its path
+
+        The caller removes it once served; leftovers are rotated with the
+        automatic backups.
+        """
+        pinned_files = []
+        try:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            backup_file = self.backup_dir / f"manual_backup_{timestamp}.zip"
+            writer = ParallelZipWriter(backup_file)
+
+            # Add state file
+            if self.store is not None:
+                db_copy = self.backup_dir / f"manual_backup_{timestamp}.db"
+                pinned_files.append(db_copy)
+                self.store.backup_to(db_copy)
+                writer.add(db_copy, self.db_file.name)
+            else:
+                with self.write_lock:
+                    # Pin the current files so a concurrent checkpoint cannot swap them mid-archive
+                    for state_file in (self.snapshot_file, self.state_file, self.journal_file):
+                        if state_file.exists():
+                            pinned = self.backup_dir / f"manual_backup_{timestamp}_{state_file.name}"
+                            pinned_files.append(pinned)
+                            try:
+                                os.link(state_file, pinned)
+                            except OSError:
+                                shutil.copyfile(state_file, pinned)
+                            writer.add(pinned, state_file.name)
+
+            # Add content files
+            if self.content_dir.exists():
+                for root, _, files in os.walk(self.content_dir):
+                    for file in files:
+                        file_path = Path(root) / file
+                        writer.add(file_path, file_path.relative_to(self.storage_path).as_posix())
+
+            return writer.write()
+        except Exception as e:
+            raise Exception(f"Backup creation failed: {str(e)}")
+        finally:
+            for pinned in pinned_files:
+                if pinned.exists():
+                    pinned.unlink()
+
+    def restore_from_backup(self, backup_file):
+        """Restore system state from a backup archive (path or file object)
+
+        The archive is extracted into a staging directory and verified first;
+        the live files are only swapped out once the staged copy is known to
+        be good, and are put back if the swap fails.
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        staging_dir = self.storage_path / f".restore_{timestamp}"
+        retired_dir = self.storage_path / f".retired_{timestamp}"
+        try:
+            with zipfile.ZipFile(backup_file, 'r') as zipf:
+                names = zipf.namelist()
+                for name in names:
+                    parts = Path(name).parts
+                    if Path(name).is_absolute() or '..' in parts:
+                        return False, f"Unsafe path in backup: {name}"
+                    if parts[0] != self.content_dir.name and name not in {f.name for f in self._state_files()}:
+                        return False, f"Unexpected file in backup: {name}"
+                # Extraction streams every member and checks its CRC
+                zipf.extractall(staging_dir)
+
+            success, message = self._verify_staged_restore(staging_dir)
+            if not success:
+                return False, message
+
+            with self.write_lock:
+                if self.store is not None:
+                    self.store.close()
+                    self.store = None
+
+                retired_dir.mkdir()
+                live_items = [f for f in self._state_files() if f.exists()]
+                if self.content_dir.exists():
+                    live_items.append(self.content_dir)
+                moved = []
+                try:
+                    for item in live_items:
+                        os.replace(item, retired_dir / item.name)
+                        moved.append(item)
+                    for item in staging_dir.iterdir():
+                        os.replace(item, self.storage_path / item.name)
+                except OSError:
+                    # Put the previous state back before giving up
+                    for item in self._state_files():
+                        if item.exists():
+                            item.unlink()
+                    if self.content_dir.exists():
+                        shutil.rmtree(self.content_dir)
+                    for item in moved:
+                        os.replace(retired_dir / item.name, item)
+                    raise
+
+                self.content_dir.mkdir(exist_ok=True)
+                self.has_base_snapshot = False
+                self.journal_seq = 0
+                self.journal_frames = 0
+
+            shutil.rmtree(retired_dir, ignore_errors=True)
+            return True, "Backup restored"
+        except Exception as e:
+            return False, f"Restore failed: {str(e)}"
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _verify_staged_restore(self, staging_dir):
+        """Check that an extracted backup holds a readable state"""
+        snapshot_file = staging_dir / self.snapshot_file.name
+        db_file = staging_dir / self.db_file.name
+        if snapshot_file.exists():
+            # Raises on a checksum mismatch or an unsupported version
+            self._read_snapshot_file(snapshot_file)
+        elif db_file.exists():
+            conn = sqlite3.connect(db_file)
+            try:
+                result = conn.execute("PRAGMA quick_check").fetchone()[0]
+            finally:
+                conn.close()
+            if result != 'ok':
+                return False, f"Backup database is damaged: {result}"
+        elif (staging_dir / self.state_file.name).exists():
+            with open(staging_dir / self.state_file.name, 'rb') as f:
+                pickle.load(f)
+        else:
+            return False, "Backup does not contain a saved state"
+        return True, "Backup verified"
+
+    def _serialize_datetime(self, obj):
+        """Serialize datetime objects"""
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        return obj
+
+    def _deserialize_datetime(self, obj):
+        """Deserialize datetime strings"""
+        if isinstance(obj, str):
+            try:
+                return datetime.fromisoformat(obj)
+            except ValueError:
+                return obj
+        return obj
+
+class BackgroundSaver:
+    """Writes captured state on a background thread, coalescing saves that arrive close together"""
+
+    def __init__(self, state_manager, coalesce_seconds=2.0):
+        self.state_manager = state_manager
+        self.coalesce_seconds = coalesce_seconds
+        self.last_result = None  # (success, message, finished_at)
+        self.busy = False
+        self._queue = []
+        self._failed = None
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, content_manager, review_system, time_tracker, checkpoint=False):
+        """Capture the current state and hand it to the writer thread
+
+        Returns False without queuing anything when nothing changed.
+        """
+        capture = self.state_manager.capture_state(content_manager, review_system, time_tracker, checkpoint)
+        if capture is None:
+            return False
+        with self._cond:
+            self._queue.append(capture)
+            self._cond.notify_all()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="neoanki-saver", daemon=True)
+                self._thread.start()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far has been written"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._queue or self.busy:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending(self):
+        with self._cond:
+            return bool(self._queue) or self.busy
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # Give saves arriving shortly after a chance to join this write
+                deadline = time.monotonic() + self.coalesce_seconds
+                while (remaining := deadline - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                captures, self._queue = self._queue, []
+                if self._failed is not None:
+                    captures.insert(0, self._failed)
+                    self._failed = None
+                self.busy = True
+
+            capture = self.state_manager.merge_captures(captures)
+            success, message = self.state_manager.write_captured(capture)
+
+            with self._cond:
+                if not success:
+                    # Keep the changes so the next save retries them
+                    self._failed = capture
+                self.busy = False
+                self.last_result = (success, message, datetime.now())
+                self._cond.notify_all()
+
+
+class IngestionWorker:
+    """Ingests queued sources chapter by chapter on a background thread
+
+    Each chapter is processed under the user lock, so script runs and the
+    worker take turns on the deck, and progress is checkpointed through
+    source['progress'] plus a background save after every chapter.
+    """
+
+    ACTIVE_STATES = ('queued', 'running', 'paused')
+
+    def __init__(self, user_state):
+        self.user_state = user_state
+        self.jobs = {}  # source_id -> job dict
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def enqueue(self, source_id):
+        """Queue a source for ingestion of all its remaining chapters"""
+        with self._cond:
+            job = self.jobs.get(source_id)
+            if job is not None and job['state'] in self.ACTIVE_STATES:
+                return False
+            self.jobs[source_id] = {
+                'source_id': source_id,
+                'state': 'queued',
+                'processed': 0,
+                'total': 0,
+                'added': 0,
+                'duplicates': 0,
+                'units_done': 0,  # Since the job was last (re)started
+                'started': None,
+                'error': None
+            }
+            self._queue.append(source_id)
+            self._cond.notify_all()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="neoanki-ingest", daemon=True)
+                self._thread.start()
+        return True
+
+    def pause(self, source_id):
+        """Stop after the current chapter; the job keeps its place until resumed"""
+        with self._cond:
+            job = self.jobs.get(source_id)
+            if job is None or job['state'] not in ('queued', 'running'):
+                return False
+            job['state'] = 'paused'
+        return True
+
+    def resume(self, source_id):
+        with self._cond:
+            job = self.jobs.get(source_id)
+            if job is None or job['state'] != 'paused':
+                return False
+            job['state'] = 'queued'
+            self._queue.append(source_id)
+            self._cond.notify_all()
+        return True
+
+    def cancel(self, source_id):
+        """Stop after the current chapter and drop the job; progress so far is kept"""
+        with self._cond:
+            job = self.jobs.get(source_id)
+            if job is None or job['state'] not in self.ACTIVE_STATES:
+                return False
+            job['state'] = 'cancelled'
+        return True
+
+    def status(self, source_id):
+        """Snapshot of a job with throughput (units/s) and ETA (seconds), or None"""
+        with self._cond:
+            job = self.jobs.get(source_id)
+            if job is None:
+                return None
+            job = dict(job)
+        rate = None
+        if job['state'] == 'running' and job['started'] is not None and job['units_done']:
+            rate = job['units_done'] / max(time.monotonic() - job['started'], 1e-6)
+        job['rate'] = rate
+        job['eta'] = (job['total'] - job['processed']) / rate if rate else None
+        return job
+
+    def stop(self):
+        """Let the thread exit after its current chapter; does not wait for it"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                source_id = self._queue.popleft()
+                job = self.jobs[source_id]
+                if job['state'] != 'queued':
+                    continue
+                job['state'] = 'running'
+                job['started'] = time.monotonic()
+                job['units_done'] = 0
+            try:
+                self._ingest(job)
+            except Exception as e:
+                self._finish(job, 'failed', str(e))
+
+    def _keep_running(self, job):
+        with self._cond:
+            return not self._stopped and job['state'] == 'running'
+
+    def _finish(self, job, state, error=None):
+        with self._cond:
+            if job['state'] == 'running':
+                job['state'] = state
+                job['error'] = error
+
+    def _ingest(self, job):
+        user_state = self.user_state
+        content_manager = user_state.content_manager
+        source_id = job['source_id']
+
+        # Building the chapter index only touches files, so it runs unlocked
+        job['total'] = content_manager.prepare_source(source_id)
+        if not job['total']:
+            return self._finish(job, 'done')
+
+        while self._keep_running(job):
+            with user_state.lock:
+                if user_state.evicted:
+                    return self._finish(job, 'cancelled', "Deck was unloaded; progress so far is kept")
+                source = content_manager.active_sources.get(source_id)
+                if source is None:
+                    return self._finish(job, 'failed', "Source was removed")
+                progress = source['progress']
+                if source['type'] == 'epub' and progress['total_units'] and \
+                        progress['current_position'] >= progress['total_units']:
+                    return self._finish(job, 'done')
+
+                added, duplicates, error = content_manager.process_source_content(source_id, batch_size=1)
+                if error:
+                    return self._finish(job, 'failed', error)
+                user_state.saver.submit(content_manager, user_state.review_system, user_state.time_tracker)
+
+                with self._cond:
+                    job['added'] += added
+                    job['duplicates'] += duplicates
+                    job['units_done'] += 1
+                    job['processed'] = progress['processed_units'] if source['type'] == 'epub' else 1
+                    job['total'] = progress['total_units'] or job['total']
+                if source['type'] != 'epub':
+                    return self._finish(job, 'done')
+        # Stopped rather than paused or cancelled (a no-op for those)
+        self._finish(job, 'cancelled', "Ingestion stopped; progress so far is kept")
+
+
+class UrlFetcher:
+    """Pooled HTTP client for article ingestion
+
+    One keep-alive session is shared by a bounded thread pool. Every request
+    has a timeout, transient failures are retried, and fetch() sends
+    ETag/Last-Modified validators so unchanged pages come back as a 304.
+    """
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+    def __init__(self, max_workers=8, timeout=(5, 30)):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = self.USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                              allowed_methods=('GET',))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neoanki-fetch")
+
+    def fetch(self, url, etag=None, last_modified=None):
+        """GET a page, conditionally when validators from an earlier fetch are given"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return {'url': response.url, 'not_modified': True, 'html': None,
+                    'etag': etag, 'last_modified': last_modified}
+        response.raise_for_status()
+        if 'charset' not in response.headers.get('Content-Type', ''):
+            # requests assumes Latin-1 for text/* without a charset, which garbles Japanese
+            response.encoding = response.apparent_encoding
+        return {
+            'url': response.url,
+            'not_modified': False,
+            'html': response.text,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+    def map(self, func, items):
+        """Run func over items on the pool; returns (result, error) pairs in input order"""
+        def call(item):
+            try:
+                return func(item), None
+            except Exception as e:
+                return None, e
+        return list(self.executor.map(call, items))
+
+    def fetch_many(self, urls):
+        return self.map(self.fetch, urls)
+
+    def feed_links(self, feed_url):
+        """Article links of an RSS or Atom feed, in feed order"""
+        response = self.session.get(feed_url, timeout=self.timeout)
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+
+        links = []
+        for element in root.iter():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'item':  # RSS
+                link = next((child.text for child in element if child.tag.rsplit('}', 1)[-1] == 'link'), None)
+            elif tag == 'entry':  # Atom
+                link = next((child.get('href') for child in element
+                             if child.tag.rsplit('}', 1)[-1] == 'link'
+                             and child.get('rel', 'alternate') == 'alternate'), None)
+            else:
+                continue
+            if link and link.strip() not in links:
+                links.append(link.strip())
+        return links
+
+
+class SQLiteStateStore:
+    """SQLite storage engine for sentences, schedule and review history"""
+
+    SCHEMA_VERSION = 3
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sentences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            created REAL,
+            difficulty REAL,
+            reviews INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'new',
+            source TEXT,
+            norm_hash INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_sentences_source ON sentences(source);
+        CREATE INDEX IF NOT EXISTS idx_sentences_norm_hash ON sentences(norm_hash);
+
+        CREATE TABLE IF NOT EXISTS schedule (
+            sentence_id INTEGER PRIMARY KEY,
+            next_review REAL NOT NULL,
+            interval REAL,
+            last_response TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_schedule_next_review ON schedule(next_review);
+
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sentence_id INTEGER NOT NULL,
+            response TEXT,
+            timestamp REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_history_sentence ON history(sentence_id);
+
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value BLOB
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        # One connection per session; the lock serializes access from other threads
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        has_tables = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sentences'"
+        ).fetchone() is not None
+        if has_tables and version < 2:
+            self._migrate_integer_ids()
+        if has_tables and version < 3:
+            self._migrate_norm_hash()
+
+        self.conn.executescript(self.SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def _migrate_integer_ids(self):
+        """Schema 1 -> 2: replace uuid sentence ids with their insertion sequence number"""
+        self.conn.executescript("""
+            DROP INDEX IF EXISTS idx_sentences_source;
+            DROP INDEX IF EXISTS idx_schedule_next_review;
+            DROP INDEX IF EXISTS idx_history_timestamp;
+            ALTER TABLE sentences RENAME TO sentences_v1;
+            ALTER TABLE schedule RENAME TO schedule_v1;
+            ALTER TABLE history RENAME TO history_v1;
+        """ + self.SCHEMA + """
+            INSERT INTO sentences (id, text, created, difficulty, reviews, status, source)
+                SELECT seq, text, created, difficulty, reviews, status, source
+                FROM sentences_v1 ORDER BY seq;
+            INSERT INTO schedule (sentence_id, next_review, interval, last_response)
+                SELECT s.seq, o.next_review, o.interval, o.last_response
+                FROM schedule_v1 o JOIN sentences_v1 s ON s.id = o.sentence_id;
+            INSERT INTO history (sentence_id, response, timestamp)
+                SELECT s.seq, h.response, h.timestamp
+                FROM history_v1 h JOIN sentences_v1 s ON s.id = h.sentence_id ORDER BY h.id;
+            DROP TABLE sentences_v1;
+            DROP TABLE schedule_v1;
+            DROP TABLE history_v1;
+        """)
+
+    def _migrate_norm_hash(self):
+        """Schema 2 -> 3: add and fill the normalized text hash used for duplicate checks"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sentences)")]
+        if 'norm_hash' not in columns:
+            self.conn.execute("ALTER TABLE sentences ADD COLUMN norm_hash INTEGER")
+        rows = self.conn.execute("SELECT id, text FROM sentences WHERE norm_hash IS NULL").fetchall()
+        self.conn.executemany(
+            "UPDATE sentences SET norm_hash = ? WHERE id = ?",
+            [(normalized_text_hash(text), sentence_id) for sentence_id, text in rows]
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _to_epoch(value):
+        return value.timestamp() if isinstance(value, datetime) else value
+
+    @staticmethod
+    def _from_epoch(value):
+        return datetime.fromtimestamp(value) if value is not None else None
+
+    def _sentence_from_row(self, row):
+        return {
+            'id': row[0],
+            'text': row[1],
+            'created': self._from_epoch(row[2]),
+            'difficulty': row[3],
+            'reviews': row[4],
+            'next_review': None,
+            'status': row[5],
+            'source': row[6]
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def has_data(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM state LIMIT 1").fetchone() is not None
+
+    def backup_to(self, path):
+        """Write a consistent copy of the database to path"""
+        with self.lock:
+            target = sqlite3.connect(str(path))
+            try:
+                self.conn.backup(target)
+            finally:
+                target.close()
+
+    # Small state (sources, time tracker) is kept as pickled blobs
+    def get_state(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def put_state(self, key, value):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                (key, pickle.dumps(value))
+            )
+
+    # Sentences
+    def count_sentences(self, status=None):
+        with self.lock:
+            if status is None:
+                return self.conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM sentences WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def insert_sentences(self, sentences):
+        """Insert sentence dicts; those without an id get the next row id assigned"""
+        with self.lock:
+            for s in sentences:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO sentences "
+                    "(id, text, created, difficulty, reviews, status, source, norm_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (s.get('id') if isinstance(s.get('id'), int) else None, s['text'],
+                     self._to_epoch(s['created']), s['difficulty'],
+                     s.get('reviews', 0), s.get('status', 'new'), s.get('source'),
+                     normalized_text_hash(s['text']))
+                )
+                if not isinstance(s.get('id'), int):
+                    s['id'] = cursor.lastrowid
+
+    def iter_sentences(self, where="", params=(), batch_size=1000):
+        """Stream sentences in insertion order without loading the whole table"""
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT id, text, created, difficulty, reviews, status, source FROM sentences "
+                    f"WHERE id > ? {where} ORDER BY id LIMIT ?",
+                    (last_id, *params, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._sentence_from_row(row)
+            last_id = rows[-1][0]
+
+    def get_sentence(self, sentence_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, text, created, difficulty, reviews, status, source FROM sentences WHERE id = ?",
+                (sentence_id,)
+            ).fetchone()
+        return self._sentence_from_row(row) if row else None
+
+    def mark_reviewed(self, sentence_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE sentences SET status = 'reviewed', reviews = reviews + 1 WHERE id = ?",
+                (sentence_id,)
+            )
+
+    def get_new_sentences(self, limit):
+        """Sentences that have never been scheduled"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, text, created, difficulty, reviews, status, source FROM sentences s "
+                "WHERE NOT EXISTS (SELECT 1 FROM schedule WHERE sentence_id = s.id) "
+                "ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._sentence_from_row(row) for row in rows]
+
+    def search_sentences(self, query):
+        return list(self.iter_sentences("AND instr(lower(text), lower(?)) > 0", (query,)))
+
+    def find_text(self, text):
+        """Id of a sentence with the same normalized text, or None (index lookup)"""
+        normalized = normalize_sentence_text(text)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, text FROM sentences WHERE norm_hash = ? ORDER BY id", (normalized_text_hash(text),)
+            ).fetchall()
+        return next((row[0] for row in rows if normalize_sentence_text(row[1]) == normalized), None)
+
+    def contains_text(self, text):
+        return self.find_text(text) is not None
+
+    def sentence_hashes(self, batch_size=10000):
+        """Ids and normalized text hashes of every sentence as two int64 arrays"""
+        ids, hashes = [], []
+        with self.lock:
+            cursor = self.conn.execute("SELECT id, norm_hash FROM sentences ORDER BY id")
+            while rows := cursor.fetchmany(batch_size):
+                block = np.array(rows, dtype=np.int64)
+                ids.append(block[:, 0])
+                hashes.append(block[:, 1])
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(ids), np.concatenate(hashes)
+
+    def delete_sentences(self, sentence_ids):
+        """Delete sentences with their schedule and history rows in one transaction"""
+        params = [(i,) for i in sentence_ids]
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM sentences WHERE id = ?", params)
+            self.conn.executemany("DELETE FROM schedule WHERE sentence_id = ?", params)
+            self.conn.executemany("DELETE FROM history WHERE sentence_id = ?", params)
+
+    def count_by_source(self):
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT source, COUNT(*) FROM sentences GROUP BY source"
+            ).fetchall())
+
+    def average_difficulty(self):
+        with self.lock:
+            return self.conn.execute("SELECT AVG(difficulty) FROM sentences").fetchone()[0] or 0
+
+    def difficulty_histogram(self, bins=10):
+        """Counts of sentences per difficulty bucket between 0 and 5"""
+        width = 5 / bins
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT MIN(CAST(difficulty / ? AS INTEGER), ? - 1) AS bucket, COUNT(*) "
+                "FROM sentences GROUP BY bucket",
+                (width, bins)
+            ).fetchall()
+        counts = [0] * bins
+        for bucket, count in rows:
+            counts[max(0, bucket)] += count
+        return counts, [i * width for i in range(bins + 1)]
+
+    def filter_by_status(self, status):
+        return list(self.iter_sentences("AND status = ?", (status,)))
+
+    # Schedule
+    def get_schedule(self, sentence_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT next_review, interval, last_response FROM schedule WHERE sentence_id = ?",
+                (sentence_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'next_review': self._from_epoch(row[0]), 'interval': row[1], 'last_response': row[2]}
+
+    def put_schedule(self, sentence_id, schedule):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO schedule (sentence_id, next_review, interval, last_response) "
+                "VALUES (?, ?, ?, ?)",
+                (sentence_id, self._to_epoch(schedule['next_review']),
+                 schedule['interval'], schedule['last_response'])
+            )
+
+    def put_schedules(self, schedule):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO schedule (sentence_id, next_review, interval, last_response) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (k, self._to_epoch(v['next_review']), v['interval'], v['last_response'])
+                    for k, v in schedule.items()
+                ]
+            )
+
+    def delete_schedule(self, sentence_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM schedule WHERE sentence_id = ?", (sentence_id,))
+
+    def count_schedule(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0]
+
+    def iter_schedule(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT sentence_id, next_review, interval, last_response FROM schedule"
+            ).fetchall()
+        for row in rows:
+            yield row[0], {
+                'next_review': self._from_epoch(row[1]),
+                'interval': row[2],
+                'last_response': row[3]
+            }
+
+    def get_due_sentence_ids(self, now, limit=None):
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT sentence_id FROM schedule WHERE next_review <= ? ORDER BY next_review LIMIT ?",
+                (self._to_epoch(now), -1 if limit is None else limit)
+            )]
+
+    def count_due(self, now):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM schedule WHERE next_review <= ?", (self._to_epoch(now),)
+            ).fetchone()[0]
+
+    def get_upcoming(self, limit):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT sentence_id, next_review FROM schedule ORDER BY next_review LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row[0], self._from_epoch(row[1])) for row in rows]
+
+    # History
+    def add_history(self, items):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO history (sentence_id, response, timestamp) VALUES (?, ?, ?)",
+                [(h['sentence_id'], h['response'], self._to_epoch(h['timestamp'])) for h in items]
+            )
+
+    def count_history(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def iter_history(self, batch_size=1000):
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT id, sentence_id, response, timestamp FROM history "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {'sentence_id': row[1], 'response': row[2], 'timestamp': self._from_epoch(row[3])}
+            last_id = rows[-1][0]
+
+    def reviews_by_day(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT date(timestamp, 'unixepoch', 'localtime') AS day, COUNT(*) FROM history "
+                "GROUP BY day ORDER BY day"
+            ).fetchall()
+        return {date.fromisoformat(day): count for day, count in rows}
+
+    def import_state(self, state_data):
+        """Bulk load a deserialized pickle snapshot into the database"""
+        with self.lock:
+            self.insert_sentences(state_data['content_manager']['sentences'].rows())
+            self.put_schedules(state_data['review_system']['schedule'])
+            self.add_history(state_data['review_system']['history'])
+            self.put_state('sources', state_data['content_manager']['sources'])
+            self.put_state('active_sources', state_data['content_manager']['active_sources'])
+            # Older and partial snapshots may have no time tracker
+            if state_data.get('time_tracker') is not None:
+                self.put_state('time_tracker', state_data['time_tracker'])
+            self.conn.commit()
+
+
+class SQLiteSentenceList:
+    """List-like view of the sentences table used in place of ContentManager.sentences"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count_sentences()
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return self.store.iter_sentences()
+
+    def append(self, sentence):
+        self.store.insert_sentences([sentence])
+        return sentence['id']
+
+    def extend(self, sentences):
+        self.store.insert_sentences(sentences)
+
+    # Queries, shared with SentenceStore
+    def get_by_id(self, sentence_id):
+        return self.store.get_sentence(sentence_id)
+
+    def mark_reviewed(self, sentence_id):
+        self.store.mark_reviewed(sentence_id)
+
+    def count_by_status(self, status):
+        return self.store.count_sentences(status)
+
+    def filter_by_status(self, status):
+        return self.store.filter_by_status(status)
+
+    def count_by_source(self):
+        return self.store.count_by_source()
+
+    def average_difficulty(self):
+        return self.store.average_difficulty()
+
+    def difficulty_histogram(self, bins=10):
+        return self.store.difficulty_histogram(bins)
+
+    def new_sentences(self, schedule, limit=5):
+        return self.store.get_new_sentences(limit)
+
+    def search(self, query):
+        return self.store.search_sentences(query)
+
+    def contains_text(self, text):
+        return self.store.contains_text(text)
+
+    def find_text(self, text):
+        return self.store.find_text(text)
+
+    def id_hashes(self):
+        return self.store.sentence_hashes()
+
+    def remove(self, sentence_ids):
+        self.store.delete_sentences(sentence_ids)
+
+
+class SQLiteScheduleMap(MutableMapping):
+    """Dict-like view of the schedule table used in place of ReviewSystem.schedule"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, sentence_id):
+        schedule = self.store.get_schedule(sentence_id)
+        if schedule is None:
+            raise KeyError(sentence_id)
+        return schedule
+
+    def __setitem__(self, sentence_id, schedule):
+        self.store.put_schedule(sentence_id, schedule)
+
+    def __delitem__(self, sentence_id):
+        self.store.delete_schedule(sentence_id)
+
+    def __contains__(self, sentence_id):
+        return self.store.get_schedule(sentence_id) is not None
+
+    def __iter__(self):
+        return (sentence_id for sentence_id, _ in self.store.iter_schedule())
+
+    def __len__(self):
+        return self.store.count_schedule()
+
+    def items(self):
+        return self.store.iter_schedule()
+
+
+class SQLiteHistoryList:
+    """List-like view of the history table used in place of ReviewSystem.history"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count_history()
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return self.store.iter_history()
+
+    def append(self, item):
+        self.store.add_history([item])
+
+    def reviews_by_day(self):
+        return self.store.reviews_by_day()
+
+
+def normalize_sentence_text(text):
+    """Canonical form used to detect duplicate sentences"""
+    return unicodedata.normalize('NFKC', text.strip())
+
+
+def normalized_text_hash(text):
+    """Stable signed 64-bit hash of the normalized text (Python's hash() is salted per process)"""
+    digest = hashlib.blake2b(normalize_sentence_text(text).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of sentences over character n-grams
+
+    Sentences are reduced to the set of character trigrams of their
+    normalized text without punctuation. Each gets a MinHash signature split
+    into bands, and sentences sharing any band become candidates. Candidates
+    are confirmed with the exact Jaccard similarity of their texts, looked up
+    through text_of(key), so lookups touch a handful of sentences instead of
+    the whole deck and the index holds no text of its own.
+
+    Band keys live in one sorted NumPy array of 32-bit keys and row numbers;
+    rows added since the last merge wait in a small dict. Removed rows are
+    only flagged dead. With a log path every added row is appended to that
+    file, so the next process reloads the index with load() and computes
+    signatures only for the sentences the log does not cover.
+    """
+
+    DEFAULT_THRESHOLD = 0.9
+    NGRAM = 3
+    NUM_PERM = 64
+    BANDS = 16
+    PRIME = 4294967311  # Smallest prime above 2**32
+    STRIP = re.compile(r'[\W_]+')
+    MERGE_ROWS = 4096  # Pending rows merged into the sorted arrays at once
+    SIGNATURE_BATCH = 256  # Texts hashed per NumPy pass
+    PENDING_ROW_BYTES = 16 * 100  # Rough dict cost of one pending row
+    LOG_NAME = 'near_duplicates.v1.bin'  # Bump when the shingles or hashing change
+    RECORD = np.dtype([('key', '<i8'), ('text_hash', '<i8'), ('bands', '<u4', (BANDS,))])
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, text_of=None, log_path=None, seed=1):
+        self.threshold = threshold
+        self.text_of = text_of
+        self.log_path = log_path
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**31, size=self.NUM_PERM, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=self.NUM_PERM, dtype=np.uint64)
+        self._band_seeds = rng.integers(1, 2**63, size=self.BANDS, dtype=np.uint64)
+        self._rows = self.NUM_PERM // self.BANDS
+        self._keys = np.zeros(1024, dtype=np.int64)  # row -> key
+        self._live = np.zeros(1024, dtype=bool)
+        self._size = 0
+        self._live_count = 0
+        self._max_key = None
+        self._sorted_bands = np.zeros(0, dtype=np.uint32)
+        self._sorted_rows = np.zeros(0, dtype=np.int32)
+        self._pending = defaultdict(list)  # band key -> rows not merged yet
+        self._pending_rows = 0
+
+    def __len__(self):
+        return self._live_count
+
+    def _shingles(self, text):
+        text = self.STRIP.sub('', normalize_sentence_text(text))
+        if len(text) <= self.NGRAM:
+            return {text}
+        return {text[i:i + self.NGRAM] for i in range(len(text) - self.NGRAM + 1)}
+
+    def band_keys(self, texts):
+        """(len(texts), BANDS) array of 32-bit band keys, stable across processes"""
+        bands = np.empty((len(texts), self.BANDS), dtype=np.uint32)
+        for start in range(0, len(texts), self.SIGNATURE_BATCH):
+            shingle_sets = [self._shingles(text) for text in texts[start:start + self.SIGNATURE_BATCH]]
+            counts = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+            values = np.fromiter((zlib.crc32(s.encode('utf-8')) for shingles in shingle_sets for s in shingles),
+                                 dtype=np.uint64, count=int(counts.sum()))
+            hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) % self.PRIME
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            signatures = np.minimum.reduceat(hashed, offsets, axis=1).T
+            signatures = signatures.reshape(len(shingle_sets), self.BANDS, self._rows)
+            keys = np.broadcast_to(self._band_seeds, signatures.shape[:2]).copy()
+            for row in range(self._rows):
+                keys = (keys ^ signatures[:, :, row]) * np.uint64(0x100000001B3)
+            keys ^= keys >> np.uint64(32)
+            bands[start:start + len(shingle_sets)] = keys & np.uint64(0xFFFFFFFF)
+        return bands
+
+    @staticmethod
+    def similarity(left, right):
+        return len(left & right) / len(left | right) if left or right else 1.0
+
+    def _grow(self, needed):
+        if needed <= len(self._keys):
+            return
+        capacity = max(needed, len(self._keys) * 2)
+        self._keys = np.resize(self._keys, capacity)
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._live = live
+
+    def _append(self, keys, bands):
+        """Index rows whose band keys are already computed"""
+        count = len(keys)
+        if not count:
+            return
+        self._grow(self._size + count)
+        rows = np.arange(self._size, self._size + count, dtype=np.int32)
+        self._keys[self._size:self._size + count] = keys
+        self._live[self._size:self._size + count] = True
+        self._size += count
+        self._live_count += count
+        top = int(keys.max())
+        self._max_key = top if self._max_key is None else max(self._max_key, top)
+        if count >= self.MERGE_ROWS:
+            self._merge(bands.ravel(), np.repeat(rows, self.BANDS))
+            return
+        for row, row_bands in zip(rows.tolist(), bands.tolist()):
+            for band_key in row_bands:
+                self._pending[band_key].append(row)
+        self._pending_rows += count
+        if self._pending_rows >= self.MERGE_ROWS:
+            self._merge()
+
+    def _merge(self, band_keys=None, rows=None):
+        """Fold the pending rows (and any given ones) into the sorted arrays"""
+        if self._pending_rows:
+            pending_keys = np.fromiter((key for key, bucket in self._pending.items() for _ in bucket),
+                                       dtype=np.uint32)
+            pending_rows = np.fromiter((row for bucket in self._pending.values() for row in bucket),
+                                       dtype=np.int32, count=len(pending_keys))
+            if band_keys is not None:
+                pending_keys = np.concatenate((pending_keys, band_keys))
+                pending_rows = np.concatenate((pending_rows, rows))
+            band_keys, rows = pending_keys, pending_rows
+            self._pending.clear()
+            self._pending_rows = 0
+        if band_keys is None or not len(band_keys):
+            return
+        order = np.argsort(band_keys, kind='stable')
+        band_keys, rows = band_keys[order], rows[order]
+        sorted_bands, sorted_rows = self._sorted_bands, self._sorted_rows
+        if self._live_count < self._size // 2:
+            # Mostly dead rows: drop their band entries while rewriting anyway
+            alive = self._live[sorted_rows]
+            sorted_bands, sorted_rows = sorted_bands[alive], sorted_rows[alive]
+        at = np.searchsorted(sorted_bands, band_keys)
+        self._sorted_bands = np.insert(sorted_bands, at, band_keys)
+        self._sorted_rows = np.insert(sorted_rows, at, rows)
+
+    def add_many(self, keys, texts, bands=None):
+        """Index sentences by key; keys already present are replaced
+
+        bands may carry the texts' band_keys() when the caller already has them.
+        """
+        if not len(keys):
+            return
+        keys = np.asarray(keys, dtype=np.int64)
+        if self._max_key is not None and int(keys.min()) <= self._max_key:
+            self.remove_many(keys)
+        if bands is None:
+            bands = self.band_keys(texts)
+        self._append(keys, bands)
+        if self.log_path is not None:
+            records = np.zeros(len(keys), dtype=self.RECORD)
+            records['key'] = keys
+            records['text_hash'] = [normalized_text_hash(text) for text in texts]
+            records['bands'] = bands
+            with open(self.log_path, 'ab') as f:
+                records.tofile(f)
+
+    def add(self, key, text):
+        self.add_many([key], [text])
+
+    def remove_many(self, keys):
+        if not self._live_count:
+            return
+        n = self._size
+        dead = self._live[:n] & np.isin(self._keys[:n], np.asarray(keys, dtype=np.int64))
+        self._live[:n][dead] = False
+        self._live_count -= int(dead.sum())
 
-    def save_state(self, content_manager, review_system, time_tracker):
-        """Save complete application state including content sources"""
-        try:
-            # Serialize datetime objects in daily_stats
-            serialized_daily_stats = {}
-            for date_key, stats in time_tracker.daily_stats.items():
-                serialized_stats = stats.copy()
-                serialized_stats['last_session_start'] = self._serialize_datetime(stats['last_session_start'])
-                serialized_daily_stats[self._serialize_datetime(date_key)] = serialized_stats
-
-            # Serialize active sources
-            serialized_sources = {}
-            for source_id, source in content_manager.active_sources.items():
-                serialized_source = source.copy()
-                serialized_source['created_date'] = self._serialize_datetime(source['created_date'])
-                if source['progress'].get('last_processed'):
-                    serialized_source['progress']['last_processed'] = self._serialize_datetime(
-                        source['progress']['last_processed']
-                    )
-                # Don't serialize file_data in main state
-                serialized_source['file_data'] = None
-                serialized_sources[source_id] = serialized_source
-
-            state_data = {
-                'timestamp': datetime.now().isoformat(),
-                'content_manager': {
-                    'sentences': [
-                        {**s, 'created': self._serialize_datetime(s['created'])}
-                        for s in content_manager.sentences
-                    ],
-                    'sources': content_manager.sources,
-                    'active_sources': serialized_sources
-                },
-                'review_system': {
-                    'schedule': {
-                        k: {
-                            'next_review': self._serialize_datetime(v['next_review']),
-                            'interval': v['interval'],
-                            'last_response': v['last_response']
-                        }
-                        for k, v in review_system.schedule.items()
-                    },
-                    'history': [
-                        {
-                            'sentence_id': h['sentence_id'],
-                            'response': h['response'],
-                            'timestamp': self._serialize_datetime(h['timestamp'])
-                        }
-                        for h in review_system.history
-                    ]
-                },
-                'time_tracker': {
-                    'last_review_date': self._serialize_datetime(time_tracker.last_review_date),
-                    'study_sessions': time_tracker.study_sessions,
-                    'daily_stats': serialized_daily_stats,
-                    'streak_count': time_tracker.streak_count,
-                    'last_active_date': self._serialize_datetime(time_tracker.last_active_date)
-                }
-            }
+    def remove(self, key):
+        self.remove_many([key])
 
-            # Create backup first
-            self._create_backup()
+    def _candidates(self, bands):
+        """Live rows sharing at least one band key"""
+        rows = set()
+        starts = np.searchsorted(self._sorted_bands, bands, 'left').tolist()
+        ends = np.searchsorted(self._sorted_bands, bands, 'right').tolist()
+        for start, end in zip(starts, ends):
+            if end > start:
+                rows.update(self._sorted_rows[start:end].tolist())
+        for band_key in bands.tolist():
+            rows.update(self._pending.get(band_key, ()))
+        return sorted(row for row in rows if self._live[row])
 
-            # Save current state
-            with open(self.state_file, 'wb') as f:
-                pickle.dump(state_data, f)
+    def find(self, text, threshold=None, bands=None):
+        """Key of the most similar indexed sentence at or above the threshold, or None"""
+        if not self._live_count:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        shingles = self._shingles(text)
+        best_key, best_score = None, threshold
+        if bands is None:
+            bands = self.band_keys([text])[0]
+        for row in self._candidates(bands):
+            key = int(self._keys[row])
+            score = self.similarity(shingles, self._shingles(self.text_of(key)))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
 
-            # Save content files separately
-            self._save_content_files(content_manager.active_sources)
+    def clusters(self, threshold=None):
+        """Groups of keys whose sentences are near-duplicates of one another"""
+        threshold = self.threshold if threshold is None else threshold
+        self._merge()
+        alive = self._live[self._sorted_rows]
+        band_keys, rows = self._sorted_bands[alive], self._sorted_rows[alive]
+        if not len(band_keys):
+            return []
+        boundaries = np.flatnonzero(band_keys[1:] != band_keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(band_keys)]))
+        shared = ends - starts > 1
 
-            self._cleanup_old_backups()
-            return True, "State saved successfully"
+        parent = {}
 
-        except Exception as e:
-            return False, f"Error saving state: {str(e)}"
+        def root(row):
+            parent.setdefault(row, row)
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
 
-    def load_state(self):
-        """Load complete application state including content sources"""
+        shingles = {}
+        for start, end in zip(starts[shared].tolist(), ends[shared].tolist()):
+            bucket = rows[start:end].tolist()
+            for i, left in enumerate(bucket):
+                for right in bucket[i + 1:]:
+                    if root(left) == root(right):
+                        continue
+                    for row in (left, right):
+                        if row not in shingles:
+                            shingles[row] = self._shingles(self.text_of(int(self._keys[row])))
+                    if self.similarity(shingles[left], shingles[right]) >= threshold:
+                        parent[root(right)] = root(left)
+
+        groups = defaultdict(list)
+        for row in parent:
+            groups[root(row)].append(int(self._keys[row]))
+        return [keys for keys in groups.values() if len(keys) > 1]
+
+    def memory_usage(self):
+        """Approximate bytes held by the index"""
+        arrays = (self._keys, self._live, self._sorted_bands, self._sorted_rows)
+        return sum(array.nbytes for array in arrays) + self._pending_rows * self.PENDING_ROW_BYTES
+
+    @classmethod
+    def _read_log(cls, log_path):
         try:
-            if not self.state_file.exists():
-                return False, "No saved state found", None
+            size = os.path.getsize(log_path)
+        except OSError:
+            return np.zeros(0, dtype=cls.RECORD)
+        # A torn final record from an interrupted append is ignored
+        return np.fromfile(log_path, dtype=cls.RECORD, count=size // cls.RECORD.itemsize)
 
-            with open(self.state_file, 'rb') as f:
-                state_data = pickle.load(f)
+    @classmethod
+    def load(cls, log_path, ids, text_hashes, threshold=DEFAULT_THRESHOLD, text_of=None):
+        """Index over the logged rows that still match the deck
 
-            # Deserialize datetime objects in daily_stats
-            if 'time_tracker' in state_data:
-                deserialized_daily_stats = {}
-                for date_str, stats in state_data['time_tracker']['daily_stats'].items():
-                    deserialized_stats = stats.copy()
-                    deserialized_stats['last_session_start'] = self._deserialize_datetime(
-                        stats['last_session_start']
-                    )
-                    deserialized_daily_stats[datetime.fromisoformat(date_str).date()] = deserialized_stats
-                state_data['time_tracker']['daily_stats'] = deserialized_daily_stats
+        ids and text_hashes describe the current sentences. Logged rows whose
+        sentence is gone or whose text changed are dropped (and the log is
+        compacted once they dominate it). Returns the index and the ids it
+        does not cover yet, which the caller adds with add_many().
+        """
+        index = cls(threshold, text_of, log_path)
+        ids = np.asarray(ids, dtype=np.int64)
+        text_hashes = np.asarray(text_hashes, dtype=np.int64)
+        records = cls._read_log(log_path)
+        logged = len(records)
+        if logged and len(ids):
+            # The last row logged for a key wins
+            _, last = np.unique(records['key'][::-1], return_index=True)
+            records = records[logged - 1 - last]
+            order = np.argsort(ids)
+            at = np.minimum(np.searchsorted(ids, records['key'], sorter=order), len(ids) - 1)
+            matched = order[at]
+            records = records[(ids[matched] == records['key'])
+                              & (text_hashes[matched] == records['text_hash'])]
+        else:
+            records = records[:0]
+        if logged > 2 * len(records) + cls.MERGE_ROWS:
+            tmp_path = Path(log_path).with_suffix('.tmp')
+            records.tofile(tmp_path)
+            os.replace(tmp_path, log_path)
+        index._append(records['key'], records['bands'])
+        return index, ids[~np.isin(ids, records['key'])]
 
-                # Deserialize other datetime fields
-                state_data['time_tracker']['last_review_date'] = self._deserialize_datetime(
-                    state_data['time_tracker']['last_review_date']
-                )
-                state_data['time_tracker']['last_active_date'] = self._deserialize_datetime(
-                    state_data['time_tracker']['last_active_date']
-                )
 
-            # Deserialize content manager dates and sources
-            if 'content_manager' in state_data:
-                # Deserialize sentences
-                for sentence in state_data['content_manager']['sentences']:
-                    sentence['created'] = self._deserialize_datetime(sentence['created'])
-
-                # Deserialize active sources
-                active_sources = state_data['content_manager']['active_sources']
-                for source_id, source in active_sources.items():
-                    source['created_date'] = self._deserialize_datetime(source['created_date'])
-                    if source['progress'].get('last_processed'):
-                        source['progress']['last_processed'] = self._deserialize_datetime(
-                            source['progress']['last_processed']
-                        )
-                    # Load file data from content directory
-                    source['file_data'] = self._load_source_file_data(source_id, source['type'])
+class SentenceRecord(MutableMapping):
+    """Dict-style view of one sentence inside a SentenceStore"""
 
-            # Deserialize review system dates
-            if 'review_system' in state_data:
-                for schedule in state_data['review_system']['schedule'].values():
-                    schedule['next_review'] = self._deserialize_datetime(schedule['next_review'])
-                
-                for history_item in state_data['review_system']['history']:
-                    history_item['timestamp'] = self._deserialize_datetime(history_item['timestamp'])
+    __slots__ = ('_store', '_pos', '_id')
 
-            return True, "State loaded successfully", state_data
+    FIELDS = ('id', 'text', 'created', 'difficulty', 'reviews', 'next_review', 'status', 'source')
 
-        except Exception as e:
-            return False, f"Error loading state: {str(e)}", None
+    def __init__(self, store, pos):
+        self._store = store
+        self._pos = pos
+        self._id = int(store._ids[pos])
 
-    def _create_backup(self):
-        """Create a backup of the current state"""
-        if self.state_file.exists():
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = self.backup_dir / f"state_backup_{timestamp}.pkl"
-            shutil.copy2(self.state_file, backup_file)
-            
-            # Backup content files
-            content_backup_dir = self.backup_dir / f"content_backup_{timestamp}"
-            if self.content_dir.exists():
-                shutil.copytree(self.content_dir, content_backup_dir)
+    def _position(self):
+        # Positions shift when the store is compacted; ids never do
+        store = self._store
+        if self._pos >= store._size or store._ids[self._pos] != self._id:
+            self._pos = store._position_of(self._id)
+            if self._pos is None:
+                raise KeyError(f"Sentence {self._id} no longer exists")
+        return self._pos
 
-    def _save_content_files(self, active_sources):
-        """Save content files separately from main state"""
-        for source_id, source in active_sources.items():
-            if source['file_data']:
-                source_dir = self.content_dir / source['type'] / source_id
-                source_dir.mkdir(parents=True, exist_ok=True)
-                
-                with open(source_dir / 'content.data', 'wb') as f:
-                    f.write(source['file_data'])
-                
-                # Save metadata
-                metadata = source.copy()
-                metadata['file_data'] = None  # Don't include file data in metadata
-                metadata['created_date'] = self._serialize_datetime(metadata['created_date'])
-                if metadata['progress'].get('last_processed'):
-                    metadata['progress']['last_processed'] = self._serialize_datetime(
-                        metadata['progress']['last_processed']
-                    )
-                
-                with open(source_dir / 'metadata.json', 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, ensure_ascii=False, indent=2)
+    def __getitem__(self, key):
+        return self._store._get_field(self._position(), key)
 
-    def _load_source_file_data(self, source_id, source_type):
-        """Load source file data from content directory"""
-        try:
-            source_dir = self.content_dir / source_type / source_id
-            content_file = source_dir / 'content.data'
-            
-            if content_file.exists():
-                with open(content_file, 'rb') as f:
-                    return f.read()
+    def __setitem__(self, key, value):
+        self._store._set_field(self._position(), key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Sentence fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"SentenceRecord({dict(self)!r})"
+
+
+class SentenceStore:
+    """Compact column store for sentences
+
+    Sentences are kept as parallel NumPy columns (integer ids, epoch-second
+    timestamps, a status enum and interned source names) plus one list of
+    texts. Iteration and indexing hand out SentenceRecord views so callers
+    can keep using the dict-style API. Ids are looked up through a
+    direct-address table (id -> position), built on first use and dropped
+    whenever the columns are compacted.
+    """
+
+    STATUSES = ('new', 'reviewed')
+    COLUMNS = {
+        '_ids': np.int64,
+        '_created': np.int64,
+        '_difficulty': np.float64,
+        '_reviews': np.int32,
+        '_status': np.int8,
+        '_source': np.int32,
+        '_norm_hash': np.int64,
+    }
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._next_id = 1
+        self._texts = []
+        self._text_bytes = 0  # Running sys.getsizeof total of the texts
+        self._hash_ids = {}  # normalized text hash -> id of a sentence with that text
+        self._hash_more = {}  # hash -> ids of further sentences sharing it (rare)
+        self._source_names = []
+        self._source_codes = {}
+        self._positions = None  # id -> position, -1 where no sentence has that id
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    @classmethod
+    def from_dicts(cls, sentences, next_id=1):
+        """Build a store from dict sentences (ids must already be integers)"""
+        store = cls(capacity=max(1024, len(sentences)))
+        store.extend(sentences)
+        store._next_id = max(store._next_id, next_id)
+        return store
+
+    @property
+    def next_id(self):
+        return self._next_id
+
+    def _grow(self, needed):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _source_code(self, source):
+        if source is None:
+            return -1
+        code = self._source_codes.get(source)
+        if code is None:
+            code = len(self._source_names)
+            self._source_names.append(source)
+            self._source_codes[source] = code
+        return code
+
+    def _status_code(self, status):
+        return self.STATUSES.index(status)
+
+    def _position_table(self):
+        if self._positions is None:
+            ids = self._ids[:self._size]
+            size = max(self._next_id, int(ids.max()) + 1 if self._size else 0)
+            table = np.full(size, -1, dtype=np.int32)
+            table[ids] = np.arange(self._size, dtype=np.int32)
+            self._positions = table
+        return self._positions
+
+    def _position_of(self, sentence_id):
+        if not isinstance(sentence_id, (int, np.integer)):
             return None
-        except Exception:
+        table = self._position_table()
+        if not 0 <= sentence_id < len(table):
             return None
+        pos = int(table[sentence_id])
+        return pos if pos >= 0 else None
 
-    def _cleanup_old_backups(self, keep_last_n=5):
-        """Clean up old backup files"""
-        # Clean up state backups
-        backup_files = sorted(self.backup_dir.glob("state_backup_*.pkl"))
-        if len(backup_files) > keep_last_n:
-            for old_file in backup_files[:-keep_last_n]:
-                old_file.unlink()
-
-        # Clean up content backups
-        content_backups = sorted(self.backup_dir.glob("content_backup_*"))
-        if len(content_backups) > keep_last_n:
-            for old_backup in content_backups[:-keep_last_n]:
-                if old_backup.is_dir():
-                    shutil.rmtree(old_backup)
+    def _get_field(self, pos, key):
+        if key == 'text':
+            return self._texts[pos]
+        if key == 'id':
+            return int(self._ids[pos])
+        if key == 'created':
+            return datetime.fromtimestamp(int(self._created[pos]))
+        if key == 'difficulty':
+            return float(self._difficulty[pos])
+        if key == 'reviews':
+            return int(self._reviews[pos])
+        if key == 'status':
+            return self.STATUSES[self._status[pos]]
+        if key == 'source':
+            code = self._source[pos]
+            return self._source_names[code] if code >= 0 else None
+        if key == 'next_review':
+            return None
+        raise KeyError(key)
 
-    def create_backup(self):
-        """Create a manual backup"""
-        try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = self.backup_dir / f"manual_backup_{timestamp}.zip"
-            
-            with zipfile.ZipFile(backup_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add state file
-                if self.state_file.exists():
-                    zipf.write(self.state_file, self.state_file.name)
-                
-                # Add content files
-                if self.content_dir.exists():
-                    for root, _, files in os.walk(self.content_dir):
-                        for file in files:
-                            file_path = Path(root) / file
-                            arcname = file_path.relative_to(self.storage_path)
-                            zipf.write(file_path, arcname)
-            
-            return backup_file
-        except Exception as e:
-            raise Exception(f"Backup creation failed: {str(e)}")
+    def _set_field(self, pos, key, value):
+        if key == 'text':
+            self._text_bytes += sys.getsizeof(value) - sys.getsizeof(self._texts[pos])
+            self._texts[pos] = value
+            sentence_id = int(self._ids[pos])
+            self._unindex(int(self._norm_hash[pos]), sentence_id)
+            self._norm_hash[pos] = normalized_text_hash(value)
+            self._index_text(int(self._norm_hash[pos]), sentence_id)
+        elif key == 'created':
+            self._created[pos] = int(value.timestamp())
+        elif key == 'difficulty':
+            self._difficulty[pos] = value
+        elif key == 'reviews':
+            self._reviews[pos] = value
+        elif key == 'status':
+            self._status[pos] = self._status_code(value)
+        elif key == 'source':
+            self._source[pos] = self._source_code(value)
+        elif key == 'next_review':
+            pass  # never stored; kept for compatibility with the dict layout
+        else:
+            raise KeyError(key)
 
-    def restore_from_backup(self, backup_file_path):
-        """Restore system state from backup file"""
-        try:
-            with zipfile.ZipFile(backup_file_path, 'r') as zipf:
-                # Clear existing data
-                if self.state_file.exists():
-                    self.state_file.unlink()
-                if self.content_dir.exists():
-                    shutil.rmtree(self.content_dir)
-                
-                # Extract all files
-                zipf.extractall(self.storage_path)
-            
-            return True
-        except Exception as e:
-            return False
+    def __len__(self):
+        return self._size
 
-    def _serialize_datetime(self, obj):
-        """Serialize datetime objects"""
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return obj
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        for pos in range(self._size):
+            yield SentenceRecord(self, pos)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SentenceRecord(self, pos) for pos in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("sentence index out of range")
+        return SentenceRecord(self, index)
+
+    def append(self, sentence):
+        """Add a sentence dict, assigning an id when it has none; returns the id"""
+        sentence_id = sentence.get('id')
+        if not isinstance(sentence_id, (int, np.integer)):
+            sentence_id = self._next_id
+            sentence['id'] = sentence_id
+        self._next_id = max(self._next_id, int(sentence_id) + 1)
+
+        self._grow(self._size + 1)
+        pos = self._size
+        self._ids[pos] = sentence_id
+        self._created[pos] = int(sentence['created'].timestamp())
+        self._difficulty[pos] = sentence['difficulty']
+        self._reviews[pos] = sentence.get('reviews', 0)
+        self._status[pos] = self._status_code(sentence.get('status', 'new'))
+        self._source[pos] = self._source_code(sentence.get('source'))
+        self._texts.append(sentence['text'])
+        self._text_bytes += sys.getsizeof(sentence['text'])
+        text_hash = normalized_text_hash(sentence['text'])
+        self._norm_hash[pos] = text_hash
+        self._index_text(text_hash, int(sentence_id))
+        if self._positions is not None:
+            if sentence_id >= len(self._positions):
+                grown = np.full(max(int(sentence_id) + 1, 2 * len(self._positions)), -1, dtype=np.int32)
+                grown[:len(self._positions)] = self._positions
+                self._positions = grown
+            self._positions[sentence_id] = pos
+        self._size += 1
+        return int(sentence_id)
+
+    def _index_text(self, text_hash, sentence_id):
+        if text_hash in self._hash_ids:
+            self._hash_more.setdefault(text_hash, []).append(sentence_id)
+        else:
+            self._hash_ids[text_hash] = sentence_id
+
+    def _unindex(self, text_hash, sentence_id):
+        more = self._hash_more.get(text_hash)
+        if self._hash_ids.get(text_hash) == sentence_id:
+            if more:
+                self._hash_ids[text_hash] = more.pop()
+            else:
+                del self._hash_ids[text_hash]
+        elif more and sentence_id in more:
+            more.remove(sentence_id)
+        if more is not None and not more:
+            del self._hash_more[text_hash]
+
+    def _rebuild_hash_index(self):
+        hashes = self._norm_hash[:self._size].tolist()
+        ids = self._ids[:self._size].tolist()
+        self._hash_ids = dict(zip(hashes, ids))
+        self._hash_more = {}
+        if len(self._hash_ids) < self._size:
+            # Some normalized texts occur more than once; keep every id
+            self._hash_ids = {}
+            for text_hash, sentence_id in zip(hashes, ids):
+                self._index_text(text_hash, sentence_id)
+
+    def find_text(self, text):
+        """Id of a sentence with the same normalized text, or None, in O(1)"""
+        text_hash = normalized_text_hash(text)
+        first = self._hash_ids.get(text_hash)
+        if first is None:
+            return None
+        # Confirm against the candidates' stored texts in case of a hash collision
+        normalized = normalize_sentence_text(text)
+        for sentence_id in [first, *self._hash_more.get(text_hash, ())]:
+            pos = self._position_of(sentence_id)
+            if pos is not None and normalize_sentence_text(self._texts[pos]) == normalized:
+                return sentence_id
+        return None
+
+    def contains_text(self, text):
+        """Whether a sentence with the same normalized text exists, in O(1)"""
+        return self.find_text(text) is not None
+
+    def id_hashes(self):
+        """Copies of the id and normalized text hash columns"""
+        return self._ids[:self._size].copy(), self._norm_hash[:self._size].copy()
+
+    def remove(self, sentence_ids):
+        """Delete sentences by id, compacting the columns"""
+        n = self._size
+        keep = ~np.isin(self._ids[:n], np.asarray(list(sentence_ids), dtype=np.int64))
+        removed = np.flatnonzero(~keep).tolist()
+        if not removed:
+            return
+        for pos in removed:
+            self._unindex(int(self._norm_hash[pos]), int(self._ids[pos]))
+            self._text_bytes -= sys.getsizeof(self._texts[pos])
+        kept = int(keep.sum())
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:kept] = column[:n][keep]
+        self._texts = [text for text, k in zip(self._texts, keep.tolist()) if k]
+        self._size = kept
+        self._positions = None  # Positions shifted; rebuilt on the next lookup
+
+    def extend(self, sentences):
+        self._grow(self._size + len(sentences))
+        for sentence in sentences:
+            self.append(sentence)
+
+    def copy(self):
+        """Independent copy of the columns, cheap enough to take on every save"""
+        clone = SentenceStore(capacity=max(1, self._size))
+        for name in self.COLUMNS:
+            getattr(clone, name)[:self._size] = getattr(self, name)[:self._size]
+        clone._size = self._size
+        clone._next_id = self._next_id
+        clone._texts = list(self._texts)
+        clone._text_bytes = self._text_bytes
+        clone._hash_ids = dict(self._hash_ids)
+        clone._hash_more = {text_hash: list(ids) for text_hash, ids in self._hash_more.items()}
+        clone._source_names = list(self._source_names)
+        clone._source_codes = dict(self._source_codes)
+        return clone
+
+    def memory_usage(self):
+        """Approximate bytes held by the store"""
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS) + self._text_bytes
+
+    def rows(self):
+        """Plain dict copies of every sentence, built column by column"""
+        n = self._size
+        statuses = [self.STATUSES[code] for code in self._status[:n].tolist()]
+        sources = [self._source_names[code] if code >= 0 else None for code in self._source[:n].tolist()]
+        for sentence_id, text, created, difficulty, reviews, status, source in zip(
+                self._ids[:n].tolist(), self._texts, self._created[:n].tolist(),
+                self._difficulty[:n].tolist(), self._reviews[:n].tolist(), statuses, sources):
+            yield {
+                'id': sentence_id,
+                'text': text,
+                'created': datetime.fromtimestamp(created),
+                'difficulty': difficulty,
+                'reviews': reviews,
+                'next_review': None,
+                'status': status,
+                'source': source
+            }
+
+    def to_columns(self):
+        """Typed columns and small metadata for the binary snapshot"""
+        n = self._size
+        columns = {name.lstrip('_'): getattr(self, name)[:n] for name in self.COLUMNS}
+        columns['text'] = np.frombuffer(''.join(self._texts).encode('utf-8'), dtype=np.uint8)
+        columns['text_lengths'] = np.fromiter(map(len, self._texts), dtype=np.int64, count=n)
+        meta = {'next_id': self._next_id, 'source_names': list(self._source_names)}
+        return columns, meta
+
+    @classmethod
+    def from_columns(cls, columns, meta):
+        """Rebuild a store from snapshot columns without touching rows one by one"""
+        n = len(columns['ids'])
+        store = cls(capacity=max(1024, n))
+        for name in cls.COLUMNS:
+            getattr(store, name)[:n] = columns[name.lstrip('_')]
+        joined = columns['text'].tobytes().decode('utf-8')
+        ends = np.cumsum(columns['text_lengths']).tolist()
+        store._texts = [joined[start:end] for start, end in zip([0] + ends[:-1], ends)]
+        store._text_bytes = sum(map(sys.getsizeof, store._texts))
+        store._size = n
+        store._rebuild_hash_index()
+        store._source_names = list(meta['source_names'])
+        store._source_codes = {name: code for code, name in enumerate(store._source_names)}
+        store._next_id = meta['next_id']
+        return store
+
+    # Queries, shared with SQLiteSentenceList
+    def get_by_id(self, sentence_id):
+        pos = self._position_of(sentence_id)
+        return SentenceRecord(self, pos) if pos is not None else None
+
+    def mark_reviewed(self, sentence_id):
+        pos = self._position_of(sentence_id)
+        if pos is not None:
+            self._status[pos] = self._status_code('reviewed')
+            self._reviews[pos] += 1
+
+    def count_by_status(self, status):
+        return int(np.count_nonzero(self._status[:self._size] == self._status_code(status)))
+
+    def filter_by_status(self, status):
+        positions = np.flatnonzero(self._status[:self._size] == self._status_code(status))
+        return [SentenceRecord(self, int(pos)) for pos in positions]
+
+    def count_by_source(self):
+        counts = np.bincount(self._source[:self._size] + 1, minlength=len(self._source_names) + 1)
+        result = {name: int(counts[code + 1]) for code, name in enumerate(self._source_names) if counts[code + 1]}
+        if counts[0]:
+            result[None] = int(counts[0])
+        return result
+
+    def average_difficulty(self):
+        return float(self._difficulty[:self._size].mean()) if self._size else 0
+
+    def difficulty_histogram(self, bins=10):
+        """Counts of sentences per difficulty bucket between 0 and 5"""
+        counts, edges = np.histogram(self._difficulty[:self._size], bins=bins, range=(0, 5))
+        return counts.tolist(), edges.tolist()
+
+    def new_sentences(self, schedule, limit=5):
+        new_sentences = []
+        for pos, sentence_id in enumerate(self._ids[:self._size].tolist()):
+            if sentence_id not in schedule:
+                new_sentences.append(SentenceRecord(self, pos))
+                if len(new_sentences) >= limit:
+                    break
+        return new_sentences
+
+    def search(self, query):
+        query = query.lower()
+        return [SentenceRecord(self, pos) for pos, text in enumerate(self._texts) if query in text.lower()]
+
+
+class ReviewHistory:
+    """Append-only column store for review history
+
+    Each review is a sentence id, a timestamp in epoch microseconds and an
+    interned response code. Iteration yields plain dicts like the list it
+    replaces.
+    """
+
+    COLUMNS = {
+        '_sentence_ids': np.int64,
+        '_timestamps': np.int64,
+        '_responses': np.int8,
+    }
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._response_names = []
+        self._response_codes = {}
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    @classmethod
+    def from_dicts(cls, items):
+        history = cls(capacity=max(1024, len(items)))
+        for item in items:
+            history.append(item)
+        return history
+
+    def _grow(self, needed):
+        capacity = len(self._sentence_ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _response_code(self, response):
+        code = self._response_codes.get(response)
+        if code is None:
+            code = len(self._response_names)
+            self._response_names.append(response)
+            self._response_codes[response] = code
+        return code
+
+    def append(self, item):
+        self._grow(self._size + 1)
+        pos = self._size
+        self._sentence_ids[pos] = item['sentence_id']
+        self._timestamps[pos] = round(item['timestamp'].timestamp() * 1_000_000)
+        self._responses[pos] = self._response_code(item['response'])
+        self._size += 1
+
+    def extend(self, items):
+        self._grow(self._size + len(items))
+        for item in items:
+            self.append(item)
+
+    def remove(self, sentence_ids):
+        """Drop every review of the given sentences, compacting the columns"""
+        n = self._size
+        keep = ~np.isin(self._sentence_ids[:n], np.asarray(list(sentence_ids), dtype=np.int64))
+        kept = int(keep.sum())
+        if kept == n:
+            return
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:kept] = column[:n][keep]
+        self._size = kept
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        n = self._size
+        for sentence_id, timestamp, code in zip(self._sentence_ids[:n].tolist(),
+                                                self._timestamps[:n].tolist(),
+                                                self._responses[:n].tolist()):
+            yield {
+                'sentence_id': sentence_id,
+                'response': self._response_names[code],
+                'timestamp': datetime.fromtimestamp(timestamp / 1_000_000)
+            }
+
+    def copy(self):
+        clone = ReviewHistory(capacity=max(1, self._size))
+        for name in self.COLUMNS:
+            getattr(clone, name)[:self._size] = getattr(self, name)[:self._size]
+        clone._size = self._size
+        clone._response_names = list(self._response_names)
+        clone._response_codes = dict(self._response_codes)
+        return clone
+
+    def to_columns(self):
+        n = self._size
+        columns = {name.lstrip('_'): getattr(self, name)[:n] for name in self.COLUMNS}
+        return columns, {'response_names': list(self._response_names)}
+
+    def memory_usage(self):
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS)
+
+    @classmethod
+    def from_columns(cls, columns, meta):
+        n = len(columns['sentence_ids'])
+        history = cls(capacity=max(1024, n))
+        for name in cls.COLUMNS:
+            getattr(history, name)[:n] = columns[name.lstrip('_')]
+        history._response_names = list(meta['response_names'])
+        history._response_codes = {name: code for code, name in enumerate(history._response_names)}
+        history._size = n
+        return history
+
+    def reviews_by_day(self):
+        """Number of reviews per local calendar day"""
+        # Every UTC offset is a multiple of 15 minutes, so all reviews in one
+        # quarter hour fall on the same local day
+        quarters, counts = np.unique(self._timestamps[:self._size] // 900_000_000, return_counts=True)
+        reviews_by_day = defaultdict(int)
+        for quarter, count in zip(quarters.tolist(), counts.tolist()):
+            reviews_by_day[datetime.fromtimestamp(quarter * 900).date()] += count
+        return dict(reviews_by_day)
+
+
+class DueIndex:
+    """Schedule entries ordered by next review time
+
+    Two parallel lists sorted by review time. The times are the schedule
+    entries' own datetime objects, so the index costs two pointers per card.
+    Counting due cards is one bisection and listing the first k is a slice.
+    """
+
+    def __init__(self, schedule=None):
+        entries = sorted((entry['next_review'], sentence_id) for sentence_id, entry in (schedule or {}).items())
+        self._times = [next_review for next_review, _ in entries]
+        self._ids = [sentence_id for _, sentence_id in entries]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, sentence_id, next_review):
+        pos = bisect.bisect_right(self._times, next_review)
+        self._times.insert(pos, next_review)
+        self._ids.insert(pos, sentence_id)
+
+    def discard(self, sentence_id, next_review):
+        pos = bisect.bisect_left(self._times, next_review)
+        while pos < len(self._times) and self._times[pos] == next_review:
+            if self._ids[pos] == sentence_id:
+                del self._times[pos]
+                del self._ids[pos]
+                return
+            pos += 1
+
+    def count_due(self, now):
+        return bisect.bisect_right(self._times, now)
+
+    def due(self, now, limit=None):
+        """Ids of the cards due at `now`, soonest first"""
+        end = self.count_due(now)
+        return self._ids[:end if limit is None else min(end, limit)]
+
+    def upcoming(self, limit):
+        """(sentence id, next review) of the `limit` soonest cards, due or not"""
+        return list(zip(self._ids[:limit], self._times[:limit]))
 
-    def _deserialize_datetime(self, obj):
-        """Deserialize datetime strings"""
-        if isinstance(obj, str):
-            try:
-                return datetime.fromisoformat(obj)
-            except ValueError:
-                return obj
-        return obj
 
 class ContentSource:
     def __init__(self, source_id, source_type, name, file_data=None):
@@ -370,12 +2936,55 @@ class ContentSource:
 
 
 class ContentManager:
-    def __init__(self):
-        self.sentences = []
+    CHAPTER_INDEX_VERSION = 1
+    PARAGRAPH_ROW = np.dtype([('hash', '<u8'), ('id', '<i8')])  # id -1: paragraph without sentences
+    INGEST_BATCH_SIZE = 1000  # Sentences per add_sentences call when ingesting paragraphs
+    DECK_BATCH_SIZE = 5000  # Notes per add_sentences call when importing a deck
+
+    def __init__(self, content_path="./data/content"):
+        self.sentences = SentenceStore()
         self.sources = {}  # Traditional sources tracking
         self.active_sources = {}  # Active content sources with progress
-        self.content_path = Path("./data/content")
+        self.pending_changes = []  # Mutations not yet written to the journal
+        self.sources_dirty = False  # self.sources changed since the last save
+        self.dirty_sources = set()  # Active source ids whose files need rewriting
+        self.source_list_dirty = False  # A source was removed since the last save
+        self.store = None  # SQLiteStateStore when sentences live in the database
+        self.batch_committed = None  # Called after each batch of a streamed ingest
+        self.sentences_removed = None  # Called with the ids of deleted sentences
+        self.reviews_imported = None  # Called with (schedule, history) carried in by a deck
+        # Jaccard similarity at which a sentence counts as a near-duplicate; None (default) disables
+        threshold = os.environ.get('NEOANKI_NEAR_DUP_THRESHOLD')
+        self.near_duplicate_threshold = (float(threshold) or None) if threshold else None
+        self._near_duplicates = None
+        self._near_duplicates_of = None  # The sentences object the index was built from
+        self.content_path = Path(content_path)
         self.content_path.mkdir(parents=True, exist_ok=True)
+
+    def _record_change(self, kind, payload):
+        """Record a mutation for the next journal append"""
+        if kind in ('source_added', 'source_updated'):
+            self.dirty_sources.add(payload['id'])
+        elif kind == 'source_removed':
+            self.dirty_sources.discard(payload['id'])
+            self.source_list_dirty = True
+        elif kind == 'sentences_added' and payload.get('source_name'):
+            self.sources_dirty = True
+
+        # Database-backed sentences are written through, so nothing to journal
+        if self.store is not None:
+            return
+        self.pending_changes.append((kind, payload))
+
+    def _source_change_payload(self, source):
+        """Copy of a source suitable for the journal (without file data)"""
+        payload = {k: v for k, v in source.items() if k != 'file_data'}
+        if isinstance(payload.get('content'), dict):
+            # Page HTML and pasted text are kept in the source's content files
+            payload['content'] = {k: v for k, v in payload['content'].items() if k not in ('html', 'text')}
+        payload['progress'] = dict(source['progress'])
+        payload['file_data'] = None
+        return payload
         
     def add_source(self, source_type, name, content=None, file_data=None):
         """Add a new content source"""
@@ -403,8 +3012,14 @@ class ContentManager:
             
             # Save source metadata and content
             self._save_source_files(source, source_dir)
+            # The file now lives in content.data; read it back only when processing
+            source['file_data'] = None
+            if source_type in ('text', 'url') and isinstance(content, dict):
+                # Likewise read back from content.txt / content.html
+                source['content'] = {k: v for k, v in content.items() if k not in ('text', 'html')}
             
             self.active_sources[source_id] = source
+            self._record_change('source_added', self._source_change_payload(source))
             return source_id, None
             
         except Exception as e:
@@ -423,6 +3038,8 @@ class ContentManager:
                 return self._process_text_content(source)
             elif source['type'] == 'url':
                 return self._process_url_content(source)
+            elif source['type'] == 'deck':
+                return self._process_deck_content(source)
             
             return 0, 0, "Unknown source type"
             
@@ -430,68 +3047,11 @@ class ContentManager:
             return 0, 0, f"Error processing content: {str(e)}"
 
 
-    def _process_url_content(self, source):
-        """Process URL content"""
-        try:
-            url = None
-            content = None
-            source_dir = self.content_path / 'url' / source['id']
-            
-            # Get URL from source
-            if isinstance(source.get('content'), dict):
-                url = source['content'].get('url')
-                content = source['content'].get('html')
-            
-            if not url:
-                return 0, 0, "URL not found"
-                    
-            if not content:
-                # Fetch content if not provided
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers, verify=True)
-                response.raise_for_status()
-                content = response.text
-            
-            # Extract text from HTML
-            soup = BeautifulSoup(content, 'html.parser')
-            for tag in soup(['style', 'script', 'nav', 'header', 'footer', 'iframe']):
-                tag.decompose()
-            
-            text = ''
-            article = soup.find('article') or soup.find('div', class_=['article', 'content', 'main-content'])
-            if article:
-                text = article.get_text()
-            else:
-                text = soup.get_text()
-            
-            # Clean up the text
-            text = re.sub(r'\s+', ' ', text)
-            text = unicodedata.normalize('NFKC', text)
-            
-            # Save processed content
-            with open(source_dir / 'content.txt', 'w', encoding='utf-8') as f:
-                f.write(text)
-            
-            added, duplicates = self.add_content(text, source['name'])
-            
-            source['progress']['processed_units'] = 1
-            source['progress']['total_units'] = 1
-            source['progress']['last_processed'] = datetime.now()
-            
-            # Update source metadata
-            self._update_source_metadata(source)
-            
-            return added, duplicates, None
-            
-        except Exception as e:
-            return 0, 0, f"Error processing URL: {str(e)}"
-
     def _save_source_files(self, source, source_dir):
         """Save source files (metadata and content)"""
         # Save metadata
         metadata = {k: v for k, v in source.items() if k not in ['file_data', 'content']}
+        metadata['progress'] = source['progress'].copy()
         metadata['created_date'] = metadata['created_date'].isoformat()
         if metadata['progress'].get('last_processed'):
             metadata['progress']['last_processed'] = metadata['progress']['last_processed'].isoformat()
@@ -518,24 +3078,31 @@ class ContentManager:
             with open(source_dir / 'content.data', 'wb') as f:
                 f.write(source['file_data'])
 
+    def add_text_file(self, name, fileobj):
+        """Add a text source from a binary file object, copied to content.txt in chunks"""
+        source_id, error = self.add_source('text', name, content={'type': 'file'})
+        if error:
+            return None, error
+        source_dir = self.content_path / 'text' / source_id
+        with open(source_dir / 'content.txt', 'wb') as f:
+            shutil.copyfileobj(fileobj, f, text_processing.STREAM_CHUNK_CHARS)
+        return source_id, None
+
     def _process_text_content(self, source):
-        """Process text content"""
+        """Process text content, streamed from content.txt"""
         try:
-            content = None
-            source_dir = self.content_path / 'text' / source['id']
+            content_file = self.content_path / 'text' / source['id'] / 'content.txt'
             
-            # Try to get content from source object
-            if isinstance(source.get('content'), dict) and 'text' in source['content']:
-                content = source['content']['text']
-            # Try to get content from file
-            elif (source_dir / 'content.txt').exists():
-                with open(source_dir / 'content.txt', 'r', encoding='utf-8') as f:
-                    content = f.read()
+            if content_file.exists():
+                with open(content_file, 'r', encoding='utf-8', errors='ignore') as f:
+                    added, duplicates = self._ingest_paragraphs(source, self._iter_lines(f))
+            # Sources added before the text was moved out of memory
+            elif isinstance(source.get('content'), dict) and 'text' in source['content']:
+                lines = self._iter_lines(io.StringIO(source['content']['text']))
+                added, duplicates = self._ingest_paragraphs(source, lines)
             else:
                 return 0, 0, "Text content not found"
             
-            added, duplicates = self.add_content(content, source['name'])
-            
             source['progress']['processed_units'] = 1
             source['progress']['total_units'] = 1
             source['progress']['last_processed'] = datetime.now()
@@ -548,59 +3115,284 @@ class ContentManager:
         except Exception as e:
             return 0, 0, f"Error processing text: {str(e)}"
 
-    def _process_url_content(self, source):
-        """Process URL content"""
+    def add_deck_file(self, name, fileobj, deck_format, field=0):
+        """Add a deck source from a binary file object, copied to content.data in chunks"""
+        source_id, error = self.add_source('deck', name, content={'format': deck_format, 'field': field})
+        if error:
+            return None, error
+        source_dir = self.content_path / 'deck' / source_id
+        with open(source_dir / 'content.data', 'wb') as f:
+            shutil.copyfileobj(fileobj, f, text_processing.STREAM_CHUNK_CHARS)
+        return source_id, None
+
+    def import_deck(self, source_id, review_system=None):
+        """Import a deck source, carrying its schedules and review history into review_system"""
+        source = self.active_sources.get(source_id)
+        if not source:
+            return 0, 0, "Source not found"
+        return self._process_deck_content(source, review_system.import_reviews if review_system else None)
+
+    def _process_deck_content(self, source, import_reviews=None):
+        """Stream the notes of a CSV/TSV or .apkg deck into sentences
+
+        Notes are inserted DECK_BATCH_SIZE at a time with one creation time
+        per batch. They skip sentence validation and the near-duplicate
+        check; only exact duplicates are dropped. Schedules and history of
+        the imported notes go to import_reviews, or the reviews_imported
+        callback, in one bulk call per batch.
+        """
+        import_reviews = import_reviews or self.reviews_imported
+        content_file = self.content_path / source['type'] / source['id'] / 'content.data'
+        if not content_file.exists():
+            return 0, 0, "Deck file not found"
+        options = source.get('content') or {}
+
+        total_added = 0
+        total_duplicates = 0
         try:
-            url = None
-            content = None
-            source_dir = self.content_path / 'url' / source['id']
-            
-            # Get URL from source or file
-            if isinstance(source.get('content'), dict) and 'url' in source['content']:
-                url = source['content']['url']
-            elif (source_dir / 'url.txt').exists():
-                with open(source_dir / 'url.txt', 'r', encoding='utf-8') as f:
-                    url = f.read().strip()
-                    
-            if not url:
-                return 0, 0, "URL not found"
-            
-            # Try to get content from cache first
-            if isinstance(source.get('content'), dict) and 'html' in source['content']:
-                content = source['content']['html']
-            elif (source_dir / 'content.html').exists():
-                with open(source_dir / 'content.html', 'r', encoding='utf-8') as f:
-                    content = f.read()
-            else:
-                # Fetch content if not cached
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers, verify=True)
-                response.raise_for_status()
-                content = response.text
-                
-                # Cache the content
-                with open(source_dir / 'content.html', 'w', encoding='utf-8') as f:
-                    f.write(content)
-            
-            # Extract text from HTML
-            soup = BeautifulSoup(content, 'html.parser')
-            for tag in soup(['style', 'script', 'nav', 'header', 'footer', 'iframe']):
-                tag.decompose()
-            
-            text = ''
-            article = soup.find('article') or soup.find('div', class_=['article', 'content', 'main-content'])
-            if article:
-                text = article.get_text()
-            else:
-                text = soup.get_text()
-            
-            # Clean up the text
-            text = re.sub(r'\s+', ' ', text)
-            text = unicodedata.normalize('NFKC', text)
-            
-            added, duplicates = self.add_content(text, source['name'])
+            with open(content_file, 'rb') as f:
+                notes = iter(deck_import.iter_notes(f, options.get('format', 'csv'), options.get('field', 0)))
+                while True:
+                    chunk = list(itertools.islice(notes, self.DECK_BATCH_SIZE))
+                    if not chunk:
+                        break
+                    sentences = text_processing.make_sentences([note['text'] for note in chunk], validate=False)
+                    for sentence, note in zip(sentences, chunk):
+                        sentence['reviews'] = note['reviews']
+                        if note['reviews'] or note['schedule']:
+                            sentence['status'] = 'reviewed'
+
+                    added, duplicates = self.add_sentences(sentences, source['name'], check_near_duplicates=False)
+                    total_added += added
+                    total_duplicates += duplicates
+
+                    if import_reviews is not None:
+                        schedule = {}
+                        history = []
+                        for sentence, note in zip(sentences, chunk):
+                            if sentence['id'] is None:  # Skipped as a duplicate
+                                continue
+                            for timestamp, response in note['history']:
+                                history.append({'sentence_id': sentence['id'], 'response': response, 'timestamp': timestamp})
+                            if note['schedule']:
+                                last_response = note['history'][-1][1] if note['history'] else None
+                                schedule[sentence['id']] = dict(note['schedule'], last_response=last_response)
+                        if schedule or history:
+                            import_reviews(schedule, history)
+
+                    if self.batch_committed is not None:
+                        self.batch_committed()
+        except Exception as e:
+            return total_added, total_duplicates, f"Error importing deck: {str(e)}"
+
+        source['progress']['processed_units'] = 1
+        source['progress']['total_units'] = 1
+        source['progress']['last_processed'] = datetime.now()
+        self._update_source_metadata(source)
+        return total_added, total_duplicates, None
+
+    @staticmethod
+    def _iter_lines(f):
+        """Lines of a text file, each read capped so one huge line cannot fill memory"""
+        return iter(lambda: f.readline(text_processing.STREAM_CHUNK_CHARS), '')
+
+    def _paragraph_index_paths(self, source):
+        source_dir = self.content_path / source['type'] / source['id']
+        return source_dir / 'paragraphs.bin', source_dir / 'stale.bin'
+
+    def _load_paragraph_index(self, source):
+        """(paragraph hash, sentence id) rows sorted by hash and the stale ids of a source
+
+        The rows are memory-mapped, so looking paragraphs up during a
+        re-ingest does not load the index.
+        """
+        paragraphs_path, stale_path = self._paragraph_index_paths(source)
+        stale = np.fromfile(stale_path, dtype=np.int64) if stale_path.exists() else np.zeros(0, dtype=np.int64)
+        if paragraphs_path.exists():
+            if not paragraphs_path.stat().st_size:
+                return np.zeros(0, dtype=self.PARAGRAPH_ROW), stale
+            return np.memmap(paragraphs_path, dtype=self.PARAGRAPH_ROW, mode='r'), stale
+
+        # Indexes written as JSON before they moved to NumPy files
+        try:
+            with open(paragraphs_path.with_name('paragraphs.json'), 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return np.zeros(0, dtype=self.PARAGRAPH_ROW), stale
+        rows = np.array([(int(paragraph_hash, 16), sentence_id)
+                         for paragraph_hash, ids in legacy['paragraphs'].items() for sentence_id in ids or [-1]],
+                        dtype=self.PARAGRAPH_ROW)
+        return np.sort(rows), np.asarray(legacy['stale'], dtype=np.int64)
+
+    def _save_paragraph_index(self, source, paragraphs=None, stale=None):
+        """Atomically replace the rows and/or stale ids of a source"""
+        for path, values in zip(self._paragraph_index_paths(source), (paragraphs, stale)):
+            if values is None:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            values.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        legacy = self._paragraph_index_paths(source)[0].with_name('paragraphs.json')
+        if paragraphs is not None and legacy.exists():
+            legacy.unlink()
+
+    def _source_sentence_id(self, sentence, source_name):
+        """Id of a just ingested sentence, or of the same source's copy it duplicates"""
+        if sentence.get('id') is not None:
+            return sentence['id']
+        sentence_id = self.sentences.find_text(sentence['text'])
+        if sentence_id is None:
+            return None
+        existing = self.get_sentence_by_id(sentence_id)
+        return sentence_id if existing is not None and existing['source'] == source_name else None
+
+    def _ingest_paragraphs(self, source, paragraphs, normalized=False):
+        """Add the sentences of new or changed paragraphs only
+
+        Each source remembers which sentences came from which paragraph
+        (keyed by content hash). Unchanged paragraphs are skipped without
+        being segmented. Sentences of paragraphs that disappeared are
+        flagged as stale in source['stale_sentences'] rather than deleted,
+        unless the new text still contains them. paragraphs are raw text
+        pieces, or finished paragraphs when normalized is set.
+
+        The old index stays on disk and new rows are written out batch by
+        batch, so memory does not grow with the size of the source.
+        """
+        old, stale = self._load_paragraph_index(source)
+        old_hashes = old['hash']
+        paragraphs_path, _ = self._paragraph_index_paths(source)
+        paragraphs_path.parent.mkdir(parents=True, exist_ok=True)
+        rows_path = paragraphs_path.with_suffix('.new')
+        pending = []
+        pending_count = 0
+        total_added = 0
+        total_duplicates = 0
+
+        with open(rows_path, 'wb') as rows_file:
+            def flush():
+                nonlocal total_added, total_duplicates, pending_count
+                batch = [sentence for _, sentences in pending for sentence in sentences]
+                added, duplicates = self.add_sentences(batch, source['name'])
+                total_added += added
+                total_duplicates += duplicates
+                rows = []
+                for paragraph_hash, sentences in pending:
+                    ids = [self._source_sentence_id(s, source['name']) for s in sentences]
+                    rows.extend((paragraph_hash, sentence_id) for sentence_id in ids if sentence_id is not None)
+                    if not any(sentence_id is not None for sentence_id in ids):
+                        rows.append((paragraph_hash, -1))
+                np.array(rows, dtype=self.PARAGRAPH_ROW).tofile(rows_file)
+                pending.clear()
+                pending_count = 0
+                if self.batch_committed is not None:
+                    self.batch_committed()
+
+            if not normalized:
+                paragraphs = text_processing.iter_paragraphs(paragraphs)
+            for paragraph in paragraphs:
+                paragraph_hash = np.uint64(text_processing.paragraph_hash(paragraph))
+                start = np.searchsorted(old_hashes, paragraph_hash, 'left')
+                end = np.searchsorted(old_hashes, paragraph_hash, 'right')
+                if end > start:
+                    np.asarray(old[start:end]).tofile(rows_file)
+                    continue
+                sentences = text_processing.split_into_sentences(paragraph)
+                pending.append((paragraph_hash, sentences))
+                pending_count += len(sentences)
+                if pending_count >= self.INGEST_BATCH_SIZE:
+                    flush()
+            if pending:
+                flush()
+
+        # Sorted, with paragraphs repeated in the text stored once
+        new = np.unique(np.fromfile(rows_path, dtype=self.PARAGRAPH_ROW))
+        old_ids = np.asarray(old['id'])
+        candidates = np.setdiff1d(np.concatenate((stale, old_ids[old_ids >= 0])), new['id'])
+        stale = np.array([sentence_id for sentence_id in candidates.tolist()
+                          if self.get_sentence_by_id(sentence_id) is not None], dtype=np.int64)
+
+        del old, old_hashes  # Release the mapping before the file is replaced
+        self._save_paragraph_index(source, new, stale)
+        rows_path.unlink()
+        source['stale_sentences'] = len(stale)
+        return total_added, total_duplicates
+
+    def remove_stale_sentences(self, source_id):
+        """Delete the sentences flagged as stale for a source; returns how many
+
+        remove_sentences takes their schedule and history with them.
+        """
+        source = self.active_sources.get(source_id)
+        if not source:
+            return 0
+        _, stale = self._load_paragraph_index(source)
+        existing = [sentence_id for sentence_id in stale.tolist() if self.get_sentence_by_id(sentence_id) is not None]
+        if existing:
+            self.remove_sentences(existing)
+        self._save_paragraph_index(source, stale=np.zeros(0, dtype=np.int64))
+        source['stale_sentences'] = 0
+        self._update_source_metadata(source)
+        return len(existing)
+
+    def _url_source_location(self, source):
+        """The URL of a source, from the source itself or its url.txt"""
+        if isinstance(source.get('content'), dict) and 'url' in source['content']:
+            return source['content']['url']
+        url_file = self.content_path / 'url' / source['id'] / 'url.txt'
+        if url_file.exists():
+            with open(url_file, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        return None
+
+    def _fetch_url_source(self, source, url=None):
+        """Revalidate a URL source with a conditional GET"""
+        url = url or self._url_source_location(source)
+        if not url:
+            raise ValueError("URL not found")
+        validators = source.get('http') or {}
+        return get_url_fetcher().fetch(url, etag=validators.get('etag'),
+                                       last_modified=validators.get('last_modified'))
+
+    def _process_url_content(self, source, fetched=None):
+        """Process URL content, re-downloading it only when the page changed"""
+        try:
+            source_dir = self.content_path / 'url' / source['id']
+            source_dir.mkdir(parents=True, exist_ok=True)
+            content = None
+
+            # HTML fetched when the source was added is used as is
+            if source['progress']['processed_units'] == 0:
+                if isinstance(source.get('content'), dict) and 'html' in source['content']:
+                    # Sources added before the HTML was moved out of memory
+                    content = source['content']['html']
+                elif (source_dir / 'content.html').exists():
+                    with open(source_dir / 'content.html', 'r', encoding='utf-8') as f:
+                        content = f.read()
+
+            if content is None:
+                url = self._url_source_location(source)
+                if not url:
+                    return 0, 0, "URL not found"
+                fetched = fetched or self._fetch_url_source(source, url)
+                if fetched['not_modified']:
+                    if source['progress']['processed_units']:
+                        return 0, 0, None
+                    # Never processed: fall back to the cached copy
+                    if (source_dir / 'content.html').exists():
+                        with open(source_dir / 'content.html', 'r', encoding='utf-8') as f:
+                            content = f.read()
+                    else:
+                        fetched = get_url_fetcher().fetch(url)
+                if content is None:
+                    content = fetched['html']
+                    with open(source_dir / 'content.html', 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    source['http'] = {'etag': fetched['etag'], 'last_modified': fetched['last_modified']}
+
+            paragraphs = text_processing.extract_article_paragraphs(content)
+            added, duplicates = self._ingest_paragraphs(source, paragraphs, normalized=True)
             
             source['progress']['processed_units'] = 1
             source['progress']['total_units'] = 1
@@ -614,69 +3406,178 @@ class ContentManager:
         except Exception as e:
             return 0, 0, f"Error processing URL: {str(e)}"
 
+    def add_url_source(self, fetched, name=None):
+        """Add and ingest a page fetched with UrlFetcher, keeping its validators for refresh"""
+        source_id, error = self.add_source('url', name or fetched['url'], content={
+            'url': fetched['url'],
+            'html': fetched['html']
+        })
+        if error:
+            return 0, 0, error
+        self.active_sources[source_id]['http'] = {'etag': fetched['etag'], 'last_modified': fetched['last_modified']}
+        return self.process_source_content(source_id)
+
+    def refresh_url_sources(self, source_ids=None):
+        """Revalidate many URL sources concurrently, then ingest the changed pages
+
+        Returns (added, duplicates, unchanged, errors) where errors maps source
+        names to messages.
+        """
+        sources = [self.active_sources[source_id] for source_id in (source_ids or self.active_sources)
+                   if source_id in self.active_sources and self.active_sources[source_id]['type'] == 'url']
+        results = get_url_fetcher().map(lambda source: self._fetch_url_source(source), sources)
+
+        total_added = total_duplicates = unchanged = 0
+        errors = {}
+        for source, (fetched, error) in zip(sources, results):
+            if error is None and fetched['not_modified'] and source['progress']['processed_units']:
+                unchanged += 1
+                continue
+            if error is None:
+                added, duplicates, error = self._process_url_content(source, fetched)
+            if error:
+                errors[source['name']] = str(error)
+                continue
+            total_added += added
+            total_duplicates += duplicates
+        return total_added, total_duplicates, unchanged, errors
+
+    @contextmanager
+    def _open_source_data(self, source):
+        """Memory-map a source's stored file for the duration of a batch"""
+        if source.get('file_data'):
+            yield source['file_data']
+            return
+
+        content_file = self.content_path / source['type'] / source['id'] / 'content.data'
+        if not content_file.exists() or content_file.stat().st_size == 0:
+            yield None
+            return
+
+        with open(content_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+                yield file_data
+
+    def _chapter_index_paths(self, source):
+        source_dir = self.content_path / source['type'] / source['id']
+        return source_dir / 'chapters.json', source_dir / 'chapters.txt'
+
+    def _load_chapter_index(self, source):
+        """Return the persisted chapter entries for a source, or None if not built yet"""
+        index_file, text_file = self._chapter_index_paths(source)
+        if not index_file.exists() or not text_file.exists():
+            return None
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('version') != self.CHAPTER_INDEX_VERSION:
+            return None
+        return index['chapters']
+
+    def _build_chapter_index(self, source, file_data):
+        """Extract every chapter once and persist its text with an offset index
+
+        chapters.txt holds the extracted text of all chapters back to back and
+        chapters.json records, in reading order, each chapter's name plus the
+        byte offset and length of its text (length None when the chapter has
+        no Japanese text). Later batches read just their slice of chapters.txt.
+        """
+        with text_processing.EpubArchive(file_data) as archive:
+            names = archive.chapters
+            texts = self._extract_chapter_texts(archive.iter_contents())
+
+        index_file, text_file = self._chapter_index_paths(source)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        chapters = []
+        offset = 0
+        tmp_text = text_file.with_suffix('.tmp')
+        with open(tmp_text, 'wb') as f:
+            for name, text in zip(names, texts):
+                if text is None:
+                    chapters.append({'name': name, 'offset': offset, 'length': None})
+                    continue
+                data = text.encode('utf-8')
+                f.write(data)
+                chapters.append({'name': name, 'offset': offset, 'length': len(data)})
+                offset += len(data)
+        os.replace(tmp_text, text_file)
+
+        # The index is written last, so a missing index always means "rebuild"
+        tmp_index = index_file.with_suffix('.tmp')
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.CHAPTER_INDEX_VERSION, 'chapters': chapters}, f, ensure_ascii=False)
+        os.replace(tmp_index, index_file)
+        return chapters
+
+    def _ensure_chapter_index(self, source):
+        """Load the chapter index, building it on first use; None if the book has no data"""
+        chapters = self._load_chapter_index(source)
+        if chapters is None:
+            with self._open_source_data(source) as file_data:
+                if not file_data:
+                    return None
+                chapters = self._build_chapter_index(source, file_data)
+        return chapters
+
+    def prepare_source(self, source_id):
+        """Do the expensive one-off work for a source ahead of batching
+
+        Only reads the stored file and writes the chapter index, so it can run
+        without holding the user lock. Returns the number of units to process.
+        """
+        source = self.active_sources.get(source_id)
+        if not source:
+            raise KeyError("Source not found")
+        if source['type'] != 'epub':
+            return 1
+        chapters = self._ensure_chapter_index(source)
+        if chapters is None:
+            raise ValueError("No EPUB data found")
+        return len(chapters)
+
+    def _read_chapter_texts(self, source, chapters):
+        """Read the extracted text of the given index entries from chapters.txt"""
+        _, text_file = self._chapter_index_paths(source)
+        texts = []
+        with open(text_file, 'rb') as f:
+            for chapter in chapters:
+                if chapter['length'] is None:
+                    texts.append(None)
+                    continue
+                f.seek(chapter['offset'])
+                texts.append(f.read(chapter['length']).decode('utf-8'))
+        return texts
+
     def _process_epub_batch(self, source, batch_size=5):
         """Process EPUB content in batches"""
         try:
-            if not source['file_data']:
+            chapters = self._ensure_chapter_index(source)
+            if chapters is None:
                 return 0, 0, "No EPUB data found"
-                
-            # Create temporary file to process EPUB
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.epub') as tmp_file:
-                tmp_file.write(source['file_data'])
-                tmp_file_path = tmp_file.name
-
-            # Read EPUB
-            book = epub.read_epub(tmp_file_path, options={'ignore_ncx': True})
-            items = [item for item in book.get_items() 
-                    if item.get_type() == ebooklib.ITEM_DOCUMENT]
             
             # Calculate batch range
             start_pos = source['progress']['current_position']
-            end_pos = min(start_pos + batch_size, len(items))
+            end_pos = min(start_pos + batch_size, len(chapters))
             
             # Process batch
             total_added = 0
             total_duplicates = 0
-            
-            for i in range(start_pos, end_pos):
-                item = items[i]
-                content = item.get_content().decode('utf-8', errors='ignore')
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Clean up HTML
-                for tag in soup(['style', 'script', 'nav', 'header', 'footer']):
-                    tag.decompose()
-                
-                # Extract text
-                text = ""
-                paragraphs = soup.find_all('p')
-                if paragraphs:
-                    text += "\n".join(p.get_text().strip() for p in paragraphs)
-                
-                if not text:
-                    content_divs = soup.find_all('div', class_=['text', 'content', 'body'])
-                    text += "\n".join(div.get_text().strip() for div in content_divs)
-                
-                if not text:
-                    text = soup.get_text().strip()
-                
-                # Process if Japanese text found
-                if text and any(ord(c) > 0x3000 for c in text):
-                    text = re.sub(r'\s+', ' ', text)
-                    text = unicodedata.normalize('NFKC', text)
-                    added, duplicates = self.add_content(text, source['name'])
-                    total_added += added
-                    total_duplicates += duplicates
+
+            texts = [text for text in self._read_chapter_texts(source, chapters[start_pos:end_pos])
+                     if text is not None]
+            for sentences in self._split_chapter_texts(texts):
+                added, duplicates = self.add_sentences(sentences, source['name'])
+                total_added += added
+                total_duplicates += duplicates
             
             # Update progress
             source['progress']['current_position'] = end_pos
             source['progress']['processed_units'] = end_pos
-            source['progress']['total_units'] = len(items)
+            source['progress']['total_units'] = len(chapters)
             source['progress']['last_processed'] = datetime.now()
             
-            # Clean up
-            os.unlink(tmp_file_path)
-            
             # Update metadata
             self._update_source_metadata(source)
             
@@ -686,45 +3587,30 @@ class ContentManager:
             return 0, 0, f"Error processing EPUB batch: {str(e)}"
 
 
-    def _extract_text_from_soup(self, soup):
-        """Extract text content from BeautifulSoup object"""
-        # Remove unwanted elements
-        for tag in soup(['style', 'script', 'nav', 'header', 'footer']):
-            tag.decompose()
-        
-        text = ""
-        # Try paragraphs first
-        paragraphs = soup.find_all('p')
-        if paragraphs:
-            text += "\n".join(p.get_text().strip() for p in paragraphs)
-        
-        # If no paragraphs, try content divs
-        if not text:
-            content_divs = soup.find_all('div', class_=['text', 'content', 'body'])
-            text += "\n".join(div.get_text().strip() for div in content_divs)
-        
-        # If still no text, get all text
-        if not text:
-            text = soup.get_text().strip()
-        
-        # Clean up the text
-        text = re.sub(r'\s+', ' ', text)
-        text = unicodedata.normalize('NFKC', text)
-        
-        return text.strip()
+    def _extract_chapter_texts(self, chapters):
+        """Extract chapter texts, across worker processes when available"""
+        pool = get_extraction_pool()
+        if pool is None:
+            return [text_processing.extract_chapter_text(content) for content in chapters]
+        return list(pool.map(text_processing.extract_chapter_text, chapters, chunksize=4))
+
+    def _split_chapter_texts(self, texts):
+        """Split indexed chapter texts into sentences, across worker processes when available"""
+        pool = get_extraction_pool()
+        if pool is None:
+            return [text_processing.split_into_sentences(text) for text in texts]
+        return list(pool.map(text_processing.split_into_sentences, texts))
 
     def _update_source_metadata(self, source):
-        """Update source metadata file"""
-        source_dir = self.content_path / source['type'] / source['id']
-        with open(source_dir / 'metadata.json', 'w', encoding='utf-8') as f:
-            metadata = {k: v for k, v in source.items() if k != 'file_data'}
-            metadata['created_date'] = metadata['created_date'].isoformat()
-            if 'last_processed' in metadata['progress']:
-                metadata['progress']['last_processed'] = metadata['progress']['last_processed'].isoformat()
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        """Mark a source as changed; its metadata file is rewritten at the next save"""
+        self._record_change('source_updated', self._source_change_payload(source))
 
     def remove_source(self, source_id):
-        """Remove a content source"""
+        """Remove a content source and its files
+
+        Sentences already added from it stay in the deck, with their
+        schedule and history; remove_sentences is what deletes sentences.
+        """
         try:
             if source_id in self.active_sources:
                 source = self.active_sources[source_id]
@@ -736,6 +3622,7 @@ class ContentManager:
                 
                 # Remove from active sources
                 del self.active_sources[source_id]
+                self._record_change('source_removed', {'id': source_id})
                 
                 return True, None
             return False, "Source not found"
@@ -761,103 +3648,250 @@ class ContentManager:
         }
         
     def add_content(self, text, source_name=None):
-        new_sentences = self.split_into_sentences(text)
-        added_count = 0
+        return self.add_sentences(self.split_into_sentences(text), source_name)
+
+    def add_sentences(self, new_sentences, source_name=None, check_near_duplicates=True):
+        """Add already split sentences in one batch, skipping duplicates
+
+        With check_near_duplicates=False only exact duplicates are skipped,
+        which keeps bulk imports to one hash lookup per sentence.
+        """
+        batch = []
+        seen = set()  # Duplicates within the batch itself
         duplicate_count = 0
         
         for sentence in new_sentences:
-            if not self.is_duplicate(sentence['text']):
-                sentence['source'] = source_name
-                self.sentences.append(sentence)
-                added_count += 1
-            else:
+            normalized = normalize_sentence_text(sentence['text'])
+            if normalized in seen or self.is_duplicate(sentence['text']):
                 duplicate_count += 1
+                continue
+            seen.add(normalized)
+            batch.append(sentence)
+
+        near_index = self.near_duplicate_index() if check_near_duplicates and batch else None
+        bands = None
+        if near_index is not None:
+            # Band keys are computed once for the batch and reused below
+            candidates, batch = batch, []
+            candidate_bands = near_index.band_keys([s['text'] for s in candidates])
+            batch_index = NearDuplicateIndex(self.near_duplicate_threshold, text_of=lambda i: batch[i]['text'])
+            kept = []
+            for i, sentence in enumerate(candidates):
+                if (near_index.find(sentence['text'], bands=candidate_bands[i]) is not None
+                        or batch_index.find(sentence['text'], bands=candidate_bands[i]) is not None):
+                    duplicate_count += 1
+                    continue
+                batch_index.add_many([len(batch)], [sentence['text']], bands=candidate_bands[i:i + 1])
+                kept.append(i)
+                batch.append(sentence)
+            bands = candidate_bands[kept]
+
+        if batch:
+            for sentence in batch:
+                sentence['source'] = source_name
+            # Ids are assigned here, in one step for the whole batch
+            self.sentences.extend(batch)
+            # Keep an already built index in sync even when it was not consulted
+            if self._near_duplicates is not None and self._near_duplicates_of is self.sentences:
+                self._near_duplicates.add_many([s['id'] for s in batch], [s['text'] for s in batch], bands)
+        added = [dict(sentence) for sentence in batch]
                 
+        added_count = len(added)
         if source_name and added_count > 0:
             self.sources[source_name] = {
                 'added_date': datetime.now(),
                 'sentence_count': added_count
             }
+
+        if added:
+            self._record_change('sentences_added', {
+                'sentences': added,
+                'source_name': source_name,
+                'source_info': dict(self.sources[source_name]) if source_name else None
+            })
             
         return added_count, duplicate_count
     
     def is_duplicate(self, text):
-        # Normalize text for comparison
-        normalized_text = unicodedata.normalize('NFKC', text.strip())
-        return any(
-            unicodedata.normalize('NFKC', s['text'].strip()) == normalized_text 
-            for s in self.sentences
-        )
+        # Looked up in the store's normalized text index
+        return self.sentences.contains_text(text)
+
+    def remove_sentences(self, sentence_ids):
+        """Delete sentences, keeping the duplicate indexes in sync
+
+        sentences_removed is told about the ids so their schedule and
+        history go with them.
+        """
+        sentence_ids = list(sentence_ids)
+        self.sentences.remove(sentence_ids)
+        if self._near_duplicates is not None and self._near_duplicates_of is self.sentences:
+            self._near_duplicates.remove_many(sentence_ids)
+        self._record_change('sentences_removed', {'ids': sentence_ids})
+        if self.sentences_removed is not None:
+            self.sentences_removed(sentence_ids)
+
+    def _sentence_text(self, sentence_id):
+        sentence = self.sentences.get_by_id(sentence_id)
+        return sentence['text'] if sentence is not None else ''
+
+    def _load_near_duplicate_index(self):
+        """The near-duplicate index over the current sentences, enabled or not
+
+        Loaded from the row log in the content directory on first use and
+        whenever the sentences object is replaced (state load, storage
+        backend switch); only sentences the log does not cover are hashed.
+        """
+        if self._near_duplicates is None or self._near_duplicates_of is not self.sentences:
+            ids, text_hashes = self.sentences.id_hashes()
+            index, missing = NearDuplicateIndex.load(
+                self.content_path / NearDuplicateIndex.LOG_NAME, ids, text_hashes,
+                text_of=self._sentence_text)
+            missing = missing.tolist()
+            for start in range(0, len(missing), self.INGEST_BATCH_SIZE):
+                chunk = missing[start:start + self.INGEST_BATCH_SIZE]
+                index.add_many(chunk, [self._sentence_text(sentence_id) for sentence_id in chunk])
+            self._near_duplicates = index
+            self._near_duplicates_of = self.sentences
+        return self._near_duplicates
+
+    def near_duplicate_index(self):
+        """The near-duplicate index over the current sentences, or None when disabled"""
+        if not self.near_duplicate_threshold or self.near_duplicate_threshold >= 1:
+            return None
+        index = self._load_near_duplicate_index()
+        index.threshold = self.near_duplicate_threshold
+        return index
+
+    def memory_usage(self):
+        """Approximate bytes held by the sentences and the near-duplicate index"""
+        size = self.sentences.memory_usage() if hasattr(self.sentences, 'memory_usage') else 0
+        if self._near_duplicates is not None:
+            size += self._near_duplicates.memory_usage()
+        return size
+
+    def collapse_near_duplicates(self, threshold=None, schedule=None):
+        """Remove near-duplicate sentences from the deck, keeping one per group
+
+        The kept sentence is the most reviewed one, preferring scheduled
+        cards and then the oldest. Returns the number of sentences removed.
+        """
+        threshold = threshold or self.near_duplicate_threshold or NearDuplicateIndex.DEFAULT_THRESHOLD
+        schedule = schedule or {}
+
+        removed = []
+        for group in self._load_near_duplicate_index().clusters(threshold):
+            sentences = [self.get_sentence_by_id(sentence_id) for sentence_id in group]
+            keep = max(sentences, key=lambda s: (s['reviews'], s['id'] in schedule, -s['id']))
+            removed.extend(s['id'] for s in sentences if s['id'] != keep['id'])
+        if removed:
+            self.remove_sentences(removed)
+        return len(removed)
     
     def split_into_sentences(self, text):
-        sentences = []
-        segments = re.split(r'([。！？])', text)
-        
-        for i in range(0, len(segments)-1, 2):
-            if segments[i]:
-                current = (segments[i] + (segments[i+1] if i+1 < len(segments) else '')).strip()
-                if self.is_valid_sentence(current):
-                    sentences.append({
-                        'id': str(uuid.uuid4()),
-                        'text': current,
-                        'created': datetime.now(),
-                        'difficulty': self.calculate_difficulty(current),
-                        'reviews': 0,
-                        'next_review': None,
-                        'status': 'new'
-                    })
-        
-        return sentences
+        return text_processing.split_into_sentences(text)
     
     def is_valid_sentence(self, text):
-        return (
-            text and
-            5 <= len(text) <= 200 and
-            any(ord(c) > 0x3000 for c in text)
-        )
+        return text_processing.is_valid_sentence(text)
     
     def calculate_difficulty(self, text):
-        kanji_count = len([c for c in text if 0x4E00 <= ord(c) <= 0x9FFF])
-        length = len(text)
-        
-        if length == 0:
-            return 1.0
-        
-        kanji_score = min(5, (kanji_count / length) * 10)
-        length_score = min(5, length / 40)
-        
-        return round((kanji_score + length_score) / 2, 1)
+        return text_processing.calculate_difficulty(text)
     
     def get_sentence_by_id(self, sentence_id):
-        for sentence in self.sentences:
-            if sentence['id'] == sentence_id:
-                return sentence
-        return None
+        return self.sentences.get_by_id(sentence_id)
+
+    def mark_reviewed(self, sentence_id):
+        """Flag a sentence as reviewed and bump its review count"""
+        self.sentences.mark_reviewed(sentence_id)
+
+    def count_by_status(self, status):
+        return self.sentences.count_by_status(status)
+
+    def count_by_source(self):
+        """Number of sentences per source name"""
+        return self.sentences.count_by_source()
+
+    def get_average_difficulty(self):
+        return self.sentences.average_difficulty()
+
+    def get_difficulty_histogram(self, bins=10):
+        return self.sentences.difficulty_histogram(bins)
+
+    def get_new_sentences(self, schedule, limit=5):
+        """First sentences that have not been scheduled yet"""
+        return self.sentences.new_sentences(schedule, limit)
+
+    def search(self, query):
+        """Sentences whose text contains the query"""
+        return self.sentences.search(query)
 
 class ReviewSystem:
     def __init__(self):
         self.schedule = {}
-        self.history = []
+        self.history = ReviewHistory()
+        self.pending_changes = []  # Mutations not yet written to the journal
+        self.store = None  # SQLiteStateStore when the schedule lives in the database
+        self._due_index = None
+        self._due_index_of = None  # The schedule object the index was built from
+
+    def _due(self):
+        """The due index over the in-memory schedule
+
+        Built on first use and rebuilt when the schedule object is replaced
+        (state load) or its size no longer matches (edited directly).
+        """
+        if (self._due_index is None or self._due_index_of is not self.schedule
+                or len(self._due_index) != len(self.schedule)):
+            self._due_index = DueIndex(self.schedule)
+            self._due_index_of = self.schedule
+        return self._due_index
+
+    def _set_schedule(self, sentence_id, entry):
+        """Store a schedule entry, moving the card within a built due index"""
+        if self._due_index is not None and self._due_index_of is self.schedule:
+            previous = self.schedule.get(sentence_id)
+            if previous is not None:
+                self._due_index.discard(sentence_id, previous['next_review'])
+            self._due_index.add(sentence_id, entry['next_review'])
+        self.schedule[sentence_id] = entry
     
     def process_response(self, sentence_id, response):
         interval = self.calculate_next_interval(sentence_id, response)
         
-        self.schedule[sentence_id] = {
+        schedule = {
             'next_review': datetime.now() + timedelta(days=interval),
             'interval': interval,
             'last_response': response
         }
-        
-        self.history.append({
+        history_item = {
             'sentence_id': sentence_id,
             'response': response,
             'timestamp': datetime.now()
-        })
+        }
+        self._set_schedule(sentence_id, schedule)
+        self.history.append(history_item)
+        if self.store is None:
+            self.pending_changes.append(('review_recorded', {
+                'sentence_id': sentence_id,
+                'schedule': dict(schedule),
+                'history': dict(history_item)
+            }))
         
-        sentence = st.session_state.content_manager.get_sentence_by_id(sentence_id)
-        if sentence:
-            sentence['status'] = 'reviewed'
+        st.session_state.content_manager.mark_reviewed(sentence_id)
     
+    def import_reviews(self, schedule, history):
+        """Bulk-load schedule entries and review history, e.g. from an imported deck"""
+        if self.store is not None:
+            self.store.put_schedules(schedule)
+            self.store.add_history(history)
+            return
+        self.schedule.update(schedule)
+        self._due_index = None  # Cheaper to rebuild once than to insert card by card
+        self.history.extend(history)
+        self.pending_changes.append(('reviews_imported', {
+            'schedule': {k: dict(v) for k, v in schedule.items()},
+            'history': [dict(item) for item in history]
+        }))
+
     def calculate_next_interval(self, sentence_id, response):
         current = self.schedule.get(sentence_id, {}).get('interval', 0)
         
@@ -868,18 +3902,222 @@ class ReviewSystem:
         else:  # easy
             return current * 3.5 if current else 2
     
-    def get_due_reviews(self):
+    def forget_sentences(self, sentence_ids):
+        """Drop the schedule and history of deleted sentences
+
+        Not journaled: replaying sentences_removed does the same. The SQLite
+        store deletes these rows together with the sentences.
+        """
+        if self.store is not None:
+            return
+        index = self._due_index if self._due_index_of is self.schedule else None
+        for sentence_id in sentence_ids:
+            entry = self.schedule.pop(sentence_id, None)
+            if entry is not None and index is not None:
+                index.discard(sentence_id, entry['next_review'])
+        self.history.remove(sentence_ids)
+
+    def get_due_reviews(self, limit=None):
+        """Ids of the cards due now, soonest first"""
         now = datetime.now()
-        return [
-            sentence_id for sentence_id, schedule in self.schedule.items()
-            if schedule['next_review'] <= now
-        ]
+        if self.store is not None:
+            return self.store.get_due_sentence_ids(now, limit)
+        return self._due().due(now, limit)
+
+    def count_due_reviews(self):
+        now = datetime.now()
+        if self.store is not None:
+            return self.store.count_due(now)
+        return self._due().count_due(now)
+
+    def get_upcoming_reviews(self, limit):
+        """(sentence id, next review) of the `limit` soonest cards, due or not"""
+        if self.store is not None:
+            return self.store.get_upcoming(limit)
+        return self._due().upcoming(limit)
+
+    def get_reviews_by_day(self):
+        """Number of reviews per calendar day"""
+        return self.history.reviews_by_day()
     
     def get_next_review_date(self, sentence_id):
         if sentence_id in self.schedule:
             return self.schedule[sentence_id]['next_review']
         return None
 
+class UserState:
+    """One learner's loaded deck, shared by every browser session of that user"""
+
+    # Rough per-entry cost of the schedule dict (key, entry dict, datetime)
+    SCHEDULE_ENTRY_BYTES = 500
+
+    def __init__(self, user_id, storage_path):
+        self.user_id = user_id
+        # Held for the duration of a script run so tabs of one user take turns
+        self.lock = threading.RLock()
+        self.evicted = False
+        self.state_manager = SessionStateManager(storage_path)
+        success, message, state_data = self.state_manager.load_state()
+        self.load_result = (success, message)
+
+        self.content_manager = ContentManager(content_path=self.state_manager.content_dir)
+        self.review_system = ReviewSystem()
+        self.time_tracker = TimeTracker()
+        if success:
+            self.content_manager.sentences = state_data['content_manager']['sentences']
+            self.content_manager.sources = state_data['content_manager']['sources']
+            self.content_manager.active_sources = state_data['content_manager']['active_sources']
+
+            self.review_system.schedule = state_data['review_system']['schedule']
+            self.review_system.history = state_data['review_system']['history']
+
+            if 'time_tracker' in state_data:
+                self.time_tracker.last_review_date = state_data['time_tracker']['last_review_date']
+                self.time_tracker.study_sessions = state_data['time_tracker']['study_sessions']
+                self.time_tracker.daily_stats = state_data['time_tracker']['daily_stats']
+                self.time_tracker.streak_count = state_data['time_tracker']['streak_count']
+                self.time_tracker.last_active_date = state_data['time_tracker']['last_active_date']
+                self.time_tracker.dirty = False
+
+        self.state_manager.attach_storage(self.content_manager, self.review_system)
+        self.saver = BackgroundSaver(self.state_manager)
+        self.content_manager.batch_committed = lambda: self.saver.submit(
+            self.content_manager, self.review_system, self.time_tracker)
+        self.content_manager.sentences_removed = self.review_system.forget_sentences
+        self.content_manager.reviews_imported = self.review_system.import_reviews
+        self.ingestion = IngestionWorker(self)
+
+    def memory_usage(self):
+        """Approximate bytes of deck data held in memory"""
+        size = 0
+        for part in (self.content_manager, self.review_system.history):
+            if hasattr(part, 'memory_usage'):
+                size += part.memory_usage()
+        if isinstance(self.review_system.schedule, dict):
+            size += len(self.review_system.schedule) * self.SCHEDULE_ENTRY_BYTES
+        return size
+
+    def close(self, save=True):
+        """Write outstanding changes and detach this state from its sessions"""
+        # Not joined: the worker may be waiting for the lock held below
+        self.ingestion.stop()
+        with self.lock:
+            if save:
+                self.saver.submit(self.content_manager, self.review_system, self.time_tracker)
+                self.saver.flush()
+            self.evicted = True
+            if self.state_manager.store is not None:
+                self.state_manager.store.close()
+                self.state_manager.store = None
+
+
+class UserStateCache:
+    """Process-wide LRU of loaded user states kept under a memory budget"""
+
+    def __init__(self, data_root="./data", memory_budget=None):
+        self.data_root = Path(data_root)
+        if memory_budget is None:
+            memory_budget = int(os.environ.get('NEOANKI_CACHE_MEMORY_MB', 1024)) * 1024 * 1024
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._load_locks = {}
+
+    def user_dir(self, user_id):
+        path = self.data_root / f"user_{user_id}"
+        if user_id == 1 and not path.exists():
+            self._adopt_legacy_data(path)
+        return path
+
+    def _adopt_legacy_data(self, path):
+        """Move single-user data from the data root into user 1 (the dev-mode account)"""
+        legacy = [self.data_root / name for name in (
+            "session_state.snap", "session_state.pkl", "session_state.journal",
+            "session_state.db", "session_state.db-wal", "session_state.db-shm",
+            "content", "backups"
+        )]
+        legacy = [item for item in legacy if item.exists()]
+        if not legacy:
+            return
+        path.mkdir(parents=True)
+        for item in legacy:
+            os.replace(item, path / item.name)
+
+    def get(self, user_id):
+        """Return the loaded state for a user, loading it on first use"""
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                self.entries.move_to_end(user_id)
+                return entry
+            load_lock = self._load_locks.setdefault(user_id, threading.Lock())
+
+        # Load outside the cache lock so other users are not blocked
+        with load_lock:
+            with self.lock:
+                entry = self.entries.get(user_id)
+            if entry is None:
+                entry = UserState(user_id, self.user_dir(user_id))
+                with self.lock:
+                    self.entries[user_id] = entry
+                    evicted = self._evict_over_budget(keep=user_id)
+                for old_entry in evicted:
+                    old_entry.close()
+        return entry
+
+    def _evict_over_budget(self, keep):
+        """Drop least recently used states until the rest fit the budget"""
+        evicted = []
+        total = sum(entry.memory_usage() for entry in self.entries.values())
+        for user_id in list(self.entries):
+            if total <= self.memory_budget:
+                break
+            if user_id == keep:
+                continue
+            entry = self.entries.pop(user_id)
+            total -= entry.memory_usage()
+            evicted.append(entry)
+        return evicted
+
+    def invalidate(self, user_id):
+        """Forget a user's state without saving it, e.g. after its files were replaced"""
+        with self.lock:
+            entry = self.entries.pop(user_id, None)
+        if entry is not None:
+            entry.close(save=False)
+
+
+@st.cache_resource
+def get_user_state_cache():
+    return UserStateCache()
+
+
+@st.cache_resource
+def get_extraction_pool():
+    """Process pool for chapter extraction, or None when disabled
+
+    Set NEOANKI_EXTRACTION_WORKERS to 0 or 1 to parse in the script thread.
+    Workers are spawned (not forked) and only import text_processing.
+    """
+    workers = int(os.environ.get('NEOANKI_EXTRACTION_WORKERS', os.cpu_count() or 1))
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+@st.cache_resource
+def get_url_fetcher():
+    workers = int(os.environ.get('NEOANKI_FETCH_WORKERS', 8))
+    return UrlFetcher(max_workers=max(1, workers))
+
+
+def release_user_state():
+    """Let other sessions of this user run again"""
+    user_state = st.session_state.get('locked_user_state')
+    if user_state is not None:
+        st.session_state.locked_user_state = None
+        user_state.lock.release()
+
 def get_grammar_analysis(text):
     """Separate AI call for grammar analysis"""
     prompt = f"""
@@ -967,40 +4205,31 @@ def init_streamlit():
         </style>
     """, unsafe_allow_html=True)
 
-    # Initialize session state
-    if 'initialized' not in st.session_state:
-        state_manager = SessionStateManager()
-        success, message, state_data = state_manager.load_state()
-
+    # Initialize session state; the deck itself is shared by all sessions of the user
+    user_state = st.session_state.get('user_state')
+    if (not st.session_state.get('initialized') or user_state is None or user_state.evicted
+            or user_state.user_id != st.session_state.user_id):
+        user_state = get_user_state_cache().get(st.session_state.user_id)
+        success, message = user_state.load_result
         if success:
-            st.session_state.content_manager = ContentManager()
-            st.session_state.content_manager.sentences = state_data['content_manager']['sentences']
-            
-            st.session_state.review_system = ReviewSystem()
-            st.session_state.review_system.schedule = state_data['review_system']['schedule']
-            st.session_state.review_system.history = state_data['review_system']['history']
-            
-            st.session_state.time_tracker = TimeTracker()
-            if 'time_tracker' in state_data:
-                st.session_state.time_tracker.last_review_date = state_data['time_tracker']['last_review_date']
-                st.session_state.time_tracker.study_sessions = state_data['time_tracker']['study_sessions']
-                st.session_state.time_tracker.daily_stats = state_data['time_tracker']['daily_stats']
-                st.session_state.time_tracker.streak_count = state_data['time_tracker']['streak_count']
-                st.session_state.time_tracker.last_active_date = state_data['time_tracker']['last_active_date']
-            
             st.success("Previous session restored!")
-        else:
-            st.session_state.content_manager = ContentManager()
-            st.session_state.review_system = ReviewSystem()
-            st.session_state.time_tracker = TimeTracker()
-            if message != "No saved state found":
-                st.warning(f"Started new session: {message}")
+        elif message != "No saved state found":
+            st.warning(f"Started new session: {message}")
 
+        st.session_state.user_state = user_state
         st.session_state.initialized = True
-        st.session_state.state_manager = state_manager
         st.session_state.last_save = datetime.now()
         st.session_state.dark_mode = False
 
+    user_state.lock.acquire()
+    st.session_state.locked_user_state = user_state
+    st.session_state.content_manager = user_state.content_manager
+    st.session_state.review_system = user_state.review_system
+    st.session_state.time_tracker = user_state.time_tracker
+    st.session_state.state_manager = user_state.state_manager
+    st.session_state.saver = user_state.saver
+    st.session_state.ingestion = user_state.ingestion
+
     # Add analysis components styling
     render_analysis_components()
     if 'analysis_language' not in st.session_state:
@@ -1037,21 +4266,18 @@ def render_card(sentence, review_system):
         with col1:
             if st.button("Hard", key=f"hard_{sentence['id']}"):
                 review_system.process_response(sentence['id'], 'hard')
-                sentence['reviews'] += 1
                 st.session_state.time_tracker.log_review()
                 st.rerun()
         
         with col2:
             if st.button("Good", key=f"good_{sentence['id']}"):
                 review_system.process_response(sentence['id'], 'good')
-                sentence['reviews'] += 1
                 st.session_state.time_tracker.log_review()
                 st.rerun()
         
         with col3:
             if st.button("Easy", key=f"easy_{sentence['id']}"):
                 review_system.process_response(sentence['id'], 'easy')
-                sentence['reviews'] += 1
                 st.session_state.time_tracker.log_review()
                 st.rerun()
         
@@ -1146,61 +4372,35 @@ def render_card(sentence, review_system):
 
 def process_epub_content(uploaded_file):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.epub') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
-
         st.write("Starting EPUB processing...")
         
-        book = epub.read_epub(tmp_file_path, options={'ignore_ncx': True})
-        items = [item for item in book.get_items() 
-                if item.get_type() == ebooklib.ITEM_DOCUMENT]
-        
-        st.write(f"Found {len(items)} chapters to process")
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        text_content = []
-        
-        start_idx = 0 if 'processed_chapters' not in st.session_state else st.session_state.processed_chapters
-        end_idx = min(start_idx + 5, len(items))  # Process 5 chapters at a time
-        
-        for i, item in enumerate(items[start_idx:end_idx], start=start_idx):
-            status_text.text(f"Processing chapter {i+1}/{len(items)}")
+        with text_processing.EpubArchive(uploaded_file.getvalue()) as archive:
+            total = len(archive.chapters)
+            st.write(f"Found {total} chapters to process")
             
-            try:
-                content = item.get_content().decode('utf-8', errors='ignore')
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                for tag in soup(['style', 'script', 'nav', 'header', 'footer']):
-                    tag.decompose()
-                
-                text = ""
-                paragraphs = soup.find_all('p')
-                if paragraphs:
-                    text += "\n".join(p.get_text().strip() for p in paragraphs)
-                
-                if not text:
-                    content_divs = soup.find_all('div', class_=['text', 'content', 'body'])
-                    text += "\n".join(div.get_text().strip() for div in content_divs)
-                
-                if not text:
-                    text = soup.get_text().strip()
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            text_content = []
+            
+            start_idx = 0 if 'processed_chapters' not in st.session_state else st.session_state.processed_chapters
+            end_idx = min(start_idx + 5, total)  # Process 5 chapters at a time
+            
+            for i, content in enumerate(archive.iter_contents(start_idx, end_idx), start=start_idx):
+                status_text.text(f"Processing chapter {i+1}/{total}")
                 
-                if text and any(ord(c) > 0x3000 for c in text):
-                    text = re.sub(r'\s+', ' ', text)
-                    text = unicodedata.normalize('NFKC', text)
-                    text_content.append(text)
-                    st.write(f"✓ Chapter {i+1}: Found {len(text)} characters")
+                try:
+                    text = text_processing.extract_chapter_text(content)
+                    if text:
+                        text_content.append(text)
+                        st.write(f"✓ Chapter {i+1}: Found {len(text)} characters")
+                    
+                except Exception as e:
+                    st.warning(f"Error in chapter {i+1}: {str(e)}")
                 
-            except Exception as e:
-                st.warning(f"Error in chapter {i+1}: {str(e)}")
-            
-            progress_bar.progress((i + 1 - start_idx) / (end_idx - start_idx))
+                progress_bar.progress((i + 1 - start_idx) / (end_idx - start_idx))
         
         progress_bar.empty()
         status_text.empty()
-        os.unlink(tmp_file_path)
         
         if not text_content:
             st.warning("No Japanese text found in these chapters.")
@@ -1211,7 +4411,7 @@ def process_epub_content(uploaded_file):
         
         st.session_state.processed_chapters = end_idx
         
-        has_more = end_idx < len(items)
+        has_more = end_idx < total
         return combined_text, has_more
         
     except Exception as e:
@@ -1496,10 +4696,10 @@ def text_to_speech(text):
         st.warning(f"Audio generation failed: {str(e)}")
         return None
 
-def render_feed(content_manager, review_system):
+def render_feed(content_manager, review_system, sentences=None):
     if 'epub_state' in st.session_state and st.session_state.get('processed_chapters', 0) > 0:
-        total_items = len([item for item in content_manager.sentences if item['status'] == 'new'])
-        processed = len([item for item in content_manager.sentences if item['status'] == 'reviewed'])
+        total_items = content_manager.count_by_status('new')
+        processed = content_manager.count_by_status('reviewed')
         
         st.markdown(f"""
         <div class="load-more-container">
@@ -1514,16 +4714,23 @@ def render_feed(content_manager, review_system):
         return
     
     due_reviews = review_system.get_due_reviews()
-    new_cards = [s for s in content_manager.sentences 
-                 if s['id'] not in review_system.schedule][:5]
+    if sentences is None:
+        new_cards = content_manager.get_new_sentences(review_system.schedule, limit=5)
+        get_sentence = content_manager.get_sentence_by_id
+    else:
+        # Restrict the feed to a subset, e.g. search results
+        by_id = {s['id']: s for s in sentences}
+        new_cards = [s for s in sentences if s['id'] not in review_system.schedule][:5]
+        get_sentence = by_id.get
     
     for sentence_id in due_reviews:
-        sentence = content_manager.get_sentence_by_id(sentence_id)
+        sentence = get_sentence(sentence_id)
         if sentence:
             render_card(sentence, review_system)
     
+    due_ids = set(due_reviews)
     for sentence in new_cards:
-        if sentence['id'] not in due_reviews:
+        if sentence['id'] not in due_ids:
             render_card(sentence, review_system)
 
 def render_schedule(content_manager, review_system):
@@ -1533,10 +4740,11 @@ def render_schedule(content_manager, review_system):
     
     today = datetime.now().date()
     scheduled_cards = defaultdict(list)
+    schedule = dict(review_system.schedule.items())
     
     for sentence in content_manager.sentences:
-        if sentence['id'] in review_system.schedule:
-            next_review = review_system.schedule[sentence['id']]['next_review'].date()
+        if sentence['id'] in schedule:
+            next_review = schedule[sentence['id']]['next_review'].date()
             days_until = (next_review - today).days
             
             if days_until < 0:
@@ -1545,14 +4753,14 @@ def render_schedule(content_manager, review_system):
                 scheduled_cards[f"In {days_until} days"].append(sentence)
     
     new_cards = [s for s in content_manager.sentences 
-                 if s['id'] not in review_system.schedule]
+                 if s['id'] not in schedule]
     if new_cards:
         scheduled_cards["New Cards"] = new_cards
     
-    for schedule, cards in sorted(scheduled_cards.items()):
-        with st.expander(f"{schedule} ({len(cards)} cards)"):
+    for label, cards in sorted(scheduled_cards.items()):
+        with st.expander(f"{label} ({len(cards)} cards)"):
             for card in cards:
-                interval = review_system.schedule.get(card['id'], {}).get('interval', 0)
+                interval = schedule.get(card['id'], {}).get('interval', 0)
                 card_color = "#fff0f0" if card['status'] == 'new' else "#f0fff0"
                 st.markdown(f"""
                 <div class="schedule-card" style="background-color: {card_color}">
@@ -1580,10 +4788,7 @@ def render_stats(content_manager, review_system, time_tracker):
         st.metric("Average Daily Reviews", f"{stats['average_daily_reviews']:.1f}")
 
     # Review history chart
-    reviews_by_day = defaultdict(int)
-    for review in review_system.history:
-        date = review['timestamp'].date()
-        reviews_by_day[date] += 1
+    reviews_by_day = review_system.get_reviews_by_day()
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(
@@ -1599,6 +4804,21 @@ def render_stats(content_manager, review_system, time_tracker):
     )
     st.plotly_chart(fig)
 
+    # Difficulty distribution
+    counts, edges = content_manager.get_difficulty_histogram()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=[f"{lo:.1f}-{hi:.1f}" for lo, hi in zip(edges[:-1], edges[1:])],
+        y=counts,
+        name='Cards'
+    ))
+    fig.update_layout(
+        title='Difficulty Distribution',
+        xaxis_title='Difficulty',
+        yaxis_title='Number of Cards'
+    )
+    st.plotly_chart(fig)
+
     # Add source statistics
     st.markdown("### Content Source Statistics")
     col1, col2, col3, col4 = st.columns(4)
@@ -1623,8 +4843,8 @@ def render_stats(content_manager, review_system, time_tracker):
 def get_tutor_context(content_manager, review_system):
     """Get context about user's learning progress for the tutor"""
     total_cards = len(content_manager.sentences)
-    reviewed_cards = len([s for s in content_manager.sentences if s['status'] == 'reviewed'])
-    avg_difficulty = sum(s['difficulty'] for s in content_manager.sentences) / total_cards if total_cards > 0 else 0
+    reviewed_cards = content_manager.count_by_status('reviewed')
+    avg_difficulty = content_manager.get_average_difficulty()
     
     recent_sentences = [s['text'] for s in content_manager.sentences if s['status'] == 'reviewed'][-5:]
     
@@ -1723,11 +4943,13 @@ def export_progress(content_manager, review_system, time_tracker):
             ],
             'review_history': [
                 {
-                    'sentence_text': content_manager.get_sentence_by_id(h['sentence_id'])['text'],
+                    'sentence_text': sentence['text'],
                     'response': h['response'],
                     'timestamp': h['timestamp'].isoformat()
                 }
                 for h in review_system.history
+                # Reviews of sentences deleted before their history was cleaned up
+                if (sentence := content_manager.get_sentence_by_id(h['sentence_id'])) is not None
             ],
             'stats': {
                 'streak': time_tracker.streak_count,
@@ -1745,25 +4967,24 @@ def export_progress(content_manager, review_system, time_tracker):
     
 
 def backup_system_state(state_manager):
-    """Create downloadable backup of entire system state"""
+    """Create a backup archive on disk and return its path"""
     try:
-        backup_file = state_manager.create_backup()
-        with open(backup_file, 'rb') as f:
-            return f.read()
+        return state_manager.create_backup()
     except Exception as e:
         st.error(f"Backup creation failed: {str(e)}")
         return None
 
 def restore_system_state(uploaded_file, state_manager):
-    """Restore system state from backup file"""
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            success = state_manager.restore_from_backup(tmp_file.name)
-            os.unlink(tmp_file.name)
-            return success
-    except Exception as e:
-        return False, f"Restore failed: {str(e)}"
+    """Restore system state from an uploaded backup archive"""
+    # Let queued saves land first so they cannot overwrite the restored state
+    if 'saver' in st.session_state:
+        st.session_state.saver.flush()
+    success, message = state_manager.restore_from_backup(uploaded_file)
+    if success:
+        # Reload everything from the restored files on the next run
+        get_user_state_cache().invalidate(st.session_state.user_id)
+        del st.session_state['initialized']
+    return success, message
 
 def render_settings_section():
     """Render the settings section in the sidebar"""
@@ -1773,14 +4994,18 @@ def render_settings_section():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Download Backup"):
-                backup_data = backup_system_state(st.session_state.state_manager)
-                if backup_data:
+                backup_file = backup_system_state(st.session_state.state_manager)
+                if backup_file:
                     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    # download_button keeps its payload in memory either way, so
+                    # the archive is read once and not left behind in backups/
+                    data = backup_file.read_bytes()
+                    backup_file.unlink()
                     st.download_button(
                         label="Save Backup File",
-                        data=backup_data,
-                        file_name=f"neoanki_backup_{timestamp}.pkl",
-                        mime="application/octet-stream"
+                        data=data,
+                        file_name=f"neoanki_backup_{timestamp}.zip",
+                        mime="application/zip"
                     )
         
         with col2:
@@ -1804,15 +5029,28 @@ def render_settings_section():
         
         st.markdown("### Content Sources")
         if st.session_state.content_manager.sources:
+            sentence_counts = st.session_state.content_manager.count_by_source()
             for source, info in st.session_state.content_manager.sources.items():
                 st.markdown(f"""
                     **{source}**  
                     Added: {info['added_date'].strftime('%Y-%m-%d')}  
-                    Sentences: {info['sentence_count']}
+                    Sentences: {sentence_counts.get(source, info['sentence_count'])}
                 """)
         else:
             st.info("No content sources added yet")
 
+def render_save_status():
+    """Show the outcome of the most recent background save"""
+    saver = st.session_state.saver
+    if saver.pending():
+        st.caption("💾 Saving in background...")
+    elif saver.last_result:
+        success, message, finished_at = saver.last_result
+        if success:
+            st.caption(f"💾 Last saved at {finished_at.strftime('%H:%M:%S')}")
+        else:
+            st.error(f"Auto-save failed: {message}")
+
 def show_confirmation_dialog(message):
     return st.warning(message, icon="⚠️")
 
@@ -1822,8 +5060,8 @@ def show_loading_state():
 def render_stats_summary():
     if st.session_state.content_manager.sentences:
         total_cards = len(st.session_state.content_manager.sentences)
-        reviewed_cards = len([s for s in st.session_state.content_manager.sentences if s['status'] == 'reviewed'])
-        due_cards = len(st.session_state.review_system.get_due_reviews())
+        reviewed_cards = st.session_state.content_manager.count_by_status('reviewed')
+        due_cards = st.session_state.review_system.count_due_reviews()
         
         st.markdown("""
             <div style='padding: 1rem; background-color: #f8f9fa; border-radius: 10px; margin-bottom: 1rem;'>
@@ -1854,7 +5092,8 @@ def render_content_input():
     sources_by_type = {
         'epub': [],
         'text': [],
-        'url': []
+        'url': [],
+        'deck': []
     }
     
     for source_id, source in st.session_state.content_manager.active_sources.items():
@@ -1877,16 +5116,28 @@ def render_content_input():
 
     with st.expander("🔗 URL Sources", expanded=True):
         if sources_by_type['url']:
+            if len(sources_by_type['url']) > 1 and st.button("Refresh all", key="refresh_all_urls"):
+                with st.spinner("Checking sources for changes..."):
+                    added, duplicates, unchanged, errors = st.session_state.content_manager.refresh_url_sources()
+                st.success(f"Added {added} new sentences ({duplicates} duplicates skipped); "
+                           f"{unchanged} pages unchanged")
+                for name, error in errors.items():
+                    st.warning(f"{name}: {error}")
             for source in sources_by_type['url']:
                 render_url_source(source)
         else:
             st.info("No URL sources added yet")
 
+    if sources_by_type['deck']:
+        with st.expander("🗂️ Imported Decks", expanded=True):
+            for source in sources_by_type['deck']:
+                render_text_source(source)
+
     # Add new content section
     st.markdown("### Add New Content")
     input_method = st.radio(
         "Choose input method:",
-        ["EPUB", "Text", "URL"],
+        ["EPUB", "Text", "URL", "Deck"],
         horizontal=True,
         key="content_input_method_main"
     )
@@ -1896,9 +5147,43 @@ def render_content_input():
         render_epub_upload(key_prefix="main_")
     elif input_method == "Text":
         render_text_input(key_prefix="main_")
+    elif input_method == "Deck":
+        render_deck_import(key_prefix="main_")
     else:  # URL
         render_url_input(key_prefix="main_")
 
+    with st.expander("🧹 Near-duplicate sentences"):
+        render_near_duplicate_settings()
+
+
+def render_near_duplicate_settings():
+    """Threshold for skipping near-duplicates on import, and a bulk collapse pass"""
+    content_manager = st.session_state.content_manager
+    enabled = st.checkbox(
+        "Skip near-duplicate sentences when adding content",
+        value=bool(content_manager.near_duplicate_threshold),
+        key="near_dup_enabled"
+    )
+    threshold = st.slider(
+        "Similarity threshold",
+        min_value=0.5,
+        max_value=0.99,
+        value=float(content_manager.near_duplicate_threshold or NearDuplicateIndex.DEFAULT_THRESHOLD),
+        step=0.01,
+        help="Share of three-character sequences two sentences must have in common to count as near-duplicates",
+        key="near_dup_threshold"
+    )
+    content_manager.near_duplicate_threshold = threshold if enabled else None
+
+    if st.button("Collapse near-duplicates in deck", key="collapse_near_dups"):
+        with st.spinner("Looking for near-duplicates..."):
+            removed = content_manager.collapse_near_duplicates(
+                threshold, schedule=st.session_state.review_system.schedule)
+        if removed:
+            st.success(f"Removed {removed} near-duplicate sentences")
+        else:
+            st.info("No near-duplicates found")
+
 
 def render_epub_source(source):
     """Render an individual EPUB source with progress"""
@@ -1922,8 +5207,30 @@ def render_epub_source(source):
                 except Exception:
                     st.caption(f"Last processed: {progress['last_processed']}")
         
+            render_ingestion_status(source['id'])
+        
         with col2:
-            if progress['processed_units'] < progress['total_units']:
+            ingestion = st.session_state.ingestion
+            job = ingestion.status(source['id'])
+            job_state = job['state'] if job else None
+            if job_state in ('queued', 'running'):
+                if st.button("Pause", key=f"pause_{source['id']}"):
+                    ingestion.pause(source['id'])
+                    st.rerun()
+            elif job_state == 'paused':
+                if st.button("Resume", key=f"resume_{source['id']}"):
+                    ingestion.resume(source['id'])
+                    st.rerun()
+            if job_state in IngestionWorker.ACTIVE_STATES:
+                if st.button("Cancel", key=f"cancel_{source['id']}"):
+                    ingestion.cancel(source['id'])
+                    st.rerun()
+            elif progress['processed_units'] < progress['total_units'] or progress['total_units'] == 0:
+                if st.button("Ingest all", key=f"ingest_{source['id']}"):
+                    ingestion.enqueue(source['id'])
+                    st.rerun()
+            
+            if job_state not in IngestionWorker.ACTIVE_STATES and progress['processed_units'] < progress['total_units']:
                 if st.button("Continue", key=f"continue_{source['id']}"):
                     with st.spinner("Processing next batch..."):
                         added, duplicates, error = st.session_state.content_manager.process_source_content(
@@ -1936,6 +5243,7 @@ def render_epub_source(source):
             
             if st.button("Remove", key=f"remove_{source['id']}", type="secondary"):
                 if show_confirmation_dialog("Are you sure you want to remove this book?"):
+                    ingestion.cancel(source['id'])
                     success, error = st.session_state.content_manager.remove_source(source['id'])
                     if success:
                         st.success("Book removed successfully!")
@@ -1943,6 +5251,45 @@ def render_epub_source(source):
                     else:
                         st.error(error)
 
+def _poll_every(seconds):
+    """Rerun the decorated part of the page on a timer where Streamlit supports fragments"""
+    fragment = getattr(st, 'fragment', None)
+    if fragment is None:
+        return lambda func: func
+    return fragment(run_every=seconds)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+
+@_poll_every(2)
+def render_ingestion_status(source_id):
+    """Live throughput and ETA of a background ingestion job"""
+    job = st.session_state.ingestion.status(source_id)
+    if job is None:
+        return
+    if job['state'] == 'running':
+        if job['total']:
+            st.progress(job['processed'] / job['total'], f"Ingesting {job['processed']}/{job['total']} chapters")
+        if job['rate']:
+            st.caption(f"⚙️ {job['rate'] * 60:.1f} chapters/min · ETA {format_duration(job['eta'])} · "
+                       f"{job['added']} sentences added")
+        else:
+            st.caption("⚙️ Preparing book...")
+    elif job['state'] == 'queued':
+        st.caption("⏳ Queued for ingestion")
+    elif job['state'] == 'paused':
+        st.caption(f"⏸️ Paused at {job['processed']}/{job['total']} chapters")
+    elif job['state'] == 'done':
+        st.caption(f"✅ Ingested: {job['added']} sentences added, {job['duplicates']} duplicates skipped")
+    elif job['state'] == 'failed':
+        st.error(f"Ingestion failed: {job['error']}")
+
 def render_text_source(source):
     """Render an individual text source"""
     with st.container():
@@ -1974,13 +5321,23 @@ def render_url_source(source):
             st.markdown(f"**{source['name']}**")
             st.caption(f"URL: {source.get('url', 'N/A')}")
             st.caption(f"Added: {source['created_date'].strftime('%Y-%m-%d %H:%M')}")
+            if source.get('stale_sentences'):
+                st.caption(f"⚠️ {source['stale_sentences']} sentences come from paragraphs no longer on the page")
         
         with col2:
+            if source.get('stale_sentences') and st.button("Remove stale", key=f"remove_stale_{source['id']}"):
+                removed = st.session_state.content_manager.remove_stale_sentences(source['id'])
+                st.success(f"Removed {removed} stale sentences")
+                st.rerun()
+            
             if st.button("Refresh", key=f"refresh_{source['id']}"):
                 with st.spinner("Refreshing content..."):
-                    added, duplicates, error = st.session_state.content_manager.process_source_content(source['id'])
-                    if error:
-                        st.error(error)
+                    added, duplicates, unchanged, errors = st.session_state.content_manager.refresh_url_sources(
+                        [source['id']])
+                    if errors:
+                        st.error(next(iter(errors.values())))
+                    elif unchanged:
+                        st.info("Page unchanged since the last fetch")
                     else:
                         st.success(f"Added {added} new sentences! ({duplicates} duplicates skipped)")
             
@@ -2029,49 +5386,86 @@ def render_epub_upload(key_prefix=""):
                         st.rerun()
 
 def render_url_input(key_prefix=""):
-    url = st.text_input(
-        "Enter article URL",
-        key=f"{key_prefix}url_input"
-    )
-    
-    source_name = st.text_input(
-        "Source name (optional)",
-        key=f"{key_prefix}url_source_name"
+    mode = st.radio(
+        "Import",
+        ["Single URL", "URL list", "RSS/Atom feed"],
+        horizontal=True,
+        key=f"{key_prefix}url_mode"
     )
     
-    if st.button("Add URL", key=f"{key_prefix}add_url"):
-        if url:
-            with st.spinner("Fetching content..."):
-                try:
-                    # Add proper headers and verify SSL
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }
-                    response = requests.get(url, headers=headers, verify=True)
-                    response.raise_for_status()  # Raise an error for bad status codes
-                    
-                    source_id, error = st.session_state.content_manager.add_source(
-                        'url',
-                        source_name or url,
-                        content={
-                            'url': url,
-                            'html': response.text  # Store both URL and fetched content
-                        }
-                    )
-                    
-                    if error:
-                        st.error(error)
-                    else:
-                        added, duplicates, error = st.session_state.content_manager.process_source_content(source_id)
+    if mode == "Single URL":
+        url = st.text_input(
+            "Enter article URL",
+            key=f"{key_prefix}url_input"
+        )
+        
+        source_name = st.text_input(
+            "Source name (optional)",
+            key=f"{key_prefix}url_source_name"
+        )
+        
+        if st.button("Add URL", key=f"{key_prefix}add_url"):
+            if url:
+                with st.spinner("Fetching content..."):
+                    try:
+                        fetched = get_url_fetcher().fetch(url)
+                        added, duplicates, error = st.session_state.content_manager.add_url_source(
+                            fetched, source_name or url)
                         if error:
                             st.error(error)
                         else:
                             st.success(f"Added {added} new sentences! ({duplicates} duplicates skipped)")
                             st.rerun()
-                except Exception as e:
-                    st.error(f"Error fetching URL: {str(e)}")
-        else:
-            st.warning("Please enter a URL")
+                    except Exception as e:
+                        st.error(f"Error fetching URL: {str(e)}")
+            else:
+                st.warning("Please enter a URL")
+        return
+    
+    if mode == "URL list":
+        url_text = st.text_area(
+            "Article URLs, one per line",
+            height=150,
+            key=f"{key_prefix}url_list"
+        )
+    else:
+        feed_url = st.text_input(
+            "Feed URL",
+            key=f"{key_prefix}feed_url"
+        )
+    
+    if st.button("Import", key=f"{key_prefix}import_urls"):
+        fetcher = get_url_fetcher()
+        try:
+            if mode == "URL list":
+                urls = list(dict.fromkeys(line.strip() for line in url_text.splitlines() if line.strip()))
+            else:
+                urls = fetcher.feed_links(feed_url) if feed_url else []
+        except Exception as e:
+            st.error(f"Error reading feed: {str(e)}")
+            return
+        if not urls:
+            st.warning("No URLs to import")
+            return
+        
+        with st.spinner(f"Fetching {len(urls)} pages..."):
+            results = fetcher.fetch_many(urls)
+        
+        total_added = total_duplicates = 0
+        failures = []
+        for url, (fetched, error) in zip(urls, results):
+            if error is None:
+                added, duplicates, error = st.session_state.content_manager.add_url_source(fetched, url)
+            if error:
+                failures.append(f"{url}: {error}")
+                continue
+            total_added += added
+            total_duplicates += duplicates
+        
+        st.success(f"Imported {len(urls) - len(failures)}/{len(urls)} pages: "
+                   f"{total_added} new sentences ({total_duplicates} duplicates skipped)")
+        for failure in failures:
+            st.warning(failure)
 
 def render_text_input(key_prefix=""):
     text_input = st.text_area(
@@ -2085,6 +5479,24 @@ def render_text_input(key_prefix=""):
         key=f"{key_prefix}text_source_name"
     )
     
+    uploaded_file = st.file_uploader(
+        "...or upload a large text file (UTF-8)",
+        type=['txt'],
+        key=f"{key_prefix}text_file"
+    )
+    
+    if uploaded_file is not None and st.button("Add File", key=f"{key_prefix}add_text_file"):
+        with st.spinner("Processing file..."):
+            content_manager = st.session_state.content_manager
+            source_id, error = content_manager.add_text_file(source_name or uploaded_file.name, uploaded_file)
+            if not error:
+                added, duplicates, error = content_manager.process_source_content(source_id)
+            if error:
+                st.error(error)
+            else:
+                st.success(f"Added {added} new sentences! ({duplicates} duplicates skipped)")
+                st.rerun()
+    
     if st.button("Add Text", key=f"{key_prefix}add_text"):
         if text_input:
             with st.spinner("Processing text..."):
@@ -2109,6 +5521,34 @@ def render_text_input(key_prefix=""):
         else:
             st.warning("Please enter some text")
     
+def render_deck_import(key_prefix=""):
+    """Import a CSV/TSV export or an Anki .apkg package, with its review history"""
+    uploaded_file = st.file_uploader(
+        "Upload a deck (CSV, TSV or Anki .apkg)",
+        type=['csv', 'tsv', 'txt', 'apkg'],
+        key=f"{key_prefix}deck_file"
+    )
+    field = st.number_input(
+        "Field holding the sentence (0 = first)",
+        min_value=0, value=0, step=1,
+        help="Ignored for CSV/TSV files with a text, sentence, front or expression header",
+        key=f"{key_prefix}deck_field"
+    )
+
+    if uploaded_file is not None and st.button("Import Deck", key=f"{key_prefix}import_deck"):
+        extension = Path(uploaded_file.name).suffix.lower().lstrip('.')
+        deck_format = {'apkg': 'apkg', 'csv': 'csv'}.get(extension, 'tsv')
+        with st.spinner("Importing deck..."):
+            content_manager = st.session_state.content_manager
+            source_id, error = content_manager.add_deck_file(uploaded_file.name, uploaded_file, deck_format, int(field))
+            if not error:
+                added, duplicates, error = content_manager.import_deck(source_id, st.session_state.review_system)
+            if error:
+                st.error(error)
+            else:
+                st.success(f"Imported {added} sentences! ({duplicates} duplicates skipped)")
+                st.rerun()
+
 def main():
     # Initialize authentication first
     init_auth()
@@ -2117,10 +5557,7 @@ def main():
     if not render_auth_page():
         return
     
-    # Initialize user-specific data storage
-    user_data_path = f"./data/user_{st.session_state.user_id}"
-    
-    # Continue with existing initialization
+    # Continue with existing initialization (loads ./data/user_<id>)
     init_streamlit()
     
     st.title("自然暗記 - Natural Anki")
@@ -2161,12 +5598,18 @@ def main():
         with col1:
             if st.button("💾 Save", help="Save your current progress"):
                 with st.spinner("Saving..."):
-                    success, message = st.session_state.state_manager.save_state(
+                    submitted = st.session_state.saver.submit(
                         st.session_state.content_manager,
                         st.session_state.review_system,
                         st.session_state.time_tracker
                     )
-                    if success:
+                    st.session_state.last_save = datetime.now()
+                    st.session_state.saver.flush(timeout=30)
+                    last_result = st.session_state.saver.last_result
+                    success, message, _ = last_result or (False, "Save still running", None)
+                    if not submitted and (success or last_result is None):
+                        st.info("No changes to save")
+                    elif success:
                         st.success("Saved!")
                     else:
                         st.error(message)
@@ -2189,20 +5632,22 @@ def main():
         with col3:
             uploaded_file = st.file_uploader(
                 "🔄 Restore",
-                type=['pkl'],
+                type=['zip', 'pkl'],  # older backups were zips named .pkl
                 help="Restore from backup",
                 key="restore_uploader"
             )
             if uploaded_file:
                 if st.button("Restore"):
                     with st.spinner("Restoring..."):
-                        success = restore_system_state(uploaded_file, st.session_state.state_manager)
+                        success, message = restore_system_state(uploaded_file, st.session_state.state_manager)
                         if success:
                             st.success("Restored!")
                             st.rerun()
                         else:
-                            st.error("Restore failed")
+                            st.error(message)
         
+        render_save_status()
+
         # Dark mode toggle
         st.markdown("---")
         if st.toggle("🌙 Dark Mode"):
@@ -2251,14 +5696,13 @@ def main():
     
     with tab1:
         if search_query:
-            filtered_sentences = [
-                s for s in st.session_state.content_manager.sentences 
-                if search_query.lower() in s['text'].lower()
-            ]
+            filtered_sentences = st.session_state.content_manager.search(search_query)
             if filtered_sentences:
-                temp_manager = ContentManager()
-                temp_manager.sentences = filtered_sentences
-                render_feed(temp_manager, st.session_state.review_system)
+                render_feed(
+                    st.session_state.content_manager,
+                    st.session_state.review_system,
+                    sentences=filtered_sentences
+                )
             else:
                 st.info("No matching cards found")
         else:
@@ -2336,15 +5780,17 @@ def main():
             st.session_state.review_system
         )
     
-    # Auto-save check
+    # Auto-save check; the write happens on the background saver
     current_time = datetime.now()
     if (current_time - st.session_state.last_save).seconds >= 300:  # 5 minutes
-        with st.spinner("Auto-saving..."):
-            success, message = st.session_state.state_manager.save_state(
-                st.session_state.content_manager,
-                st.session_state.review_system,
-                st.session_state.time_tracker
-            )
-            st.session_state.last_save = current_time
+        st.session_state.saver.submit(
+            st.session_state.content_manager,
+            st.session_state.review_system,
+            st.session_state.time_tracker
+        )
+        st.session_state.last_save = current_time
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        release_user_state()
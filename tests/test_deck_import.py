@@ -0,0 +1,48 @@
+"""Reading decks exported from other tools"""
+import io
+import sqlite3
+import zipfile
+from datetime import datetime
+
+import deck_import
+
+
+def make_apkg(tmp_path, cards):
+    """An .apkg with one note per (text, card type, due, interval) tuple"""
+    path = tmp_path / 'collection.anki2'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE col (crt INTEGER);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, flds TEXT);
+        CREATE TABLE cards (id INTEGER PRIMARY KEY, nid INTEGER, ord INTEGER, type INTEGER,
+                            due INTEGER, ivl INTEGER, reps INTEGER);
+        CREATE TABLE revlog (id INTEGER PRIMARY KEY, cid INTEGER, ease INTEGER);
+    """)
+    conn.execute("INSERT INTO col VALUES (?)", (int(datetime(2024, 1, 1).timestamp()),))
+    for note_id, (text, card_type, due, interval) in enumerate(cards, start=1):
+        conn.execute("INSERT INTO notes VALUES (?, ?)", (note_id, text + '\x1fback'))
+        conn.execute("INSERT INTO cards VALUES (?, ?, 0, ?, ?, ?, 1)", (note_id, note_id, card_type, due, interval))
+    conn.commit()
+    conn.close()
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.write(path, 'collection.anki2')
+    archive.seek(0)
+    return archive
+
+
+def test_apkg_schedules_learning_review_and_relearning_cards(tmp_path):
+    due = int(datetime(2024, 3, 1, 12, 0).timestamp())
+    archive = make_apkg(tmp_path, [
+        ('新しい文です。', 0, 1, 0),
+        ('学習中の文です。', deck_import.ANKI_LEARNING_CARD, due, 0),
+        ('復習の文です。', deck_import.ANKI_REVIEW_CARD, 10, 5),
+        ('忘れた文です。', deck_import.ANKI_RELEARNING_CARD, due, 2),
+    ])
+    notes = {note['text']: note for note in deck_import.iter_apkg_notes(archive)}
+
+    assert notes['新しい文です。']['schedule'] is None
+    assert notes['学習中の文です。']['schedule'] == {'next_review': datetime.fromtimestamp(due), 'interval': 0.0}
+    assert notes['復習の文です。']['schedule'] == {'next_review': datetime(2024, 1, 11), 'interval': 5.0}
+    assert notes['忘れた文です。']['schedule'] == {'next_review': datetime.fromtimestamp(due), 'interval': 0.0}
@@ -0,0 +1,50 @@
+"""Save/reload round trips of the pickle and SQLite storage backends"""
+import io
+
+import pytest
+
+shizen = pytest.importorskip('shizen')
+
+
+def load_user(tmp_path):
+    return shizen.UserState('test', str(tmp_path))
+
+
+def save(user_state):
+    return user_state.state_manager.save_state(
+        user_state.content_manager, user_state.review_system, user_state.time_tracker)
+
+
+@pytest.mark.parametrize('backend', ['pickle', 'sqlite'])
+def test_removed_source_stays_removed_after_reload(tmp_path, monkeypatch, backend):
+    monkeypatch.setenv('NEOANKI_STORAGE_BACKEND', backend)
+    user_state = load_user(tmp_path)
+    content_manager = user_state.content_manager
+    first, _ = content_manager.add_text_file('a', io.BytesIO('今日は天気がいいですね。'.encode()))
+    content_manager.add_text_file('b', io.BytesIO('明日は雨が降ります。'.encode()))
+    assert save(user_state)[0]
+
+    content_manager.remove_source(first)
+    assert save(user_state) == (True, 'State saved successfully')
+
+    reloaded = load_user(tmp_path)
+    assert [s['name'] for s in reloaded.content_manager.active_sources.values()] == ['b']
+
+
+def test_review_then_removal_replays_in_order(tmp_path, monkeypatch):
+    monkeypatch.setenv('NEOANKI_STORAGE_BACKEND', 'pickle')
+    user_state = load_user(tmp_path)
+    content_manager = user_state.content_manager
+    shizen.st.session_state.content_manager = content_manager
+    content_manager.add_content('今日は天気がいいですね。明日は雨が降ります。')
+    assert save(user_state)[0]
+
+    # Both land in the same journal frame
+    user_state.review_system.process_response(1, 'good')
+    content_manager.remove_sentences([1])
+    assert save(user_state)[0]
+
+    reloaded = load_user(tmp_path)
+    assert dict(reloaded.review_system.schedule) == {}
+    assert len(list(reloaded.review_system.history)) == 0
+    assert [s['id'] for s in reloaded.content_manager.sentences] == [2]
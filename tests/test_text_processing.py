@@ -0,0 +1,24 @@
+"""Sentence segmentation"""
+import text_processing
+
+
+def split(text):
+    return [sentence['text'] for sentence in text_processing.split_into_sentences(text)]
+
+
+def test_short_quote_continues_the_sentence():
+    assert split('「短い引用です。」と言った。「次の引用。」 終わりです。') == [
+        '「短い引用です。」と言った。', '「次の引用。」', '終わりです。']
+
+
+def test_long_dialogue_is_split_inside_the_quote():
+    quote = ''.join(f'これは長い会話の{i}番目の文で、話はまだまだ続いていきます。' for i in range(12))
+    assert len(quote) > text_processing.MAX_SENTENCE_LENGTH
+    sentences = split('彼は静かに話し始めた。「' + quote + '」と彼は言った。次の日は晴れた。')
+
+    assert len(sentences) == 14
+    assert sentences[0] == '彼は静かに話し始めた。'
+    assert sentences[1] == '「これは長い会話の0番目の文で、話はまだまだ続いていきます。'
+    assert sentences[-2] == 'これは長い会話の11番目の文で、話はまだまだ続いていきます。」と彼は言った。'
+    assert sentences[-1] == '次の日は晴れた。'
+    assert not any(sentence.startswith('」') for sentence in sentences)
@@ -0,0 +1,390 @@
+"""Text extraction and sentence splitting shared by the app and its worker processes.
+
+Everything here is a plain module-level function so it can be pickled and
+run in a process pool without importing the Streamlit app.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import re
+import unicodedata
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from urllib.parse import unquote
+
+import numpy as np
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+# Strings soup.get_text() includes by default (not comments, doctypes, ...)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+CHAPTER_SKIP_TAGS = frozenset(['style', 'script', 'nav', 'header', 'footer'])
+ARTICLE_SKIP_TAGS = CHAPTER_SKIP_TAGS | {'iframe'}
+CHAPTER_DIV_CLASSES = frozenset(['text', 'content', 'body'])
+ARTICLE_DIV_CLASSES = frozenset(['article', 'content', 'main-content'])
+
+MIN_SENTENCE_LENGTH = 5
+MAX_SENTENCE_LENGTH = 200
+# Full-width forms as well as the ASCII ones NFKC turns them into
+TERMINATORS = '。．！？!?'
+OPENING_BRACKETS = '「『（(【〈《〔［'
+CLOSING_BRACKETS = '」』）)】〉》〕］'
+TERMINATOR_RUN = re.compile('[%s]+' % re.escape(TERMINATORS))
+SEGMENT_TOKEN = re.compile('[%s]+|[%s%s]' % (
+    re.escape(TERMINATORS), re.escape(OPENING_BRACKETS), re.escape(CLOSING_BRACKETS)))
+JAPANESE_CHAR = re.compile('[\u3001-\U0010ffff]')  # anything above U+3000
+KANJI = re.compile('[\u4e00-\u9fff]')
+WHITESPACE = re.compile(r'\s+')
+STREAM_CHUNK_CHARS = 1 << 20
+# Longest run of unterminated pieces merged into one paragraph; anything
+# longer can never become a valid sentence
+MAX_CARRY_CHARS = 1 << 16
+
+
+class _MappedFile:
+    """Minimal seekable file over an mmap (mmap lacks seekable() before 3.13)"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.pos = 0
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=0):
+        base = (0, self.pos, len(self.buffer))[whence]
+        self.pos = base + offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, size=-1):
+        end = len(self.buffer) if size is None or size < 0 else min(self.pos + size, len(self.buffer))
+        data = bytes(self.buffer[self.pos:end])
+        self.pos = max(self.pos, end)
+        return data
+
+
+class EpubArchive:
+    """Read EPUB chapters straight from bytes or a memory map, without temp files
+
+    Only the container and package documents are parsed up front; each
+    chapter is decompressed when it is read. Chapters are the XHTML items of
+    the manifest in manifest order, the same order ebooklib's get_items()
+    gives, so progress positions of existing sources stay valid.
+    """
+    CONTAINER_PATH = 'META-INF/container.xml'
+    DOCUMENT_TYPES = ('application/xhtml+xml',)
+
+    def __init__(self, data):
+        fileobj = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else _MappedFile(data)
+        self.zf = zipfile.ZipFile(fileobj)
+        self.chapters = self._read_manifest()
+
+    def _read_manifest(self):
+        container = ET.fromstring(self.zf.read(self.CONTAINER_PATH))
+        rootfile = next(el for el in container.iter() if el.tag.endswith('rootfile'))
+        opf_path = rootfile.get('full-path')
+        opf_dir = posixpath.dirname(opf_path)
+
+        package = ET.fromstring(self.zf.read(opf_path))
+        chapters = []
+        for el in package.iter():
+            if el.tag.endswith('}item') or el.tag == 'item':
+                if el.get('media-type') in self.DOCUMENT_TYPES and el.get('href'):
+                    chapters.append(posixpath.normpath(posixpath.join(opf_dir, unquote(el.get('href')))))
+        return chapters
+
+    def read(self, name):
+        """Decompress one chapter"""
+        return self.zf.read(name)
+
+    def iter_contents(self, start=0, stop=None):
+        for name in self.chapters[start:stop]:
+            yield self.read(name)
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def html_parser(name=None):
+    """Pick the BeautifulSoup tree builder
+
+    html.parser by default, which the extraction output was checked against.
+    NEOANKI_HTML_PARSER=lxml is faster but repairs markup differently: a <p>
+    nested in another is closed early, so the outer paragraph loses the
+    text that follows the inner one. benchmarks/html_extraction.py reports
+    such differences per parser.
+    """
+    return name or os.environ.get('NEOANKI_HTML_PARSER', 'html.parser')
+
+
+def _has_class(tag, classes):
+    value = tag.get('class')
+    if not value:
+        return False
+    if isinstance(value, str):
+        value = value.split()
+    return any(c in classes for c in value) or ' '.join(value) in classes
+
+
+def _walk_text(soup, skip_tags, div_classes):
+    """Collect the document's strings in a single pass over the tree
+
+    Returns (parts, paragraphs, divs, article): parts are the text strings in
+    document order with skipped subtrees left out, and the others are
+    (start, end) ranges into parts for <p> elements, <div>s with one of
+    div_classes and the first <article>, in document order.
+    """
+    parts = []
+    ranges = {'p': [], 'div': [], 'article': []}
+    open_ranges = []  # [kind, start, depth, slot] for elements not closed yet
+    stack = [iter(soup.contents)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            if open_ranges and open_ranges[-1][2] == len(stack):
+                kind, start, _, slot = open_ranges.pop()
+                ranges[kind][slot] = (start, len(parts))
+            continue
+        if isinstance(node, Tag):
+            name = node.name
+            if name in skip_tags:
+                continue
+            kind = None
+            if name == 'p':
+                kind = 'p'
+            elif name == 'div' and _has_class(node, div_classes):
+                kind = 'div'
+            elif name == 'article' and not ranges['article']:
+                kind = 'article'
+            if kind is not None:
+                # Reserve the slot now so ranges stay in opening (document) order
+                open_ranges.append([kind, len(parts), len(stack), len(ranges[kind])])
+                ranges[kind].append(None)
+            stack.append(iter(node.contents))
+        elif type(node) in TEXT_STRING_TYPES:
+            parts.append(str(node))
+    article = ranges['article'][0] if ranges['article'] else None
+    return parts, ranges['p'], ranges['div'], article
+
+
+def _join(parts, span):
+    return ''.join(parts[span[0]:span[1]])
+
+
+def _normalize(text):
+    text = WHITESPACE.sub(' ', text)
+    return unicodedata.normalize('NFKC', text)
+
+
+def _parse(content, parser):
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode('utf-8', errors='ignore')
+    return BeautifulSoup(content, html_parser(parser))
+
+
+def extract_chapter_text(content, parser=None):
+    """Extract normalized text from an EPUB chapter, or None if it holds no Japanese
+
+    Uses paragraph text when the chapter has any, then text/content/body
+    divs, then everything outside navigation, scripts and styles.
+    """
+    parts, paragraphs, divs, _ = _walk_text(_parse(content, parser), CHAPTER_SKIP_TAGS, CHAPTER_DIV_CLASSES)
+
+    text = "\n".join(_join(parts, span).strip() for span in paragraphs)
+    if not text:
+        text = "\n".join(_join(parts, span).strip() for span in divs)
+    if not text:
+        text = ''.join(parts).strip()
+
+    if text and JAPANESE_CHAR.search(text):
+        return _normalize(text)
+    return None
+
+
+def extract_article_paragraphs(content, parser=None):
+    """Paragraphs of a web page's main article, each ending at a sentence end
+
+    The article text is cut at every <p> boundary and the pieces are merged
+    by iter_paragraphs, so joining the result gives the same sentences as
+    extract_article_text.
+    """
+    parts, paragraphs, divs, article = _walk_text(_parse(content, parser), ARTICLE_SKIP_TAGS, ARTICLE_DIV_CLASSES)
+    span = article or (divs[0] if divs else (0, len(parts)))
+    cuts = {span[0], span[1]}
+    for start, end in paragraphs:
+        if span[0] <= start and end <= span[1]:
+            cuts.update((start, end))
+    cuts = sorted(cuts)
+    return list(iter_paragraphs(_join(parts, (a, b)) for a, b in zip(cuts, cuts[1:])))
+
+
+def extract_article_text(content, parser=None):
+    """Extract normalized text from a web page, preferring its main article"""
+    parts, _, divs, article = _walk_text(_parse(content, parser), ARTICLE_SKIP_TAGS, ARTICLE_DIV_CLASSES)
+    span = article or (divs[0] if divs else None)
+    return _normalize(_join(parts, span) if span else ''.join(parts))
+
+
+def segment_sentences(text, max_quote_length=MAX_SENTENCE_LENGTH):
+    """Split text into sentence strings, keeping quoted and bracketed text whole
+
+    A run of terminators ends a sentence outside brackets. A closing bracket
+    that returns to the top level right after a terminator also ends one,
+    unless the quote continues the sentence (「…。」と言った). A bracket left
+    open for more than max_quote_length characters is treated as stray so
+    one unbalanced 「 cannot swallow a whole chapter: the text it holds so
+    far is split at its own terminators, and when the bracket does close
+    right after a boundary, the quote's last sentence takes the 」 back.
+
+    Returns (sentences, consumed): text after the last boundary is not a
+    complete sentence and is left out; consumed is where it starts.
+    """
+    sentences = []
+    append = sentences.append
+    depth = 0
+    overflowed = 0  # Brackets given up on as too long
+    start = previous_start = 0
+    length = len(text)
+    for match in SEGMENT_TOKEN.finditer(text):
+        pos, end = match.span()
+        ch = text[pos]
+        if ch in OPENING_BRACKETS:
+            depth += 1
+            continue
+        if ch in CLOSING_BRACKETS:
+            if depth:
+                depth -= 1
+            elif overflowed:
+                overflowed -= 1
+                if pos == start and sentences:
+                    sentences.pop()
+                    start = previous_start
+            if depth or pos == start or text[pos - 1] not in TERMINATORS:
+                continue
+            if end < length and not text[end].isspace() and text[end] not in OPENING_BRACKETS:
+                continue
+        elif depth:
+            if end - start <= max_quote_length:
+                continue
+            for inner in TERMINATOR_RUN.finditer(text, start, pos):
+                previous_start = start
+                append(text[start:inner.end()])
+                start = inner.end()
+            overflowed += depth
+            depth = 0
+        previous_start = start
+        append(text[start:end])
+        start = end
+    return [sentence for sentence in map(str.strip, sentences) if sentence], start
+
+
+def _difficulties(texts):
+    """calculate_difficulty for many texts, counting kanji in one vectorized pass"""
+    if not texts:
+        return []
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    kanji = np.concatenate(([0], np.cumsum((codes >= 0x4E00) & (codes <= 0x9FFF))))
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    ends = np.cumsum(lengths)
+    counts = kanji[ends] - kanji[ends - lengths]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (np.minimum(5, counts / lengths * 10) + np.minimum(5, lengths / 40)) / 2
+    # Python's round() so results match calculate_difficulty exactly
+    return [round(score, 1) if length else 1.0 for score, length in zip(scores.tolist(), lengths.tolist())]
+
+
+def make_sentences(texts, created=None, validate=True):
+    """Sentence dicts for the valid texts, sharing one creation time
+
+    Ids are left to the sentence store, which assigns them when the batch
+    is inserted. With validate=False every text is kept (imported decks).
+    """
+    created = created or datetime.now()
+    if validate:
+        texts = [text for text in texts if is_valid_sentence(text)]
+    return [
+        {
+            'id': None,
+            'text': text,
+            'created': created,
+            'difficulty': difficulty,
+            'reviews': 0,
+            'next_review': None,
+            'status': 'new'
+        }
+        for text, difficulty in zip(texts, _difficulties(texts))
+    ]
+
+
+def split_into_sentences(text):
+    return make_sentences(segment_sentences(text)[0])
+
+
+def ends_sentence(text):
+    """Whether text ends where a sentence could end"""
+    text = text.rstrip()
+    if not text:
+        return False
+    return text[-1] in TERMINATORS or (text[-1] in CLOSING_BRACKETS and len(text) > 1 and text[-2] in TERMINATORS)
+
+
+def iter_paragraphs(pieces, max_chars=MAX_CARRY_CHARS):
+    """Merge raw text pieces (lines, <p> contents) into normalized paragraphs
+
+    Pieces are joined until one ends at a sentence end, so a sentence
+    wrapped over several lines stays in one paragraph. Empty paragraphs are
+    skipped.
+    """
+    group = []
+    size = 0
+    for piece in pieces:
+        group.append(piece)
+        size += len(piece)
+        if ends_sentence(piece) or size > max_chars:
+            paragraph = _normalize(''.join(group)).strip()
+            group = []
+            size = 0
+            if paragraph:
+                yield paragraph
+    if group:
+        paragraph = _normalize(''.join(group)).strip()
+        if paragraph:
+            yield paragraph
+
+
+def paragraph_hash(paragraph):
+    """Unsigned 64-bit content hash of a paragraph"""
+    return int.from_bytes(hashlib.blake2b(paragraph.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def is_valid_sentence(text):
+    return bool(
+        text and
+        MIN_SENTENCE_LENGTH <= len(text) <= MAX_SENTENCE_LENGTH and
+        JAPANESE_CHAR.search(text)
+    )
+
+
+def calculate_difficulty(text):
+    kanji_count = len(KANJI.findall(text))
+    length = len(text)
+
+    if length == 0:
+        return 1.0
+
+    kanji_score = min(5, (kanji_count / length) * 10)
+    length_score = min(5, length / 40)
+
+    return round((kanji_score + length_score) / 2, 1)